@@ -1,22 +1,51 @@
+import os
+import sys
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import sqlite3
 from datetime import datetime, timedelta
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from columnar_export import ColumnarHistory
+from performance_queries import IncrementalMetricHistory, PerformanceQueries
+from performance_rollups import PerformanceRollups
+
+TREND_METRICS = ['avg_response_time', 'task_success_rate']
+# Points per trend line; roughly one per horizontal pixel of a default-width chart
+TREND_MAX_POINTS = 700
+
+
+@st.cache_resource
+def get_metric_history(db_path: str) -> IncrementalMetricHistory:
+    """Trend history shared across reruns, so each rerun only fetches new rows"""
+    return IncrementalMetricHistory(PerformanceQueries(db_path), TREND_METRICS)
+
+
+@st.cache_resource
+def get_columnar_metric_history(columnar_dir: str) -> IncrementalMetricHistory:
+    """Trend history over the Parquet export, shared across reruns so each rerun only reads newly exported rows"""
+    return IncrementalMetricHistory(ColumnarHistory(columnar_dir), TREND_METRICS)
+
 class AIModelPerformanceDashboard:
-    def __init__(self, db_path='../tests/reports/model_performance.db'):
-        self.conn = sqlite3.connect(db_path)
+    def __init__(self, db_path='../tests/reports/model_performance.db',
+                 columnar_dir=os.getenv('PERFORMANCE_COLUMNAR_DIR')):
+        self.queries = PerformanceQueries(db_path)
+        self.rollups = PerformanceRollups(db_path)
+        # Trend history comes from the Parquet export instead of SQLite when configured;
+        # the overview and comparisons always read the rollups, which stay constant-time
+        if columnar_dir:
+            self.metric_history = get_columnar_metric_history(columnar_dir)
+        else:
+            self.metric_history = get_metric_history(db_path)
         self.load_performance_data()
     
     def load_performance_data(self):
-        """Load performance metrics from SQLite database"""
-        self.df = pd.read_sql_query(
-            "SELECT * FROM performance_metrics ORDER BY timestamp", 
-            self.conn
-        )
-        self.df['timestamp'] = pd.to_datetime(self.df['timestamp'])
+        """Load per-model aggregates from the rollup tables, or the raw table before they exist"""
+        # Read-only: rollups are maintained by the benchmark and the --backfill CLI
+        self.aggregates = self.rollups if self.rollups.available() else self.queries
+        columns = ['avg_response_time', 'avg_token_generation_rate', 'task_success_rate', 'error_rate']
+        self.model_summary = self.aggregates.mean_metrics_per_model(columns).reset_index()
     
     def render_overview_section(self):
         """Create overview section with key performance insights"""
@@ -27,19 +56,21 @@ class AIModelPerformanceDashboard:
         with col1:
             st.metric(
                 "Total Models Tracked", 
-                len(self.df['model_name'].unique())
+                len(self.model_summary)
             )
         
         with col2:
+            success_rate = self.aggregates.overall_mean('task_success_rate') or 0.0
             st.metric(
                 "Average Task Success Rate",
-                f"{self.df['task_success_rate'].mean():.2f}%"
+                f"{success_rate:.2f}%"
             )
         
         with col3:
+            median_response_time = self.aggregates.overall_percentile('avg_response_time', 50) or 0.0
             st.metric(
                 "Median Response Time",
-                f"{self.df['avg_response_time'].median():.2f} ms"
+                f"{median_response_time:.2f} ms"
             )
     
     def render_model_comparison(self):
@@ -48,7 +79,7 @@ class AIModelPerformanceDashboard:
         
         # Response Time Comparison
         fig_response_time = px.bar(
-            self.df, 
+            self.model_summary, 
             x='model_name', 
             y='avg_response_time',
             title='Average Response Time by Model',
@@ -58,7 +89,7 @@ class AIModelPerformanceDashboard:
         
         # Token Generation Rate
         fig_token_rate = px.bar(
-            self.df, 
+            self.model_summary, 
             x='model_name', 
             y='avg_token_generation_rate',
             title='Token Generation Rate by Model',
@@ -70,13 +101,14 @@ class AIModelPerformanceDashboard:
         """Show performance trends over time"""
         st.header("📈 Historical Performance Trends")
         
-        # Time series for each model
-        models = self.df['model_name'].unique()
+        # Only rows added since the last rerun are read, from SQLite or the Parquet export;
+        # each line is LTTB-downsampled to a bounded point count, recomputed only when it changes
+        models = self.metric_history.refresh()
         
-        for metric in ['avg_response_time', 'task_success_rate']:
+        for metric in TREND_METRICS:
             fig = go.Figure()
             for model in models:
-                model_data = self.df[self.df['model_name'] == model]
+                model_data = self.metric_history.downsampled(model, metric, TREND_MAX_POINTS)
                 fig.add_trace(go.Scatter(
                     x=model_data['timestamp'], 
                     y=model_data[metric],
@@ -96,7 +128,7 @@ class AIModelPerformanceDashboard:
         st.header("⚠️ Error Rate and Performance Insights")
         
         fig_error_rate = px.bar(
-            self.df, 
+            self.model_summary, 
             x='model_name', 
             y='error_rate',
             title='Error Rate by Model',
@@ -5,6 +5,12 @@ import os
 # Load environment variables from .env file
 load_dotenv()
 
+def print_stream(completion):
+    # Print each content delta as it arrives; usage-only chunks carry no choices
+    for chunk in completion:
+        if chunk.choices and chunk.choices[0].delta.content is not None:
+            print(chunk.choices[0].delta.content, end="")
+
 def main():
     # Retrieve API key and configuration from environment variables
     api_key = os.getenv('NVIDIA_API_KEY', '$API_KEY_REQUIRED_IF_EXECUTING_OUTSIDE_NGC')
@@ -31,9 +37,7 @@ def main():
 
     # Stream and print the response
     print("DeepSeek AI Response:")
-    for chunk in completion:
-        if chunk.choices[0].delta.content is not None:
-            print(chunk.choices[0].delta.content, end="")
+    print_stream(completion)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,277 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+class ArmStatistics:
+    """
+    Running statistics for one (model, complexity) arm.
+
+    Rewards are folded into a discounted Beta posterior, so recent outcomes
+    outweigh old ones and every update is constant time. Pull, latency,
+    token and failure totals decay with the same discount, so averages
+    derived from them describe the same recent history as the posterior.
+    """
+
+    __slots__ = ('alpha', 'beta', 'pulls', 'reward_sum', 'latency_sum_ms', 'tokens_sum', 'failures')
+
+    def __init__(self, alpha: float = 1.0, beta: float = 1.0, pulls: float = 0.0, reward_sum: float = 0.0,
+                 latency_sum_ms: float = 0.0, tokens_sum: float = 0.0, failures: float = 0.0):
+        self.alpha = alpha
+        self.beta = beta
+        self.pulls = pulls
+        self.reward_sum = reward_sum
+        self.latency_sum_ms = latency_sum_ms
+        self.tokens_sum = tokens_sum
+        self.failures = failures
+
+    @property
+    def mean_reward(self) -> float:
+        """Posterior mean of the arm's reward."""
+        return self.alpha / (self.alpha + self.beta)
+
+    @property
+    def mean_latency_ms(self) -> Optional[float]:
+        """Discounted average latency, None before the first pull."""
+        return self.latency_sum_ms / self.pulls if self.pulls > 0 else None
+
+    @property
+    def mean_tokens(self) -> Optional[float]:
+        """Discounted average tokens per request, None before the first pull."""
+        return self.tokens_sum / self.pulls if self.pulls > 0 else None
+
+    @property
+    def failure_rate(self) -> Optional[float]:
+        """Discounted share of failed requests, None before the first pull."""
+        return self.failures / self.pulls if self.pulls > 0 else None
+
+
+class OnlineBanditRouter:
+    """
+    Online model router using Thompson sampling or UCB per (model, complexity) arm.
+
+    Each outcome reported through ``record_outcome`` is turned into a reward
+    in [0, 1] and applied to its arm in O(1). Arm statistics are persisted
+    to the SQLite performance store periodically and restored on startup.
+    """
+
+    THOMPSON = 'thompson'
+    UCB = 'ucb'
+
+    def __init__(self, performance_db_path: str, strategy: str = THOMPSON, discount: float = 0.99,
+                 latency_scale_ms: float = 2000.0, token_rate_scale: float = 50.0,
+                 ucb_exploration: float = 1.0, persist_interval: float = 30.0, seed: Optional[int] = None):
+        """
+        Initialize the bandit and restore persisted arm statistics.
+
+        :param performance_db_path: Path to SQLite performance tracking database
+        :param strategy: 'thompson' or 'ucb'
+        :param discount: Per-update decay of an arm's history, 1.0 disables forgetting
+        :param latency_scale_ms: Latency at which the latency component of the reward halves
+        :param token_rate_scale: Tokens per second at which the throughput component reaches one half
+        :param ucb_exploration: Exploration coefficient for UCB
+        :param persist_interval: Minimum seconds between two writes of arm statistics
+        :param seed: Seed for the sampling random generator
+        """
+        if strategy not in (self.THOMPSON, self.UCB):
+            raise ValueError(f"strategy must be '{self.THOMPSON}' or '{self.UCB}'")
+
+        self.performance_db_path = performance_db_path
+        self.strategy = strategy
+        self.discount = discount
+        self.latency_scale_ms = latency_scale_ms
+        self.token_rate_scale = token_rate_scale
+        self.ucb_exploration = ucb_exploration
+        self.persist_interval = persist_interval
+
+        self.arms: Dict[Tuple[str, str], ArmStatistics] = {}
+        self._dirty = set()
+        self._last_persisted = time.monotonic()
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self._load()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the store connection and make sure the arm table exists."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.performance_db_path, check_same_thread=False)
+            self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS bandit_arm_stats (
+                model_name TEXT,
+                task_complexity TEXT,
+                alpha REAL,
+                beta REAL,
+                pulls REAL,
+                reward_sum REAL,
+                latency_sum_ms REAL,
+                tokens_sum REAL,
+                failures REAL,
+                updated_at TEXT,
+                PRIMARY KEY (model_name, task_complexity)
+            )
+            ''')
+            self._conn.commit()
+        return self._conn
+
+    def _load(self):
+        """Restore arm statistics from the performance store."""
+        try:
+            rows = self._connect().execute('''
+            SELECT model_name, task_complexity, alpha, beta, pulls,
+                   reward_sum, latency_sum_ms, tokens_sum, failures
+            FROM bandit_arm_stats
+            ''').fetchall()
+        except sqlite3.Error as e:
+            print(f"Error loading bandit statistics: {e}")
+            return
+
+        for model, complexity, *stats in rows:
+            self.arms[(model, complexity)] = ArmStatistics(*stats)
+
+    def _arm(self, model: str, task_complexity: str) -> ArmStatistics:
+        """Return the arm for a model and complexity, creating it with a uniform prior."""
+        key = (model, task_complexity)
+        arm = self.arms.get(key)
+        if arm is None:
+            arm = self.arms[key] = ArmStatistics()
+        return arm
+
+    def outcome_reward(self, latency_ms: float, success: bool, tokens: int) -> float:
+        """
+        Convert a request outcome into a reward in [0, 1].
+
+        Failed requests earn nothing. Successful ones earn 0.4 for succeeding
+        plus up to 0.3 each for low latency and high token throughput, the
+        same balance as the offline composite score.
+
+        :param latency_ms: End-to-end latency in milliseconds
+        :param success: Whether the request succeeded
+        :param tokens: Tokens generated by the request
+        :return: Reward in [0, 1]
+        """
+        if not success:
+            return 0.0
+        latency_ms = max(float(latency_ms), 0.0)
+        latency_score = self.latency_scale_ms / (self.latency_scale_ms + latency_ms)
+        token_rate = tokens / (latency_ms / 1000) if latency_ms > 0 else 0.0
+        throughput_score = token_rate / (token_rate + self.token_rate_scale)
+        return 0.4 + 0.3 * latency_score + 0.3 * throughput_score
+
+    def record_outcome(self, model: str, latency: float, success: bool, tokens: int,
+                       task_complexity: str = 'medium'):
+        """
+        Feed back the outcome of a routed request in constant time.
+
+        :param model: Model that served the request
+        :param latency: End-to-end latency in milliseconds
+        :param success: Whether the request succeeded
+        :param tokens: Tokens generated by the request
+        :param task_complexity: Complexity level the request was routed under
+        """
+        reward = self.outcome_reward(latency, success, tokens)
+        with self._lock:
+            arm = self._arm(model, task_complexity)
+            gamma = self.discount
+            arm.alpha = 1.0 + gamma * (arm.alpha - 1.0) + reward
+            arm.beta = 1.0 + gamma * (arm.beta - 1.0) + (1.0 - reward)
+            arm.pulls = gamma * arm.pulls + 1
+            arm.reward_sum = gamma * arm.reward_sum + reward
+            arm.latency_sum_ms = gamma * arm.latency_sum_ms + latency
+            arm.tokens_sum = gamma * arm.tokens_sum + tokens
+            arm.failures = gamma * arm.failures + (0 if success else 1)
+            self._dirty.add((model, task_complexity))
+            should_persist = (time.monotonic() - self._last_persisted) >= self.persist_interval
+
+        if should_persist:
+            self.persist()
+
+    def _arm_parameters(self, models: List[str], task_complexity: str) -> np.ndarray:
+        """
+        Collect (alpha, beta, pulls, reward_sum) for the given models.
+
+        :return: Array of shape (len(models), 4)
+        """
+        with self._lock:
+            params = []
+            for model in models:
+                arm = self.arms.get((model, task_complexity))
+                if arm is None:
+                    params.append((1.0, 1.0, 0.0, 0.0))
+                else:
+                    params.append((arm.alpha, arm.beta, arm.pulls, arm.reward_sum))
+            return np.array(params, dtype=float)
+
+    def score_models(self, models: List[str], task_complexity: str, samples: int = 1) -> np.ndarray:
+        """
+        Score models for one complexity level.
+
+        Thompson sampling draws from each arm's Beta posterior; UCB adds an
+        exploration bonus to the mean reward, with unplayed arms first.
+
+        :param models: Candidate models
+        :param task_complexity: Complexity level of the tasks
+        :param samples: Number of independent score rows to draw
+        :return: Array of shape (samples, len(models))
+        """
+        params = self._arm_parameters(models, task_complexity)
+        alpha, beta, pulls, reward_sum = params.T
+
+        if self.strategy == self.THOMPSON:
+            return self._rng.beta(alpha, beta, size=(samples, len(models)))
+
+        total = max(float(pulls.sum()), 1.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bonus = self.ucb_exploration * np.sqrt(2 * np.log(total) / pulls)
+            scores = np.where(pulls > 0, reward_sum / pulls + bonus, np.inf)
+        return np.broadcast_to(scores, (samples, len(models)))
+
+    def select(self, models: List[str], task_complexity: str = 'medium') -> str:
+        """
+        Pick a model for a task of the given complexity.
+
+        :param models: Candidate models
+        :param task_complexity: Complexity level of the task
+        :return: Selected model name
+        """
+        scores = self.score_models(models, task_complexity)[0]
+        return models[int(np.argmax(scores))]
+
+    def persist(self):
+        """Write statistics of arms updated since the last persist."""
+        # The connection is shared with _load and close, so it is only used under the lock
+        with self._lock:
+            self._last_persisted = time.monotonic()
+            if not self._dirty:
+                return
+            updated_at = datetime.now().isoformat()
+            rows = [
+                (model, complexity, arm.alpha, arm.beta, arm.pulls, arm.reward_sum,
+                 arm.latency_sum_ms, arm.tokens_sum, arm.failures, updated_at)
+                for (model, complexity), arm in ((key, self.arms[key]) for key in self._dirty)
+            ]
+            try:
+                conn = self._connect()
+                conn.executemany('''
+                INSERT OR REPLACE INTO bandit_arm_stats (
+                    model_name, task_complexity, alpha, beta, pulls,
+                    reward_sum, latency_sum_ms, tokens_sum, failures, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                conn.commit()
+                self._dirty = set()
+            except sqlite3.Error as e:
+                # Dirty arms stay marked and are written by the next persist
+                print(f"Error persisting bandit statistics: {e}")
+
+    def close(self):
+        """Persist pending statistics and close the store connection."""
+        self.persist()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
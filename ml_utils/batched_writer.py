@@ -0,0 +1,180 @@
+import time
+import queue
+import atexit
+import threading
+from typing import Any, List, Optional
+
+
+class BatchedWriter:
+    """
+    Base class for non-blocking writers backed by a background thread.
+
+    Callers enqueue entries and return immediately; the writer thread
+    collects them and hands them to ``_write_batch`` in batches, flushing when
+    a batch reaches ``batch_size`` entries or ``flush_interval`` seconds have
+    passed. Subclasses only implement ``_write_batch``, which always runs on
+    the writer thread. A batch that fails to write is reported and counted
+    in ``failed_entries``; the thread keeps running so later writes, flushes
+    and blocked callers are never stranded.
+    """
+
+    DROP = 'drop'
+    BLOCK = 'block'
+
+    def __init__(self, max_pending: int = 10000, batch_size: int = 512, flush_interval: float = 1.0,
+                 full_policy: str = DROP, block_timeout: Optional[float] = None,
+                 thread_name: str = 'batched-writer'):
+        """
+        Initialize the writer and start its thread.
+
+        :param max_pending: Maximum number of queued submissions
+        :param batch_size: Number of entries that triggers a write
+        :param flush_interval: Maximum seconds an entry waits before being written
+        :param full_policy: 'drop' to discard entries or 'block' to wait when the queue is full
+        :param block_timeout: Maximum seconds to wait under the 'block' policy, None waits forever
+        :param thread_name: Name of the writer thread
+        """
+        if full_policy not in (self.DROP, self.BLOCK):
+            raise ValueError(f"full_policy must be '{self.DROP}' or '{self.BLOCK}'")
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.full_policy = full_policy
+        self.block_timeout = block_timeout
+        self.dropped_entries = 0
+        self.failed_entries = 0
+        # Producers on any thread update dropped_entries
+        self._dropped_lock = threading.Lock()
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=thread_name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, entry: Any) -> bool:
+        """
+        Enqueue a single entry.
+
+        :param entry: Entry to write
+        :return: False if the entry was dropped
+        """
+        return self.write_many([entry])
+
+    def write_many(self, entries: List[Any]) -> bool:
+        """
+        Enqueue several entries as one submission.
+
+        :param entries: Entries to write
+        :return: False if the entries were dropped
+        """
+        if not entries:
+            return True
+        if self._closed:
+            raise RuntimeError(f"{type(self).__name__} is closed")
+
+        try:
+            if self.full_policy == self.BLOCK:
+                self._queue.put(entries, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(entries)
+            return True
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped_entries += len(entries)
+            return False
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until everything enqueued so far is written.
+
+        :param timeout: Maximum seconds to wait, None waits forever
+        :return: True if the flush completed in time
+        """
+        if not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        # Control messages always wait for room, even under the drop policy
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """
+        Flush pending entries and stop the writer thread.
+
+        :param timeout: Maximum seconds to wait for the final flush
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+        atexit.unregister(self.close)
+
+    def _write_batch(self, batch: List[Any]):
+        """
+        Write a batch of entries. Runs on the writer thread.
+
+        :param batch: Entries to write
+        """
+        raise NotImplementedError
+
+    def _on_flush(self):
+        """Called on the writer thread once a flush has written the pending batch."""
+
+    def _on_stop(self):
+        """Release writer-thread resources once the final batch is written."""
+
+    def _write_safely(self, batch: List[Any]):
+        """
+        Write a batch on the writer thread, reporting instead of raising on failure.
+
+        :param batch: Entries to write
+        """
+        try:
+            self._write_batch(batch)
+        except Exception as e:
+            self.failed_entries += len(batch)
+            print(f"Error in {type(self).__name__} writing {len(batch)} entries: {e}")
+
+    def _run(self):
+        """Writer loop: collect submissions and write them in batches."""
+        batch: List[Any] = []
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+
+            if item is None:
+                if batch:
+                    self._write_safely(batch)
+                try:
+                    self._on_stop()
+                except Exception as e:
+                    print(f"Error stopping {type(self).__name__}: {e}")
+                return
+            if isinstance(item, threading.Event):
+                if batch:
+                    self._write_safely(batch)
+                batch, deadline = [], None
+                try:
+                    self._on_flush()
+                except Exception as e:
+                    print(f"Error flushing {type(self).__name__}: {e}")
+                item.set()
+                continue
+
+            if item:
+                batch.extend(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if len(batch) >= self.batch_size or (deadline is not None and time.monotonic() >= deadline):
+                if batch:
+                    self._write_safely(batch)
+                batch, deadline = [], None
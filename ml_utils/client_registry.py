@@ -0,0 +1,137 @@
+import ssl
+import time
+import atexit
+import socket
+import hashlib
+import statistics
+import threading
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+try:
+    import httpx
+except ImportError:  # The SDKs fall back to their own default connection pools
+    httpx = None
+
+try:
+    import h2  # noqa: F401  httpx negotiates HTTP/2 only when h2 is installed
+    HTTP2_AVAILABLE = httpx is not None
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Keep-alive pool shared by every request through one registered client
+POOL_LIMITS = {
+    'max_connections': 100,
+    'max_keepalive_connections': 20,
+    'keepalive_expiry': 30.0
+}
+
+_clients: Dict[Tuple[str, str, str], Any] = {}
+_http_clients = []
+_clients_lock = threading.Lock()
+
+
+def build_http_client(pool_limits: Optional[Dict[str, Any]] = None, http2: Optional[bool] = None) -> Optional[Any]:
+    """
+    Build a keep-alive HTTP client for an SDK client to run on.
+
+    :param pool_limits: Overrides of POOL_LIMITS
+    :param http2: Negotiate HTTP/2, None enables it whenever h2 is installed
+    :return: httpx.Client, or None when httpx is unavailable and the SDK default should be used
+    """
+    if httpx is None:
+        return None
+    limits = {**POOL_LIMITS, **(pool_limits or {})}
+    return httpx.Client(
+        limits=httpx.Limits(**limits),
+        http2=HTTP2_AVAILABLE if http2 is None else http2 and HTTP2_AVAILABLE,
+        # Same defaults as the SDKs; per-request timeouts still override them
+        timeout=httpx.Timeout(600.0, connect=5.0),
+        follow_redirects=True
+    )
+
+
+def _build_client(provider: str, api_key: Optional[str], base_url: Optional[str], http_client: Optional[Any]) -> Any:
+    """Create the SDK client for a provider."""
+    if provider in ('openai', 'deepseek'):
+        from openai import OpenAI
+        return OpenAI(base_url=base_url, api_key=api_key, http_client=http_client)
+    if provider == 'anthropic':
+        import anthropic
+        return anthropic.Anthropic(base_url=base_url, api_key=api_key, http_client=http_client)
+    if provider == 'google':
+        # The Gemini SDK manages its own gRPC channel; registering only avoids reconfiguring it
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        return genai
+    raise ValueError(f"Unsupported provider: {provider}")
+
+
+def get_client(provider: str, api_key: Optional[str] = None, base_url: Optional[str] = None,
+               pool_limits: Optional[Dict[str, Any]] = None, http2: Optional[bool] = None) -> Any:
+    """
+    Process-wide SDK client for a provider, endpoint and API key.
+
+    Callers share one client, and with it one keep-alive connection pool, so
+    TCP and TLS handshakes are paid once per connection rather than once per
+    benchmark or test. Pool options only apply when the client is first
+    created. Use ``client.with_options(...)`` for per-caller settings such as
+    ``max_retries``; the copy keeps the shared pool.
+
+    :param provider: 'openai', 'deepseek', 'anthropic' or 'google'
+    :param api_key: API key; only its hash is kept as a key
+    :param base_url: Endpoint, None for the SDK default
+    :param pool_limits: Overrides of POOL_LIMITS
+    :param http2: Negotiate HTTP/2, None enables it whenever h2 is installed
+    :return: Shared client
+    """
+    key = (provider, base_url or '', hashlib.sha256((api_key or '').encode()).hexdigest()[:16])
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            http_client = build_http_client(pool_limits, http2) if provider != 'google' else None
+            client = _clients[key] = _build_client(provider, api_key, base_url, http_client)
+            if http_client is not None:
+                _http_clients.append(http_client)
+        return client
+
+
+def close_clients():
+    """Close every pooled connection and forget the registered clients."""
+    with _clients_lock:
+        for http_client in _http_clients:
+            http_client.close()
+        _http_clients.clear()
+        _clients.clear()
+
+
+atexit.register(close_clients)
+
+
+def measure_handshake_ms(base_url: str, samples: int = 5, timeout: float = 5.0) -> float:
+    """
+    Median cost of opening a new connection to an endpoint.
+
+    Times the TCP connect and, for https URLs, the TLS handshake; this is what
+    every request on a fresh client pays and a reused pooled connection does not.
+
+    :param base_url: Endpoint URL
+    :param samples: Connections to time
+    :param timeout: Seconds before a connection attempt fails
+    :return: Median handshake time in milliseconds
+    """
+    url = urlsplit(base_url)
+    port = url.port or (443 if url.scheme == 'https' else 80)
+    context = ssl.create_default_context() if url.scheme == 'https' else None
+    timings = []
+
+    for _ in range(samples):
+        start = time.perf_counter()
+        with socket.create_connection((url.hostname, port), timeout=timeout) as sock:
+            if context is not None:
+                with context.wrap_socket(sock, server_hostname=url.hostname):
+                    timings.append((time.perf_counter() - start) * 1000)
+            else:
+                timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings)
@@ -0,0 +1,335 @@
+import os
+import sys
+import json
+import sqlite3
+import argparse
+from typing import Any, Dict, Optional, Sequence, Tuple
+from urllib.parse import quote
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from pyarrow import fs
+except ImportError:  # Columnar export is optional; SQLite stays the system of record
+    pa = None
+
+# Column types of the exported tables; columns missing from older databases are written as nulls
+TABLE_SCHEMAS = {
+    'request_samples': [
+        ('id', 'int64'), ('run_id', 'string'), ('timestamp', 'timestamp'), ('model_name', 'string'),
+        ('scenario', 'string'), ('ttft_ms', 'float64'), ('latency_ms', 'float64'), ('input_tokens', 'int64'),
+        ('output_tokens', 'int64'), ('status', 'string'), ('error_class', 'string')
+    ],
+    'performance_metrics': [
+        ('id', 'int64'), ('timestamp', 'timestamp'), ('model_name', 'string'), ('total_queries', 'int64'),
+        ('avg_response_time', 'float64'), ('median_response_time', 'float64'),
+        ('avg_token_generation_rate', 'float64'), ('task_success_rate', 'float64'), ('error_rate', 'float64'),
+        ('total_execution_time', 'float64'), ('avg_time_to_first_token', 'float64'),
+        ('p95_inter_chunk_latency', 'float64')
+    ]
+}
+
+STATE_FILE = '_export_state.json'
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Columnar export requires pyarrow: pip install pyarrow")
+
+
+def _arrow_schema(table: str) -> 'pa.Schema':
+    types = {'int64': pa.int64(), 'float64': pa.float64(), 'string': pa.string(), 'timestamp': pa.timestamp('us')}
+    return pa.schema([(name, types[kind]) for name, kind in TABLE_SCHEMAS[table]])
+
+
+class ColumnarExporter:
+    """
+    Append-only export of the SQLite performance tables to partitioned Parquet.
+
+    Rows land in ``<root>/<table>/date=YYYY-MM-DD/model=<name>/`` as part files
+    named by the id range they hold. Each export only reads rows past the
+    highest id already exported, so repeated exports never rewrite data;
+    ``compact`` later merges the small part files of a partition into one.
+    """
+
+    def __init__(self, performance_db_path: str, root: str = 'reports/columnar', chunk_size: int = 200000):
+        """
+        Initialize the exporter.
+
+        :param performance_db_path: Path to SQLite performance tracking database
+        :param root: Directory the partitioned dataset is written to
+        :param chunk_size: Rows read from SQLite per pass
+        """
+        _require_pyarrow()
+        self.performance_db_path = performance_db_path
+        self.root = root
+        self.chunk_size = chunk_size
+
+    def _load_state(self) -> Dict[str, int]:
+        path = os.path.join(self.root, STATE_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_state(self, state: Dict[str, int]):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, STATE_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(path + '.tmp', path)
+
+    def _write_partitions(self, table: str, frame: pd.DataFrame) -> int:
+        """Write one chunk of rows as a part file per date and model."""
+        schema = _arrow_schema(table)
+        for name, kind in TABLE_SCHEMAS[table]:
+            if name not in frame.columns:
+                frame[name] = None
+            if kind == 'int64':
+                # SQLite NULLs arrive as NaN; nullable integers keep them as nulls
+                frame[name] = frame[name].astype('Int64')
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'], format='ISO8601')
+        dates = frame['timestamp'].dt.strftime('%Y-%m-%d')
+
+        files = 0
+        for (date, model), part in frame.groupby([dates, frame['model_name']], sort=False):
+            directory = os.path.join(self.root, table, f"date={date}", f"model={quote(str(model), safe='')}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{part['id'].min():012d}-{part['id'].max():012d}.parquet")
+            arrow_table = pa.Table.from_pandas(part[schema.names], schema=schema, preserve_index=False)
+            pq.write_table(arrow_table, path)
+            files += 1
+        return files
+
+    def export(self, tables: Sequence[str] = tuple(TABLE_SCHEMAS)) -> Dict[str, int]:
+        """
+        Append rows added since the last export.
+
+        :param tables: Tables to export
+        :return: Number of rows exported per table
+        """
+        state = self._load_state()
+        exported = {}
+        conn = sqlite3.connect(self.performance_db_path)
+        try:
+            for table in tables:
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if not existing:
+                    continue
+                columns = [name for name, _ in TABLE_SCHEMAS[table] if name in existing]
+                last_id = state.get(table, 0)
+                exported[table] = 0
+                for chunk in pd.read_sql_query(
+                    f"SELECT {', '.join(columns)} FROM {table} WHERE id > ? ORDER BY id",
+                    conn, params=(last_id,), chunksize=self.chunk_size
+                ):
+                    if chunk.empty:
+                        continue
+                    self._write_partitions(table, chunk)
+                    exported[table] += len(chunk)
+                    # Advance the watermark per chunk so an interrupted export resumes where it stopped
+                    state[table] = int(chunk['id'].max())
+                    self._save_state(state)
+        finally:
+            conn.close()
+        return exported
+
+    def compact(self, min_files: int = 8) -> int:
+        """
+        Merge the part files of every partition holding at least ``min_files`` of them.
+
+        The merged file is written under a hidden name and renamed into place
+        before the parts are removed, so readers never see a partial file.
+
+        :param min_files: Part count that triggers compaction of a partition
+        :return: Number of partitions compacted
+        """
+        compacted = 0
+        for directory, _, filenames in os.walk(self.root):
+            parts = sorted(name for name in filenames if name.startswith('part-') and name.endswith('.parquet'))
+            if len(parts) < min_files:
+                continue
+            merged = pa.concat_tables([pq.read_table(os.path.join(directory, name)) for name in parts])
+            merged = merged.sort_by('id')
+            ids = merged.column('id')
+            target = f"part-{ids[0].as_py():012d}-{ids[-1].as_py():012d}.parquet"
+            hidden = os.path.join(directory, '.' + target)
+            pq.write_table(merged, hidden)
+            os.replace(hidden, os.path.join(directory, target))
+            for name in parts:
+                if name != target:
+                    os.remove(os.path.join(directory, name))
+            compacted += 1
+        return compacted
+
+
+class ColumnarHistory:
+    """
+    Read path over the partitioned Parquet export.
+
+    Files are memory-mapped, only the requested columns are decoded, model
+    and date filters prune whole partitions, and timestamp filters are pushed
+    down to Parquet row-group statistics.
+    """
+
+    def __init__(self, root: str = 'reports/columnar'):
+        """
+        Initialize the reader.
+
+        :param root: Directory written by ColumnarExporter
+        """
+        _require_pyarrow()
+        self.root = root
+        self._filesystem = fs.LocalFileSystem(use_mmap=True)
+        self._partitioning = ds.partitioning(
+            pa.schema([('date', pa.string()), ('model', pa.string())]), flavor='hive'
+        )
+
+    def dataset(self, table: str) -> Optional['ds.Dataset']:
+        """
+        Open an exported table.
+
+        :param table: 'request_samples' or 'performance_metrics'
+        :return: Dataset, None when nothing was exported yet
+        """
+        path = os.path.join(self.root, table)
+        if not os.path.isdir(path):
+            return None
+        return ds.dataset(path, format='parquet', partitioning=self._partitioning,
+                          filesystem=self._filesystem, schema=_arrow_schema(table).append(
+                              pa.field('date', pa.string())).append(pa.field('model', pa.string())))
+
+    def read(self, table: str, columns: Optional[Sequence[str]] = None, models: Optional[Sequence[str]] = None,
+             start: Optional[Any] = None, end: Optional[Any] = None, after_id: Optional[int] = None) -> pd.DataFrame:
+        """
+        Read an exported table with column pruning and predicate pushdown.
+
+        :param table: 'request_samples' or 'performance_metrics'
+        :param columns: Columns to decode, all table columns when omitted
+        :param models: Restrict to these models
+        :param start: Earliest timestamp (inclusive)
+        :param end: Latest timestamp (exclusive)
+        :param after_id: Only return rows with a larger id; parts holding only older rows are
+                         skipped using their Parquet id statistics
+        :return: DataFrame of the matching rows
+        """
+        columns = list(columns) if columns is not None else [name for name, _ in TABLE_SCHEMAS[table]]
+        dataset = self.dataset(table)
+        if dataset is None:
+            return pd.DataFrame(columns=columns)
+
+        conditions = []
+        if models is not None:
+            # Partition values are URI-decoded on discovery, so filter on the plain model name
+            conditions.append(ds.field('model').isin([str(model) for model in models]))
+        if start is not None:
+            start = pd.Timestamp(start)
+            conditions.append(ds.field('date') >= start.strftime('%Y-%m-%d'))
+            conditions.append(ds.field('timestamp') >= pa.scalar(start.to_pydatetime(), pa.timestamp('us')))
+        if end is not None:
+            end = pd.Timestamp(end)
+            conditions.append(ds.field('date') <= end.strftime('%Y-%m-%d'))
+            conditions.append(ds.field('timestamp') < pa.scalar(end.to_pydatetime(), pa.timestamp('us')))
+        if after_id is not None:
+            conditions.append(ds.field('id') > after_id)
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+
+        return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+    def metric_history(self, columns: Sequence[str], models: Optional[Sequence[str]] = None,
+                       start: Optional[Any] = None, after_id: Optional[int] = None) -> pd.DataFrame:
+        """
+        Time series of selected aggregate metrics, shaped like ``PerformanceQueries.metric_history``.
+
+        :param columns: Metric columns to include
+        :param models: Restrict to these models, all models when omitted
+        :param start: Earliest timestamp to include
+        :param after_id: Only return rows with a larger id, ordered by id, for incremental fetching
+        :return: DataFrame with id, timestamp, model_name and the metric columns
+        """
+        history = self.read('performance_metrics', ['id', 'timestamp', 'model_name'] + list(columns), models, start,
+                            after_id=after_id)
+        if after_id is not None:
+            return history.sort_values('id', ignore_index=True)
+        return history.sort_values(['model_name', 'timestamp'], ignore_index=True)
+
+    def max_id(self, table: str = 'performance_metrics') -> int:
+        """
+        Highest row id exported for a table, read from the exporter's watermark.
+
+        :param table: 'request_samples' or 'performance_metrics'
+        :return: Row id, 0 when nothing was exported yet
+        """
+        path = os.path.join(self.root, STATE_FILE)
+        if not os.path.exists(path):
+            return 0
+        with open(path) as f:
+            return int(json.load(f).get(table, 0))
+
+    def first_row_key(self, table: str = 'performance_metrics') -> Optional[Tuple[int, Any]]:
+        """
+        Id and timestamp of the oldest exported row.
+
+        Part files are named by the id range they hold, so only the file
+        starting at the lowest id is opened.
+
+        :param table: 'request_samples' or 'performance_metrics'
+        :return: (id, timestamp), None when nothing was exported yet
+        """
+        first = None
+        for directory, _, filenames in os.walk(os.path.join(self.root, table)):
+            for name in filenames:
+                if name.startswith('part-') and name.endswith('.parquet'):
+                    start = int(name.split('-')[1])
+                    if first is None or start < first[0]:
+                        first = (start, os.path.join(directory, name))
+        if first is None:
+            return None
+        row = pq.read_table(first[1], columns=['id', 'timestamp']).sort_by('id').slice(0, 1).to_pylist()[0]
+        return row['id'], row['timestamp']
+
+    def mean_metrics_per_model(self, columns: Sequence[str], models: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Average aggregate metrics per model, computed in Arrow.
+
+        :param columns: Metric columns to average
+        :param models: Restrict to these models, all models when omitted
+        :return: DataFrame indexed by model name with one column per metric plus ``run_count``
+        """
+        table = pa.Table.from_pandas(self.read('performance_metrics', ['id', 'model_name'] + list(columns), models),
+                                     preserve_index=False)
+        if table.num_rows == 0:
+            return pd.DataFrame(columns=['run_count'] + list(columns)).rename_axis('model_name')
+        grouped = table.group_by('model_name').aggregate([('id', 'count')] + [(column, 'mean') for column in columns])
+        df = grouped.to_pandas().rename(columns={'id_count': 'run_count', **{f'{c}_mean': c for c in columns}})
+        return df.set_index('model_name')[['run_count'] + list(columns)].sort_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export benchmark history to partitioned Parquet")
+    parser.add_argument('db_path', nargs='?', default='reports/model_performance.db')
+    parser.add_argument('--out', default='reports/columnar', help="Dataset root directory")
+    parser.add_argument('--compact', action='store_true', help="Merge small part files after exporting")
+    parser.add_argument('--min-files', type=int, default=8, help="Part files that trigger compaction")
+    args = parser.parse_args()
+
+    try:
+        exporter = ColumnarExporter(args.db_path, args.out)
+        exported = exporter.export()
+        compacted = exporter.compact(args.min_files) if args.compact else 0
+    except (ImportError, sqlite3.Error) as e:
+        print(f"Error exporting benchmark history: {e}")
+        sys.exit(1)
+
+    for table, rows in exported.items():
+        print(f"Exported {rows} new {table} rows to {args.out}/{table}")
+    if args.compact:
+        print(f"Compacted {compacted} partitions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+
+def cache_key(model: str, messages: List[Dict[str, Any]], temperature: Optional[float] = None,
+              top_p: Optional[float] = None, max_tokens: Optional[int] = None, **params) -> str:
+    """
+    Content address of a chat completion request.
+
+    :param model: Model name
+    :param messages: Chat messages
+    :param temperature: Sampling temperature, None for the provider default
+    :param top_p: Nucleus sampling mass, None for the provider default
+    :param max_tokens: Completion token limit
+    :param params: Any other request parameters that change the output
+    :return: SHA-256 hex digest of the canonical request
+    """
+    request = {
+        'model': model,
+        'messages': messages,
+        'temperature': temperature,
+        'top_p': top_p,
+        'max_tokens': max_tokens,
+        **params
+    }
+    canonical = json.dumps(request, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def is_deterministic(temperature: Optional[float] = None, top_p: Optional[float] = None) -> bool:
+    """
+    Whether a request samples greedily, so repeating it should give the same answer.
+
+    Providers default to temperature 1, so an unset temperature counts as sampling.
+
+    :param temperature: Sampling temperature
+    :param top_p: Nucleus sampling mass
+    :return: True for greedy decoding
+    """
+    return temperature == 0 or top_p == 0
+
+
+class CompletionCache:
+    """
+    Disk-backed, content-addressed cache of chat completion responses.
+
+    Entries live in a SQLite table keyed by ``cache_key``, stored
+    zlib-compressed and evicted least-recently-used first once the table
+    grows beyond ``max_bytes``. Entries older than ``ttl_seconds`` are
+    treated as misses and removed. Hit, miss, bypass and byte counters
+    describe what the cache saved during the process.
+    """
+
+    def __init__(self, path: str = 'reports/completion_cache.db', max_bytes: int = 256 * 1024 * 1024,
+                 ttl_seconds: Optional[float] = 7 * 24 * 3600, clock: Callable[[], float] = time.time):
+        """
+        Initialize the cache, creating its database if needed.
+
+        :param path: Path to the SQLite cache database
+        :param max_bytes: Size bound of the stored (compressed) responses
+        :param ttl_seconds: Maximum entry age, None keeps entries until evicted
+        :param clock: Wall clock in seconds
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+        self.bytes_served = 0
+        self.bytes_stored = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS completion_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                payload BLOB,
+                size_bytes INTEGER,
+                created_at REAL,
+                last_access REAL
+            )
+        ''')
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_completion_cache_last_access ON completion_cache (last_access)"
+        )
+        self.conn.commit()
+        # Running total so eviction checks do not scan the table on every write
+        self._size_bytes = self.conn.execute(
+            "SELECT COALESCE(SUM(size_bytes), 0) FROM completion_cache"
+        ).fetchone()[0]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+
+        :param key: Cache key from ``cache_key``
+        :return: Response dictionary, None on a miss
+        """
+        with self._lock:
+            now = self.clock()
+            row = self.conn.execute(
+                "SELECT payload, size_bytes, created_at FROM completion_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[2] > self.ttl_seconds:
+                self.conn.execute("DELETE FROM completion_cache WHERE key = ?", (key,))
+                self.conn.commit()
+                self._size_bytes -= row[1]
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.conn.execute("UPDATE completion_cache SET last_access = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+            self.bytes_served += row[1]
+            return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key: str, model: str, response: Dict[str, Any]):
+        """
+        Store a response, evicting least recently used entries beyond ``max_bytes``.
+
+        :param key: Cache key from ``cache_key``
+        :param model: Model name, kept for inspection
+        :param response: JSON-serializable response
+        """
+        payload = zlib.compress(json.dumps(response, separators=(',', ':')).encode('utf-8'))
+        with self._lock:
+            now = self.clock()
+            previous = self.conn.execute(
+                "SELECT size_bytes FROM completion_cache WHERE key = ?", (key,)
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO completion_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, payload, len(payload), now, now)
+            )
+            self.bytes_stored += len(payload)
+            self._size_bytes += len(payload) - (previous[0] if previous else 0)
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits ``max_bytes``."""
+        if self._size_bytes <= self.max_bytes:
+            return
+        cursor = self.conn.execute("SELECT key, size_bytes FROM completion_cache ORDER BY last_access")
+        victims = []
+        for key, size in cursor:
+            victims.append((key,))
+            self._size_bytes -= size
+            if self._size_bytes <= self.max_bytes:
+                break
+        cursor.close()
+        self.conn.executemany("DELETE FROM completion_cache WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self.conn.execute("DELETE FROM completion_cache")
+            self.conn.commit()
+            self._size_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            entries, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM completion_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypasses': self.bypasses,
+            'hit_rate': self.hits / lookups if lookups else None,
+            'evictions': self.evictions,
+            'bytes_served': self.bytes_served,
+            'bytes_stored': self.bytes_stored,
+            'entries': entries,
+            'size_bytes': size
+        }
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+
+class _CachedCompletions:
+    """``chat.completions`` namespace answering from a CompletionCache."""
+
+    def __init__(self, completions: Any, cache: CompletionCache, force: bool):
+        self._completions = completions
+        self._cache = cache
+        self._force = force
+
+    def create(self, **kwargs) -> Any:
+        """Create a chat completion, serving deterministic repeats from the cache."""
+        if kwargs.get('stream') or not (self._force or is_deterministic(kwargs.get('temperature'), kwargs.get('top_p'))):
+            # Streams are timed by their callers and sampled outputs are meant to differ
+            self._cache.bypasses += 1
+            return self._completions.create(**kwargs)
+
+        key = cache_key(**kwargs)
+        cached = self._cache.get(key)
+        if cached is not None:
+            from openai.types.chat import ChatCompletion
+            return ChatCompletion.construct(**cached)
+
+        response = self._completions.create(**kwargs)
+        self._cache.put(key, kwargs.get('model'), response.model_dump())
+        return response
+
+
+class CachingClient:
+    """
+    Wraps an OpenAI-compatible client so ``chat.completions.create`` is cached.
+
+    Only greedy (``temperature=0``) non-streaming requests are cached unless
+    ``force`` is set. Everything else on the client is passed through.
+    """
+
+    def __init__(self, client: Any, cache: CompletionCache, force: bool = False):
+        """
+        Initialize the wrapper.
+
+        :param client: OpenAI-compatible client
+        :param cache: Cache to serve from and fill
+        :param force: Cache sampled requests too
+        """
+        self._client = client
+        self.cache = cache
+        self.chat = type('Chat', (), {})()
+        self.chat.completions = _CachedCompletions(client.chat.completions, cache, force)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+def cached_client_from_env(client: Any, env_var: str = 'COMPLETION_CACHE',
+                           path: str = 'reports/completion_cache.db') -> Any:
+    """
+    Opt-in caching controlled by an environment variable.
+
+    ``COMPLETION_CACHE=1`` caches greedy requests, ``COMPLETION_CACHE=force``
+    caches every non-streaming request; unset or ``0`` leaves the client as is.
+
+    :param client: OpenAI-compatible client
+    :param env_var: Environment variable to read
+    :param path: Path to the SQLite cache database
+    :return: CachingClient, or the client itself when caching is off
+    """
+    mode = os.getenv(env_var, '').strip().lower()
+    if mode in ('', '0', 'false', 'off'):
+        return client
+    return CachingClient(client, CompletionCache(path), force=mode == 'force')
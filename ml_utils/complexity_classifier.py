@@ -0,0 +1,275 @@
+import os
+import copy
+import json
+import pickle
+import threading
+from functools import lru_cache
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.utils import murmurhash3_32
+
+
+class TaskComplexityClassifier:
+    """
+    Lightweight local classifier that infers task complexity from a task
+    description.
+
+    Descriptions are featurized with a stateless hashing vectorizer and scored
+    by a linear model, so training streams over the selection log in constant
+    memory and a single prediction stays well under a millisecond. Recent
+    descriptions are served from an LRU cache.
+
+    Training is incremental: the model and the log offset it has read up to
+    can be saved, and later runs only fit entries appended since. Each
+    training run fits a copy of the model and swaps it in when done, so
+    predictions can be served from another thread meanwhile.
+    """
+
+    COMPLEXITY_LEVELS = ['low', 'medium', 'high', 'extreme']
+
+    def __init__(self, n_features: int = 2 ** 18, cache_size: int = 4096,
+                 default_complexity: str = 'medium', batch_size: int = 1000):
+        """
+        Initialize an untrained classifier.
+
+        :param n_features: Width of the hashed feature space
+        :param cache_size: Number of recent descriptions kept in the LRU cache
+        :param default_complexity: Complexity returned until the model is trained
+        :param batch_size: Log entries per partial_fit step during training
+        """
+        self.default_complexity = default_complexity
+        self.batch_size = batch_size
+        self.n_features = n_features
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features,
+            ngram_range=(1, 2),
+            alternate_sign=False,
+            norm='l2'
+        )
+        self._analyzer = self.vectorizer.build_analyzer()
+        self.model = SGDClassifier(loss='log_loss', alpha=1e-5, random_state=0)
+        self.is_trained = False
+        self.training_samples = 0
+        # Byte offset of the selection log read so far, and the log's inode to detect rotation
+        self.log_offset = 0
+        self.log_inode = None
+        self._lock = threading.Lock()
+        self._cached_predict = lru_cache(maxsize=cache_size)(self._predict_uncached)
+
+    def _iter_log_examples(self, log_file: str, progress: Dict[str, int]) -> Iterator[Tuple[str, str]]:
+        """
+        Stream labelled examples from a model selection JSONL log.
+
+        Entries whose complexity was itself inferred are skipped so the
+        classifier never trains on its own predictions. A trailing line
+        without a newline may still be being written and is left for the
+        next run.
+
+        :param log_file: Path to the JSONL selection log
+        :param progress: Holds the byte 'offset' to start at, advanced past every complete line read
+        :return: Iterator of (description, complexity)
+        """
+        with open(log_file, 'rb') as f:
+            f.seek(progress['offset'])
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                progress['offset'] += len(line)
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                description = entry.get('task_description')
+                complexity = entry.get('task_complexity')
+                if entry.get('complexity_source') == 'inferred':
+                    continue
+                if description and complexity in self.COMPLEXITY_LEVELS:
+                    yield description, complexity
+
+    def train_from_log(self, log_file: str = 'logs/model_selection.jsonl') -> int:
+        """
+        Train on selection log entries appended since the last call.
+
+        The log is read from ``log_offset``; a log that was truncated or
+        replaced since is read from the start again.
+
+        :param log_file: Path to the JSONL selection log
+        :return: Number of examples trained on
+        """
+        if not os.path.exists(log_file):
+            return 0
+        stat = os.stat(log_file)
+        offset = self.log_offset
+        if stat.st_ino != self.log_inode or stat.st_size < offset:
+            offset = 0
+
+        progress = {'offset': offset}
+        seen = self.train(self._iter_log_examples(log_file, progress))
+        self.log_offset = progress['offset']
+        self.log_inode = stat.st_ino
+        return seen
+
+    def train(self, examples) -> int:
+        """
+        Train from (description, complexity) pairs with mini-batch partial_fit.
+
+        :param examples: Iterable of (description, complexity)
+        :return: Number of examples trained on
+        """
+        seen = 0
+        descriptions: List[str] = []
+        labels: List[str] = []
+
+        with self._lock:
+            model = copy.deepcopy(self.model)
+            for description, complexity in examples:
+                descriptions.append(description)
+                labels.append(complexity)
+                if len(descriptions) >= self.batch_size:
+                    self._partial_fit(model, descriptions, labels)
+                    seen += len(descriptions)
+                    descriptions, labels = [], []
+            if descriptions:
+                self._partial_fit(model, descriptions, labels)
+                seen += len(descriptions)
+
+            if seen:
+                self.model = model
+                self.is_trained = True
+                self.training_samples += seen
+                self._cached_predict.cache_clear()
+        return seen
+
+    def save(self, path: str):
+        """
+        Save the trained model and the log position it has read up to.
+
+        :param path: File to write
+        """
+        with self._lock:
+            state = {
+                'n_features': self.n_features,
+                'model': self.model,
+                'is_trained': self.is_trained,
+                'training_samples': self.training_samples,
+                'log_offset': self.log_offset,
+                'log_inode': self.log_inode
+            }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write then rename, so a concurrent load never sees a partial file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        """
+        Restore a model saved with ``save``.
+
+        :param path: File to read
+        :return: False if the file is missing, unreadable or from another feature width
+        """
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except Exception as e:
+            print(f"Error loading complexity model from {path}: {e}")
+            return False
+        if state.get('n_features') != self.n_features:
+            return False
+
+        with self._lock:
+            self.model = state['model']
+            self.is_trained = state['is_trained']
+            self.training_samples = state['training_samples']
+            self.log_offset = state['log_offset']
+            self.log_inode = state['log_inode']
+            self._cached_predict.cache_clear()
+        return True
+
+    def update_from_log(self, log_file: str, model_path: str) -> int:
+        """
+        Load the saved model, train on log entries added since it was saved, and save it again.
+
+        :param log_file: Path to the JSONL selection log
+        :param model_path: File the model and log position are kept in
+        :return: Number of new examples trained on
+        """
+        if not self.is_trained:
+            self.load(model_path)
+        seen = self.train_from_log(log_file)
+        if seen:
+            self.save(model_path)
+        return seen
+
+    def _partial_fit(self, model: SGDClassifier, descriptions: List[str], labels: List[str]):
+        """Fit one mini-batch into the given model."""
+        features = self.vectorizer.transform(descriptions)
+        model.partial_fit(features, labels, classes=self.COMPLEXITY_LEVELS)
+
+    def _hashed_features(self, description: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Hash one description into sparse (indices, values) features.
+
+        Produces the same features as ``self.vectorizer.transform`` without its
+        per-call sparse-matrix overhead, which dominates single predictions.
+
+        :param description: Task description
+        :return: Feature indices and l2-normalized values
+        """
+        counts = {}
+        for token in self._analyzer(description):
+            index = abs(murmurhash3_32(token, seed=0)) % self.n_features
+            counts[index] = counts.get(index, 0.0) + 1.0
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=float, count=len(counts))
+        if len(values):
+            values /= np.sqrt(np.dot(values, values))
+        return indices, values
+
+    def _predict_uncached(self, description: str) -> str:
+        """Score a single description with the linear model."""
+        indices, values = self._hashed_features(description)
+        model = self.model
+        # Gathering only the active weight columns keeps this in microseconds
+        scores = model.coef_[:, indices] @ values + model.intercept_
+        return str(model.classes_[int(np.argmax(scores))])
+
+    def predict(self, description: str) -> str:
+        """
+        Infer the complexity level of a task description.
+
+        :param description: Natural language task description
+        :return: One of COMPLEXITY_LEVELS
+        """
+        if not self.is_trained or not description:
+            return self.default_complexity
+        return self._cached_predict(description)
+
+    def predict_many(self, descriptions: List[str]) -> List[str]:
+        """
+        Infer complexity levels for several descriptions.
+
+        Distinct descriptions are vectorized and scored in a single pass.
+
+        :param descriptions: Task descriptions
+        :return: Complexity level for each description, in input order
+        """
+        if not self.is_trained:
+            return [self.default_complexity] * len(descriptions)
+
+        unique = list(dict.fromkeys(d for d in descriptions if d))
+        features = self.vectorizer.transform(unique) if unique else None
+        predictions = {}
+        if features is not None:
+            model = self.model
+            scores = features @ model.coef_.T + model.intercept_
+            for description, index in zip(unique, np.asarray(scores).argmax(axis=1)):
+                predictions[description] = str(model.classes_[int(index)])
+        return [predictions.get(d, self.default_complexity) for d in descriptions]
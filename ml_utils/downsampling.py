@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, from each of ``n_out - 2`` equal
+    buckets in between, the point forming the largest triangle with the
+    point kept from the previous bucket and the mean of the next bucket.
+    Peaks and dips therefore survive, unlike with striding or averaging.
+
+    :param x: Monotonically increasing x values
+    :param y: Y values, same length as ``x``
+    :param n_out: Number of points to keep
+    :return: Sorted indices of the kept points
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket b covers [edges[b], edges[b + 1]); the first and last points are kept as is
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(int) + 1
+    edges[-1] = n - 1
+    kept = np.empty(n_out, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+
+    selected = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = end, edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        ax, ay = x[selected], y[selected]
+        areas = np.abs((ax - next_x) * (y[start:end] - ay) - (ax - x[start:end]) * (next_y - ay))
+        selected = start + int(np.argmax(areas))
+        kept[bucket + 1] = selected
+
+    return kept
+
+
+def downsample_series(df: pd.DataFrame, x_column: str, y_column: str, max_points: int) -> pd.DataFrame:
+    """
+    Downsample one time series with LTTB, dropping rows without a value.
+
+    :param df: Rows of a single series ordered by ``x_column``
+    :param x_column: Numeric or datetime column
+    :param y_column: Value column
+    :param max_points: Maximum number of rows to return
+    :return: At most ``max_points`` rows of ``df``
+    """
+    series = df[df[y_column].notna()]
+    if len(series) <= max_points:
+        return series
+    x = series[x_column]
+    if pd.api.types.is_datetime64_any_dtype(x):
+        x = x.astype('int64')
+    return series.iloc[lttb_indices(x.to_numpy(), series[y_column].to_numpy(), max_points)]
@@ -0,0 +1,355 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np
+
+
+class HdrHistogram:
+    """
+    High-dynamic-range latency histogram.
+
+    Values are stored as integer microseconds in log-linear buckets: exact
+    below 2048 µs, then 1024 sub-buckets per power of two, so every recorded
+    value keeps three significant digits across the whole range. Recording is
+    O(1) and histograms merge by adding counts.
+    """
+
+    SUB_BUCKET_BITS = 11
+    SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+    SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+    def __init__(self, highest_trackable_ms: float = 3_600_000.0):
+        """
+        Initialize an empty histogram.
+
+        :param highest_trackable_ms: Largest value kept exactly; larger values are clamped to it
+        """
+        self.highest_trackable_us = int(highest_trackable_ms * 1000)
+        bucket_count = max(1, self.highest_trackable_us.bit_length() - self.SUB_BUCKET_BITS + 1)
+        self.counts = np.zeros(self.SUB_BUCKET_COUNT + (bucket_count - 1) * self.SUB_BUCKET_HALF, dtype=np.int64)
+        self.total_count = 0
+        self.clamped_count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def _index(self, value_us: int) -> int:
+        """Counts index of a value in microseconds."""
+        if value_us < self.SUB_BUCKET_COUNT:
+            return value_us
+        bucket = value_us.bit_length() - self.SUB_BUCKET_BITS
+        sub_bucket = value_us >> bucket
+        return self.SUB_BUCKET_COUNT + (bucket - 1) * self.SUB_BUCKET_HALF + (sub_bucket - self.SUB_BUCKET_HALF)
+
+    def _highest_equivalent_us(self, index: int) -> int:
+        """Largest microsecond value that maps to a counts index."""
+        if index < self.SUB_BUCKET_COUNT:
+            return index
+        bucket = (index - self.SUB_BUCKET_COUNT) // self.SUB_BUCKET_HALF + 1
+        sub_bucket = (index - self.SUB_BUCKET_COUNT) % self.SUB_BUCKET_HALF + self.SUB_BUCKET_HALF
+        return ((sub_bucket + 1) << bucket) - 1
+
+    def record(self, value_ms: float, count: int = 1):
+        """
+        Record a latency.
+
+        :param value_ms: Latency in milliseconds
+        :param count: Number of occurrences
+        """
+        value_us = max(int(round(value_ms * 1000)), 0)
+        if value_us > self.highest_trackable_us:
+            value_us = self.highest_trackable_us
+            self.clamped_count += count
+        self.counts[self._index(value_us)] += count
+        self.total_count += count
+        self.sum_ms += value_ms * count
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def record_corrected(self, value_ms: float, expected_interval_ms: float):
+        """
+        Record a latency from a closed-loop measurement, correcting for
+        coordinated omission.
+
+        A closed loop sends nothing while a slow response is outstanding, so
+        the requests that should have been issued during the stall are never
+        measured. For every expected interval the value exceeds, a synthetic
+        sample of the latency that request would have seen is added.
+
+        :param value_ms: Measured latency in milliseconds
+        :param expected_interval_ms: Intended time between requests in milliseconds
+        """
+        self.record(value_ms)
+        if expected_interval_ms <= 0:
+            return
+        missing_ms = value_ms - expected_interval_ms
+        while missing_ms >= expected_interval_ms:
+            self.record(missing_ms)
+            missing_ms -= expected_interval_ms
+
+    def merge(self, other: 'HdrHistogram'):
+        """
+        Add another histogram's counts to this one.
+
+        :param other: Histogram with the same trackable range
+        """
+        if other.highest_trackable_us != self.highest_trackable_us:
+            raise ValueError("Cannot merge histograms with different trackable ranges")
+        self.counts += other.counts
+        self.total_count += other.total_count
+        self.clamped_count += other.clamped_count
+        self.sum_ms += other.sum_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        Value at a percentile, reported as the highest value of its bucket.
+
+        :param percentile: Percentile in the range [0, 100]
+        :return: Latency in milliseconds, None for an empty histogram
+        """
+        if not 0 <= percentile <= 100:
+            raise ValueError("percentile must be in the range [0, 100]")
+        if self.total_count == 0:
+            return None
+        target = max(1, int(np.ceil(percentile / 100 * self.total_count)))
+        index = int(np.searchsorted(np.cumsum(self.counts), target))
+        return min(self._highest_equivalent_us(index) / 1000, self.max_ms)
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Exact mean of the recorded values."""
+        return self.sum_ms / self.total_count if self.total_count else None
+
+    def summary(self, percentiles: Sequence[float] = (50, 90, 99, 99.9)) -> Dict[str, Optional[float]]:
+        """
+        Summary statistics in milliseconds.
+
+        :param percentiles: Percentiles to include
+        :return: Dictionary with count, mean, max and one 'pNN' entry per percentile
+        """
+        summary = {'count': self.total_count, 'mean': self.mean, 'max': self.max_ms if self.total_count else None}
+        for percentile in percentiles:
+            summary[f"p{percentile:g}"] = self.percentile(percentile)
+        return summary
+
+
+@dataclass
+class LoadStepResult:
+    """Outcome of one constant-rate load step."""
+    target_rps: float
+    duration_s: float
+    offered: int = 0
+    completed: int = 0
+    errors: int = 0
+    dropped: int = 0
+    # Requests still running when the drain timeout expired
+    timed_out: int = 0
+    achieved_rps: float = 0.0
+    error_classes: Dict[str, int] = field(default_factory=dict)
+    latency: HdrHistogram = field(default_factory=HdrHistogram)
+    service_time: HdrHistogram = field(default_factory=HdrHistogram)
+
+    @property
+    def offered_rps(self) -> float:
+        """Rate actually offered by the Poisson schedule."""
+        return self.offered / self.duration_s if self.duration_s else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        """Share of offered requests that failed, were dropped or timed out."""
+        return (self.errors + self.dropped + self.timed_out) / self.offered if self.offered else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable view of the step."""
+        return {
+            'target_rps': self.target_rps,
+            'offered_rps': self.offered_rps,
+            'achieved_rps': self.achieved_rps,
+            'offered': self.offered,
+            'completed': self.completed,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'timed_out': self.timed_out,
+            'error_rate': self.error_rate,
+            'error_classes': self.error_classes,
+            'latency_ms': self.latency.summary(),
+            'service_time_ms': self.service_time.summary()
+        }
+
+
+class OpenLoopLoadGenerator:
+    """
+    Open-loop load generator with Poisson arrivals.
+
+    Requests are issued on a precomputed schedule, independent of how fast
+    earlier ones complete, and their latency is measured from the scheduled
+    send time. Time spent queued behind a saturated client or server is
+    therefore counted instead of silently omitted, which is the coordinated
+    omission a closed loop suffers from. The time from actual dispatch to
+    completion is tracked separately as service time.
+    """
+
+    def __init__(self, request_fn: Callable[[], Any], max_in_flight: int = 64,
+                 drain_timeout: float = 30.0, seed: Optional[int] = None):
+        """
+        Initialize the generator.
+
+        :param request_fn: Issues one request; raising marks the request as failed
+        :param max_in_flight: Maximum concurrent requests, further arrivals wait in a queue
+        :param drain_timeout: Seconds to wait for outstanding requests after a step;
+                              requests not started by then are dropped, running ones
+                              time out with their latency so far
+        :param seed: Seed for the arrival process
+        """
+        self.request_fn = request_fn
+        self.max_in_flight = max_in_flight
+        self.drain_timeout = drain_timeout
+        self._rng = np.random.default_rng(seed)
+
+    def arrival_offsets(self, rate_rps: float, duration_s: float) -> np.ndarray:
+        """
+        Poisson arrival times for one step.
+
+        :param rate_rps: Mean arrival rate
+        :param duration_s: Step length in seconds
+        :return: Sorted send offsets in seconds from the step start
+        """
+        if rate_rps <= 0:
+            return np.empty(0)
+        expected = rate_rps * duration_s
+        gaps = self._rng.exponential(1.0 / rate_rps, size=int(expected + 6 * np.sqrt(expected) + 10))
+        offsets = np.cumsum(gaps)
+        return offsets[offsets < duration_s]
+
+    def run_step(self, rate_rps: float, duration_s: float) -> LoadStepResult:
+        """
+        Offer load at a constant mean rate for a fixed duration.
+
+        :param rate_rps: Target requests per second
+        :param duration_s: Step length in seconds
+        :return: Step result with latency and service time histograms
+        """
+        result = LoadStepResult(target_rps=rate_rps, duration_s=duration_s)
+        lock = threading.Lock()
+        last_completion = [0.0]
+        recorded = set()
+        closed = [False]
+
+        def issue(index: int, scheduled_at: float):
+            started_at = time.perf_counter()
+            error_class = None
+            try:
+                self.request_fn()
+            except Exception as e:
+                error_class = type(e).__name__
+            finished_at = time.perf_counter()
+            with lock:
+                if closed[0]:
+                    # Already counted as timed out when the step ended
+                    return
+                recorded.add(index)
+                result.latency.record((finished_at - scheduled_at) * 1000)
+                result.service_time.record((finished_at - started_at) * 1000)
+                last_completion[0] = max(last_completion[0], finished_at)
+                if error_class is None:
+                    result.completed += 1
+                else:
+                    result.errors += 1
+                    result.error_classes[error_class] = result.error_classes.get(error_class, 0) + 1
+
+        offsets = self.arrival_offsets(rate_rps, duration_s)
+        result.offered = len(offsets)
+        executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        futures = []
+        pending = set()
+        start = time.perf_counter()
+        try:
+            for index, offset in enumerate(offsets):
+                scheduled_at = start + offset
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                # A late dispatch keeps its scheduled time, so the lag shows up as latency
+                futures.append(executor.submit(issue, index, scheduled_at))
+            _, pending = wait(futures, timeout=self.drain_timeout)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        with lock:
+            closed[0] = True
+            ended_at = time.perf_counter()
+            for index, future in enumerate(futures):
+                if future not in pending or index in recorded:
+                    continue
+                if future.cancelled():
+                    result.dropped += 1
+                else:
+                    # Still running: its latency is at least the time elapsed so far
+                    result.timed_out += 1
+                    result.latency.record((ended_at - (start + offsets[index])) * 1000)
+            # Completions trail arrivals by one service time even when nothing queues,
+            # so only time beyond that counts against throughput
+            service_s = (result.service_time.percentile(50) or 0.0) / 1000
+            window = max(duration_s, last_completion[0] - start - service_s)
+            result.achieved_rps = result.completed / window
+        return result
+
+    def ramp(self, rates: Sequence[float], step_duration_s: float, stop_after_knee: bool = True,
+             **knee_kwargs) -> List[LoadStepResult]:
+        """
+        Run increasing rate steps.
+
+        :param rates: Target requests per second of each step, ascending
+        :param step_duration_s: Length of every step in seconds
+        :param stop_after_knee: Stop once a step crosses the saturation knee
+        :param knee_kwargs: Thresholds passed to ``find_saturation_knee``
+        :return: Results of the steps that ran
+        """
+        steps = []
+        for rate in rates:
+            steps.append(self.run_step(rate, step_duration_s))
+            if stop_after_knee and find_saturation_knee(steps, **knee_kwargs)['knee_rps'] is not None:
+                break
+        return steps
+
+
+def find_saturation_knee(steps: Sequence[LoadStepResult], throughput_ratio: float = 0.9,
+                         latency_factor: float = 3.0, percentile: float = 99,
+                         max_error_rate: float = 0.05) -> Dict[str, Any]:
+    """
+    Locate the first rate step where the target stops being sustainable.
+
+    A step is past the knee when achieved throughput falls below
+    ``throughput_ratio`` of the offered rate, when its tail latency exceeds
+    ``latency_factor`` times that of the first step, or when the error rate
+    exceeds ``max_error_rate``.
+
+    :param steps: Step results in ascending rate order
+    :param throughput_ratio: Minimum achieved / offered throughput
+    :param latency_factor: Maximum tail latency relative to the lightest step
+    :param percentile: Tail percentile compared between steps
+    :param max_error_rate: Maximum tolerated error rate
+    :return: Dictionary with 'knee_rps', 'max_sustainable_rps' and 'reason'
+    """
+    baseline = None
+    max_sustainable = None
+    for step in steps:
+        tail = step.latency.percentile(percentile)
+        if baseline is None:
+            baseline = tail
+
+        reason = None
+        # Compared with the realized schedule so Poisson noise in short steps is not mistaken for saturation
+        if step.offered and step.achieved_rps < throughput_ratio * step.offered_rps:
+            reason = f"throughput {step.achieved_rps:.1f} rps below {throughput_ratio:.0%} of offered {step.offered_rps:.1f} rps"
+        elif step.error_rate > max_error_rate:
+            reason = f"error rate {step.error_rate:.1%} above {max_error_rate:.0%}"
+        elif tail is not None and baseline is not None and tail > latency_factor * baseline:
+            reason = f"p{percentile:g} latency {tail:.0f} ms above {latency_factor:g}x baseline {baseline:.0f} ms"
+
+        if reason is not None:
+            return {'knee_rps': step.target_rps, 'max_sustainable_rps': max_sustainable, 'reason': reason}
+        max_sustainable = step.target_rps
+
+    return {'knee_rps': None, 'max_sustainable_rps': max_sustainable, 'reason': None}
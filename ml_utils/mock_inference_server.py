@@ -0,0 +1,300 @@
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+VOCABULARY = (
+    "the model response token latency stream benchmark quantum function return value system "
+    "request data performance analysis result context example process output design network "
+    "memory compute layer signal error cache throughput scale queue policy metric sample"
+).split()
+
+
+@dataclass
+class MockServerConfig:
+    """
+    Behaviour of the mock inference server.
+
+    Time to first token is drawn from a lognormal distribution around
+    ``ttft_median_ms``, per-request decode speed from a normal distribution
+    around ``tokens_per_second``. Every random draw comes from a generator
+    seeded with ``seed``, the request body and how often that body has been
+    seen, so a run replays identically regardless of request interleaving.
+    """
+    seed: int = 0
+    ttft_median_ms: float = 300.0
+    ttft_sigma: float = 0.4
+    tokens_per_second: float = 60.0
+    tokens_per_second_std: float = 10.0
+    min_tokens_per_second: float = 1.0
+    completion_tokens: int = 200
+    rate_limit_rate: float = 0.0
+    server_error_rate: float = 0.0
+    server_error_codes: Tuple[int, ...] = (500, 502, 503)
+    retry_after_seconds: float = 1.0
+    models: List[str] = field(default_factory=lambda: ['deepseek-ai/deepseek-r1', 'gpt-3.5-turbo'])
+
+
+class MockInferenceServer:
+    """
+    Local OpenAI-compatible chat completions server for offline testing.
+
+    Serves ``/v1/chat/completions`` (streaming and non-streaming) and
+    ``/v1/models`` with configurable latency, throughput and injected 429/5xx
+    errors carrying ``Retry-After``. Point clients at ``base_url`` instead of
+    the hosted endpoint.
+    """
+
+    def __init__(self, config: Optional[MockServerConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        """
+        Initialize the server without starting it.
+
+        :param config: Server behaviour, defaults to MockServerConfig()
+        :param host: Interface to bind
+        :param port: Port to bind, 0 picks a free one
+        """
+        self.config = config or MockServerConfig()
+        self.requests_served = 0
+        self.connections_accepted = 0
+        self._occurrences: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to configure OpenAI-compatible clients with."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> 'MockInferenceServer':
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='mock-inference-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve requests on the calling thread until interrupted."""
+        self._httpd.serve_forever()
+
+    def stop(self):
+        """Stop serving and release the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'MockInferenceServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _request_rng(self, body: bytes) -> random.Random:
+        """
+        Seeded generator for one request.
+
+        :param body: Raw request body
+        :return: Generator keyed on the seed, body digest and repeat count
+        """
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        with self._lock:
+            occurrence = self._occurrences.get(digest, 0)
+            self._occurrences[digest] = occurrence + 1
+            self.requests_served += 1
+        return random.Random(f"{self.config.seed}:{digest}:{occurrence}")
+
+    def plan_request(self, rng: random.Random, max_tokens: Optional[int]) -> Dict[str, Any]:
+        """
+        Draw the outcome and timing of one request.
+
+        :param rng: Request generator from ``_request_rng``
+        :param max_tokens: Completion token limit requested by the client
+        :return: Dictionary with 'error_status' or 'ttft_s', 'token_interval_s' and 'tokens'
+        """
+        config = self.config
+        draw = rng.random()
+        if draw < config.rate_limit_rate:
+            return {'error_status': 429}
+        if draw < config.rate_limit_rate + config.server_error_rate:
+            return {'error_status': rng.choice(config.server_error_codes)}
+
+        rate = max(rng.gauss(config.tokens_per_second, config.tokens_per_second_std), config.min_tokens_per_second)
+        tokens = config.completion_tokens if max_tokens is None else min(config.completion_tokens, max_tokens)
+        return {
+            'ttft_s': rng.lognormvariate(0.0, config.ttft_sigma) * config.ttft_median_ms / 1000,
+            'token_interval_s': 1.0 / rate,
+            'tokens': [rng.choice(VOCABULARY) for _ in range(max(tokens, 1))]
+        }
+
+    def _handler_class(self):
+        """Build the request handler bound to this server."""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections_accepted += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.rstrip('/') in ('/v1/models', '/models'):
+                    self._send_json(200, {
+                        'object': 'list',
+                        'data': [{'id': model, 'object': 'model', 'owned_by': 'mock'} for model in server.config.models]
+                    })
+                else:
+                    self._send_json(404, {'error': {'message': f"Unknown path {self.path}", 'type': 'not_found'}})
+
+            def do_POST(self):
+                if self.path.rstrip('/') not in ('/v1/chat/completions', '/chat/completions'):
+                    self._send_json(404, {'error': {'message': f"Unknown path {self.path}", 'type': 'not_found'}})
+                    return
+
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                try:
+                    request = json.loads(body)
+                    messages = request['messages']
+                except (ValueError, KeyError) as e:
+                    self._send_json(400, {'error': {'message': f"Invalid request: {e}", 'type': 'invalid_request_error'}})
+                    return
+
+                plan = server.plan_request(server._request_rng(body), request.get('max_tokens'))
+                if 'error_status' in plan:
+                    status = plan['error_status']
+                    self._send_json(status, {'error': {
+                        'message': 'Rate limit exceeded' if status == 429 else 'Injected server error',
+                        'type': 'rate_limit_error' if status == 429 else 'server_error',
+                        'code': status
+                    }}, headers={'Retry-After': f"{server.config.retry_after_seconds:g}"})
+                    return
+
+                completion_id = f"chatcmpl-mock-{server.requests_served}"
+                created = int(time.time())
+                model = request.get('model', server.config.models[0])
+                prompt_tokens = sum(len(str(message.get('content', '')).split()) for message in messages)
+                usage = {
+                    'prompt_tokens': prompt_tokens,
+                    'completion_tokens': len(plan['tokens']),
+                    'total_tokens': prompt_tokens + len(plan['tokens'])
+                }
+
+                if request.get('stream'):
+                    include_usage = bool((request.get('stream_options') or {}).get('include_usage'))
+                    self._stream(plan, completion_id, created, model, usage if include_usage else None)
+                    return
+
+                time.sleep(plan['ttft_s'] + plan['token_interval_s'] * (len(plan['tokens']) - 1))
+                self._send_json(200, {
+                    'id': completion_id,
+                    'object': 'chat.completion',
+                    'created': created,
+                    'model': model,
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': ' '.join(plan['tokens'])},
+                        'finish_reason': 'length'
+                    }],
+                    'usage': usage
+                })
+
+            def _stream(self, plan: Dict[str, Any], completion_id: str, created: int, model: str,
+                        usage: Optional[Dict[str, int]]):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+
+                def event(choices: List[Dict[str, Any]], extra: Optional[Dict[str, Any]] = None):
+                    payload = {
+                        'id': completion_id,
+                        'object': 'chat.completion.chunk',
+                        'created': created,
+                        'model': model,
+                        'choices': choices,
+                        **(extra or {})
+                    }
+                    self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+                    self.wfile.flush()
+
+                try:
+                    event([{'index': 0, 'delta': {'role': 'assistant', 'content': ''}, 'finish_reason': None}])
+                    # Sleep against absolute deadlines so write overhead does not slow the stream
+                    deadline = time.monotonic() + plan['ttft_s']
+                    for index, token in enumerate(plan['tokens']):
+                        time.sleep(max(0.0, deadline - time.monotonic()))
+                        content = token if index == 0 else f" {token}"
+                        event([{'index': 0, 'delta': {'content': content}, 'finish_reason': None}])
+                        deadline += plan['token_interval_s']
+                    event([{'index': 0, 'delta': {}, 'finish_reason': 'length'}])
+                    if usage is not None:
+                        event([], {'usage': usage})
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client cancelled the stream
+                    pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock inference server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ttft-ms', type=float, default=300.0, help="Median time to first token")
+    parser.add_argument('--ttft-sigma', type=float, default=0.4, help="Lognormal sigma of time to first token")
+    parser.add_argument('--tokens-per-second', type=float, default=60.0)
+    parser.add_argument('--tokens-per-second-std', type=float, default=10.0)
+    parser.add_argument('--completion-tokens', type=int, default=200)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument('--server-error-rate', type=float, default=0.0, help="Fraction of requests answered with 5xx")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="Retry-After seconds on injected errors")
+    args = parser.parse_args()
+
+    server = MockInferenceServer(MockServerConfig(
+        seed=args.seed,
+        ttft_median_ms=args.ttft_ms,
+        ttft_sigma=args.ttft_sigma,
+        tokens_per_second=args.tokens_per_second,
+        tokens_per_second_std=args.tokens_per_second_std,
+        completion_tokens=args.completion_tokens,
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate,
+        retry_after_seconds=args.retry_after
+    ), host=args.host, port=args.port)
+
+    print(f"Mock inference server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
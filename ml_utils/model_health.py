@@ -0,0 +1,200 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class CircuitState:
+    """Circuit breaker states."""
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+
+class ModelHealth:
+    """Health state of a single model endpoint."""
+
+    __slots__ = ('ewma_error_rate', 'ewma_latency_ms', 'samples', 'state', 'opened_at',
+                 'probes_in_flight', 'probe_successes', 'last_probe_at')
+
+    def __init__(self):
+        self.ewma_error_rate = 0.0
+        self.ewma_latency_ms: Optional[float] = None
+        self.samples = 0
+        self.state = CircuitState.CLOSED
+        self.opened_at: Optional[float] = None
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+        self.last_probe_at: Optional[float] = None
+
+
+class ModelHealthTracker:
+    """
+    Per-model health tracking with a closed / open / half-open circuit breaker.
+
+    Error rate and latency are tracked as EWMAs. A closed circuit opens when
+    either crosses its threshold; an open circuit is excluded from selection
+    until ``open_duration`` has passed, then lets a limited number of probe
+    requests through. Enough successful probes close it again, a failed probe
+    reopens it. The clock is injectable so all transitions can be driven
+    offline.
+    """
+
+    def __init__(self, ewma_alpha: float = 0.2, error_rate_threshold: float = 0.5,
+                 latency_threshold_ms: Optional[float] = None, min_samples: int = 5,
+                 open_duration: float = 30.0, half_open_max_probes: int = 1,
+                 probe_success_threshold: int = 2, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the tracker.
+
+        :param ewma_alpha: Weight of the newest observation in the EWMAs
+        :param error_rate_threshold: EWMA error rate (0-1) that opens the circuit
+        :param latency_threshold_ms: EWMA latency that opens the circuit, None to ignore latency
+        :param min_samples: Observations required before a closed circuit may open
+        :param open_duration: Seconds an open circuit waits before allowing probes
+        :param half_open_max_probes: Concurrent probe requests allowed while half-open
+        :param probe_success_threshold: Successful probes needed to close the circuit
+        :param clock: Monotonic time source in seconds
+        """
+        self.ewma_alpha = ewma_alpha
+        self.error_rate_threshold = error_rate_threshold
+        self.latency_threshold_ms = latency_threshold_ms
+        self.min_samples = min_samples
+        self.open_duration = open_duration
+        self.half_open_max_probes = half_open_max_probes
+        self.probe_success_threshold = probe_success_threshold
+        self.clock = clock
+
+        self.models: Dict[str, ModelHealth] = {}
+        self._lock = threading.Lock()
+
+    def _health(self, model: str) -> ModelHealth:
+        """Return the health record of a model, creating a closed one if needed."""
+        health = self.models.get(model)
+        if health is None:
+            health = self.models[model] = ModelHealth()
+        return health
+
+    def _open(self, health: ModelHealth):
+        """Trip the circuit."""
+        health.state = CircuitState.OPEN
+        health.opened_at = self.clock()
+        health.probes_in_flight = 0
+        health.probe_successes = 0
+
+    def _close(self, health: ModelHealth):
+        """Close the circuit with fresh statistics."""
+        health.state = CircuitState.CLOSED
+        health.opened_at = None
+        health.ewma_error_rate = 0.0
+        health.ewma_latency_ms = None
+        health.samples = 0
+        health.probes_in_flight = 0
+        health.probe_successes = 0
+
+    def _is_unhealthy(self, health: ModelHealth) -> bool:
+        """Whether a closed circuit's EWMAs call for opening it."""
+        if health.samples < self.min_samples:
+            return False
+        if health.ewma_error_rate >= self.error_rate_threshold:
+            return True
+        return (
+            self.latency_threshold_ms is not None
+            and health.ewma_latency_ms is not None
+            and health.ewma_latency_ms >= self.latency_threshold_ms
+        )
+
+    def _advance(self, health: ModelHealth):
+        """
+        Move an open circuit to half-open once its open duration has passed,
+        and release probe slots whose outcome was never reported.
+        """
+        now = self.clock()
+        if health.state == CircuitState.OPEN and now - health.opened_at >= self.open_duration:
+            health.state = CircuitState.HALF_OPEN
+            health.probes_in_flight = 0
+            health.probe_successes = 0
+        elif health.state == CircuitState.HALF_OPEN and health.probes_in_flight \
+                and now - health.last_probe_at >= self.open_duration:
+            health.probes_in_flight = 0
+
+    def record(self, model: str, success: bool, latency_ms: Optional[float] = None):
+        """
+        Record the outcome of a request to a model.
+
+        :param model: Model that served the request
+        :param success: Whether the request succeeded
+        :param latency_ms: Request latency in milliseconds, if known
+        """
+        with self._lock:
+            health = self._health(model)
+            self._advance(health)
+
+            alpha = self.ewma_alpha
+            health.ewma_error_rate = (1 - alpha) * health.ewma_error_rate + alpha * (0.0 if success else 1.0)
+            if latency_ms is not None:
+                health.ewma_latency_ms = (
+                    latency_ms if health.ewma_latency_ms is None
+                    else (1 - alpha) * health.ewma_latency_ms + alpha * latency_ms
+                )
+            health.samples += 1
+
+            if health.state == CircuitState.HALF_OPEN:
+                health.probes_in_flight = max(0, health.probes_in_flight - 1)
+                too_slow = (
+                    self.latency_threshold_ms is not None
+                    and latency_ms is not None
+                    and latency_ms >= self.latency_threshold_ms
+                )
+                if not success or too_slow:
+                    self._open(health)
+                else:
+                    health.probe_successes += 1
+                    if health.probe_successes >= self.probe_success_threshold:
+                        self._close(health)
+            elif health.state == CircuitState.CLOSED and self._is_unhealthy(health):
+                self._open(health)
+
+    def state(self, model: str) -> str:
+        """
+        Current circuit state of a model.
+
+        :param model: Model name
+        :return: One of the CircuitState values
+        """
+        with self._lock:
+            health = self._health(model)
+            self._advance(health)
+            return health.state
+
+    def acquire_probe(self, models: List[str]) -> Optional[str]:
+        """
+        Reserve a probe slot on the first half-open model that has one free.
+
+        :param models: Candidate models
+        :return: Model to send a probe request to, or None
+        """
+        with self._lock:
+            for model in models:
+                health = self._health(model)
+                self._advance(health)
+                if health.state == CircuitState.HALF_OPEN and health.probes_in_flight < self.half_open_max_probes:
+                    health.probes_in_flight += 1
+                    health.last_probe_at = self.clock()
+                    return model
+        return None
+
+    def closed_models(self, models: List[str]) -> List[str]:
+        """
+        Filter models down to those whose circuit is closed.
+
+        :param models: Candidate models
+        :return: Models eligible for regular traffic, in input order
+        """
+        with self._lock:
+            eligible = []
+            for model in models:
+                health = self._health(model)
+                self._advance(health)
+                if health.state == CircuitState.CLOSED:
+                    eligible.append(model)
+            return eligible
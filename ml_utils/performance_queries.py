@@ -0,0 +1,511 @@
+import sqlite3
+import threading
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+from downsampling import downsample_series
+
+
+class PerformanceQueries:
+    """
+    Query layer over the SQLite performance database.
+
+    Per-model aggregation (latest row, means, percentiles) is pushed into
+    indexed SQL so callers never materialize the whole ``performance_metrics``
+    table in pandas.
+    """
+
+    METRIC_COLUMNS = (
+        'total_queries',
+        'avg_response_time',
+        'median_response_time',
+        'avg_token_generation_rate',
+        'task_success_rate',
+        'error_rate',
+        'total_execution_time'
+    )
+
+    def __init__(self, performance_db_path: str):
+        """
+        Initialize the query layer for a performance database.
+
+        :param performance_db_path: Path to SQLite performance tracking database
+        """
+        self.performance_db_path = performance_db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._indexed = False
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Long-lived connection, opened lazily with indexes in place."""
+        with self._lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.performance_db_path, check_same_thread=False)
+                self._conn.row_factory = sqlite3.Row
+            if not self._indexed:
+                self.ensure_indexes()
+            return self._conn
+
+    def ensure_indexes(self):
+        """
+        Create the ``(model_name, timestamp)`` index on existing databases.
+
+        Failures are ignored so queries still work, just without the index.
+        While the table does not exist yet, creation is retried on every
+        query until it appears; other failures (such as a read-only
+        database) are not retried.
+        """
+        try:
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_performance_metrics_model_timestamp "
+                "ON performance_metrics (model_name, timestamp)"
+            )
+            self._conn.commit()
+            self._indexed = True
+        except sqlite3.Error as e:
+            self._indexed = 'no such table' not in str(e)
+
+    def _validate_columns(self, columns: Sequence[str]) -> List[str]:
+        """
+        Reject anything that is not a known metric column.
+
+        Column names are interpolated into SQL, so they must come from the
+        fixed allowlist.
+
+        :param columns: Requested metric columns
+        :return: Validated column names
+        """
+        unknown = [column for column in columns if column not in self.METRIC_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown performance metric columns: {unknown}")
+        return list(columns)
+
+    def _runs_source(self, last_n: Optional[int]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Build the row source for aggregates, optionally limited to the
+        newest ``last_n`` runs of each model.
+
+        :param last_n: Number of most recent runs per model, None for all
+        :return: SQL fragment and its parameters
+        """
+        if last_n is None:
+            return "performance_metrics", {}
+        return (
+            """
+            (SELECT * FROM (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY model_name ORDER BY timestamp DESC, id DESC
+                ) AS run_rank
+                FROM performance_metrics
+            ) WHERE run_rank <= :last_n)
+            """,
+            {'last_n': last_n}
+        )
+
+    def list_models(self) -> List[str]:
+        """
+        List the distinct model names in the database.
+
+        Walks the ``(model_name, timestamp)`` index with a recursive skip-scan,
+        so the cost grows with the number of models rather than rows.
+
+        :return: Sorted model names
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                """
+                WITH RECURSIVE models(name) AS (
+                    SELECT MIN(model_name) FROM performance_metrics
+                    UNION ALL
+                    SELECT (SELECT MIN(model_name) FROM performance_metrics WHERE model_name > models.name)
+                    FROM models WHERE models.name IS NOT NULL
+                )
+                SELECT name FROM models WHERE name IS NOT NULL
+                """
+            ).fetchall()
+        return [row['name'] for row in rows]
+
+    def latest_metrics_per_model(self, models: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Return the newest metrics row of every model.
+
+        Each row is found with a single index seek on ``(model_name, timestamp)``.
+
+        :param models: Models to look up, all models when omitted
+        :return: Mapping of model name to its latest metrics
+        """
+        if models is None:
+            models = self.list_models()
+
+        latest = {}
+        with self._lock:
+            for model in models:
+                row = self.conn.execute(
+                    """
+                    SELECT * FROM performance_metrics
+                    WHERE model_name = ?
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT 1
+                    """,
+                    (model,)
+                ).fetchone()
+                if row is not None:
+                    latest[model] = dict(row)
+        return latest
+
+    def mean_metrics_per_model(self, columns: Sequence[str] = METRIC_COLUMNS,
+                               last_n: Optional[int] = None) -> pd.DataFrame:
+        """
+        Average metrics per model.
+
+        :param columns: Metric columns to average
+        :param last_n: Only average the newest ``last_n`` runs of each model
+        :return: DataFrame indexed by model name with one column per metric
+                 plus ``run_count``
+        """
+        columns = self._validate_columns(columns)
+        source, params = self._runs_source(last_n)
+        averages = ', '.join(f'AVG({column}) AS {column}' for column in columns)
+        query = f"""
+            SELECT model_name, COUNT(*) AS run_count, {averages}
+            FROM {source}
+            GROUP BY model_name
+            ORDER BY model_name
+        """
+        with self._lock:
+            df = pd.read_sql_query(query, self.conn, params=params)
+        return df.set_index('model_name')
+
+    def percentile_metrics_per_model(self, columns: Sequence[str], percentile: float,
+                                     last_n: Optional[int] = None) -> pd.DataFrame:
+        """
+        Nearest-rank percentile of metrics per model, computed with window
+        functions inside SQLite.
+
+        :param columns: Metric columns to summarize
+        :param percentile: Percentile in the range (0, 100]
+        :param last_n: Only consider the newest ``last_n`` runs of each model
+        :return: DataFrame indexed by model name with one column per metric
+        """
+        if not 0 < percentile <= 100:
+            raise ValueError("percentile must be in the range (0, 100]")
+        columns = self._validate_columns(columns)
+        source, params = self._runs_source(last_n)
+        params = dict(params, fraction=percentile / 100)
+
+        per_column = []
+        with self._lock:
+            for column in columns:
+                query = f"""
+                    SELECT model_name, value AS {column} FROM (
+                        SELECT model_name, {column} AS value,
+                            ROW_NUMBER() OVER (PARTITION BY model_name ORDER BY {column}) AS value_rank,
+                            COUNT(*) OVER (PARTITION BY model_name) AS value_count
+                        FROM {source}
+                        WHERE {column} IS NOT NULL
+                    )
+                    WHERE value_rank = MAX(1,
+                        CAST(:fraction * value_count AS INTEGER)
+                        + (:fraction * value_count > CAST(:fraction * value_count AS INTEGER)))
+                """
+                per_column.append(
+                    pd.read_sql_query(query, self.conn, params=params).set_index('model_name')
+                )
+
+        if not per_column:
+            return pd.DataFrame()
+        return pd.concat(per_column, axis=1).sort_index()
+
+    def overall_mean(self, column: str) -> Optional[float]:
+        """
+        Mean of a metric across all models and runs.
+
+        :param column: Metric column
+        :return: Mean value, None when there is no data
+        """
+        column = self._validate_columns([column])[0]
+        with self._lock:
+            return self.conn.execute(f"SELECT AVG({column}) FROM performance_metrics").fetchone()[0]
+
+    def overall_percentile(self, column: str, percentile: float) -> Optional[float]:
+        """
+        Nearest-rank percentile of a metric across all models and runs.
+
+        :param column: Metric column
+        :param percentile: Percentile in the range (0, 100]
+        :return: Percentile value, None when there is no data
+        """
+        if not 0 < percentile <= 100:
+            raise ValueError("percentile must be in the range (0, 100]")
+        column = self._validate_columns([column])[0]
+        with self._lock:
+            count = self.conn.execute(
+                f"SELECT COUNT({column}) FROM performance_metrics"
+            ).fetchone()[0]
+            if not count:
+                return None
+            rank = max(1, -(-count * percentile // 100))
+            row = self.conn.execute(
+                f"""
+                SELECT {column} FROM performance_metrics
+                WHERE {column} IS NOT NULL
+                ORDER BY {column}
+                LIMIT 1 OFFSET ?
+                """,
+                (int(rank) - 1,)
+            ).fetchone()
+        return row[0]
+
+    def metric_history(self, columns: Sequence[str], models: Optional[Sequence[str]] = None,
+                       after_id: Optional[int] = None) -> pd.DataFrame:
+        """
+        Time series of selected metrics, read only for the requested columns.
+
+        :param columns: Metric columns to include
+        :param models: Restrict to these models, all models when omitted
+        :param after_id: Only return rows with a larger id, ordered by id, for incremental fetching
+        :return: DataFrame with id, timestamp, model_name and the metric columns
+        """
+        columns = self._validate_columns(columns)
+        selected = ', '.join(['id', 'timestamp', 'model_name'] + columns)
+        query = f"SELECT {selected} FROM performance_metrics"
+        conditions = []
+        params: List[Any] = []
+        if models is not None:
+            conditions.append(f"model_name IN ({', '.join('?' for _ in models)})")
+            params.extend(models)
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id" if after_id is not None else " ORDER BY model_name, timestamp"
+        with self._lock:
+            return pd.read_sql_query(query, self.conn, params=params)
+
+    def max_id(self) -> int:
+        """
+        Largest ``performance_metrics`` row id.
+
+        :return: Row id, 0 for an empty table
+        """
+        with self._lock:
+            return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM performance_metrics").fetchone()[0]
+
+    def watermark(self) -> Tuple[int, int]:
+        """
+        Cheap change marker of the performance table.
+
+        ``PRAGMA data_version`` only moves when another connection commits,
+        and ``MAX(id)`` tells appended rows from deleted ones.
+
+        :return: (data_version, max row id)
+        """
+        with self._lock:
+            data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            return data_version, self.max_id()
+
+    def rows_after(self, after_id: int) -> List[Dict[str, Any]]:
+        """
+        Full ``performance_metrics`` rows with an id above ``after_id``.
+
+        :param after_id: Highest row id already seen
+        :return: Rows as dictionaries, ordered by id
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT * FROM performance_metrics WHERE id > ? ORDER BY id", (after_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def first_row_key(self) -> Optional[Tuple[int, Any]]:
+        """
+        Id and timestamp of the oldest ``performance_metrics`` row.
+
+        Identifies the database's history: a rebuilt or pruned database has
+        a different first row even when it holds as many rows as before.
+
+        :return: (id, timestamp), None for an empty table
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT id, timestamp FROM performance_metrics ORDER BY id LIMIT 1"
+            ).fetchone()
+        return (row['id'], row['timestamp']) if row is not None else None
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._indexed = False
+
+
+class _ModelSeries:
+    """Growable arrays holding one model's rows in timestamp order."""
+
+    def __init__(self, n_columns: int):
+        self.size = 0
+        self.ids = np.empty(0, dtype=np.int64)
+        self.timestamps = np.empty(0, dtype='datetime64[ns]')
+        self.values = np.empty((0, n_columns))
+
+    def _reserve(self, size: int):
+        """Grow the arrays geometrically so appends are amortized constant time per row."""
+        if size <= len(self.ids):
+            return
+        capacity = max(size, 2 * len(self.ids), 64)
+        for name in ('ids', 'timestamps', 'values'):
+            current = getattr(self, name)
+            grown = np.empty((capacity,) + current.shape[1:], dtype=current.dtype)
+            grown[:self.size] = current[:self.size]
+            setattr(self, name, grown)
+
+    def append(self, ids: np.ndarray, timestamps: np.ndarray, values: np.ndarray):
+        """
+        Append rows fetched in id order.
+
+        Rows normally arrive in timestamp order too; only when one is older
+        than the rows already held is the model's series re-sorted.
+
+        :param ids: Row ids
+        :param timestamps: Row timestamps
+        :param values: Metric values, one column per tracked metric
+        """
+        start, end = self.size, self.size + len(ids)
+        self._reserve(end)
+        self.ids[start:end] = ids
+        self.timestamps[start:end] = timestamps
+        self.values[start:end] = values
+        self.size = end
+
+        tail = self.timestamps[max(start - 1, 0):end]
+        if not np.all(tail[1:] >= tail[:-1]):
+            order = np.argsort(self.timestamps[:end], kind='stable')
+            self.ids[:end] = self.ids[:end][order]
+            self.timestamps[:end] = self.timestamps[:end][order]
+            self.values[:end] = self.values[:end][order]
+
+    def frame(self, columns: Sequence[str], selected: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Rows as a DataFrame with id, timestamp and the metric columns.
+
+        :param columns: Names of the metric columns held
+        :param selected: Metric columns to include, all when omitted
+        :return: DataFrame of the model's rows in timestamp order
+        """
+        selected = columns if selected is None else selected
+        data = {'id': self.ids[:self.size], 'timestamp': self.timestamps[:self.size]}
+        for column in selected:
+            data[column] = self.values[:self.size, list(columns).index(column)]
+        return pd.DataFrame(data)
+
+
+class IncrementalMetricHistory:
+    """
+    Metric time series kept in memory and extended with only the new rows.
+
+    ``refresh`` fetches rows past the last seen id, so repeated reads (for
+    example on every Streamlit rerun) cost a single indexed range scan. New
+    rows are appended to per-model arrays, so only the models that received
+    rows change, and the downsampled series of each model is cached until
+    new rows for it arrive. Any source with ``metric_history(columns,
+    after_id=...)``, ``max_id()`` and ``first_row_key()`` works, such as
+    ``columnar_export.ColumnarHistory`` over the Parquet export.
+    """
+
+    def __init__(self, queries: PerformanceQueries, columns: Sequence[str]):
+        """
+        Initialize an empty history.
+
+        :param queries: Query layer of the performance database, or a ColumnarHistory
+        :param columns: Metric columns to track
+        """
+        self.queries = queries
+        self.columns = list(columns)
+        self.last_id = 0
+        self._first_row: Optional[Tuple[int, Any]] = None
+        self._series: Dict[str, _ModelSeries] = {}
+        self._history: Optional[pd.DataFrame] = None
+        self._downsampled: Dict[Tuple[str, str, int], pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def _reset(self):
+        self.last_id = 0
+        self._series.clear()
+        self._history = None
+        self._downsampled.clear()
+
+    def refresh(self) -> List[str]:
+        """
+        Fetch rows added since the last refresh.
+
+        A different first row (rebuilt or pruned database) or a shrinking
+        table triggers a full reload.
+
+        :return: Sorted names of the models with history
+        """
+        with self._lock:
+            first_row = self.queries.first_row_key()
+            if first_row != self._first_row or self.queries.max_id() < self.last_id:
+                self._reset()
+                self._first_row = first_row
+
+            new_rows = self.queries.metric_history(self.columns, after_id=self.last_id)
+            if not new_rows.empty:
+                timestamps = pd.to_datetime(new_rows['timestamp'], format='ISO8601').to_numpy(dtype='datetime64[ns]')
+                ids = new_rows['id'].to_numpy(dtype=np.int64)
+                values = new_rows[self.columns].to_numpy(dtype=float, na_value=np.nan)
+                for model, positions in new_rows.groupby('model_name', sort=False).indices.items():
+                    series = self._series.get(model)
+                    if series is None:
+                        series = self._series[model] = _ModelSeries(len(self.columns))
+                    series.append(ids[positions], timestamps[positions], values[positions])
+                self.last_id = int(ids.max())
+                changed = set(new_rows['model_name'])
+                self._history = None
+                self._downsampled = {
+                    key: series for key, series in self._downsampled.items() if key[0] not in changed
+                }
+            return sorted(self._series)
+
+    @property
+    def history(self) -> pd.DataFrame:
+        """
+        Full history ordered by model and timestamp, assembled on first access after a change.
+
+        :return: DataFrame with id, timestamp, model_name and the metric columns
+        """
+        with self._lock:
+            if self._history is None:
+                frames = []
+                for model in sorted(self._series):
+                    frame = self._series[model].frame(self.columns)
+                    frame.insert(2, 'model_name', model)
+                    frames.append(frame)
+                self._history = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+                    columns=['id', 'timestamp', 'model_name'] + self.columns
+                )
+            return self._history
+
+    def downsampled(self, model: str, column: str, max_points: int) -> pd.DataFrame:
+        """
+        LTTB-downsampled series of one model and metric.
+
+        :param model: Model name
+        :param column: Metric column
+        :param max_points: Maximum number of points, e.g. the chart width in pixels
+        :return: Rows with timestamp and the metric column
+        """
+        with self._lock:
+            key = (model, column, max_points)
+            if key not in self._downsampled:
+                series = self._series.get(model)
+                if series is None:
+                    return pd.DataFrame(columns=['timestamp', column])
+                frame = series.frame(self.columns, [column]).drop(columns='id')
+                self._downsampled[key] = downsample_series(frame, 'timestamp', column, max_points)
+            return self._downsampled[key]
@@ -0,0 +1,335 @@
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import pandas as pd
+
+from performance_queries import PerformanceQueries
+from quantile_sketch import DDSketch
+
+
+class PerformanceRollups:
+    """
+    Pre-aggregated per-model metrics maintained alongside ``performance_metrics``.
+
+    Every metric column is rolled up per model into hourly, daily and
+    all-time buckets holding count, sum, min, max and a mergeable DDSketch.
+    ``update`` folds in only the rows appended since the last update, so it
+    can run inside the transaction that inserts benchmark results. Summaries
+    read the all-time buckets, which costs the same whatever the size of
+    the raw table.
+
+    Updates take SQLite's write lock before reading the watermark, so
+    concurrent updaters in other processes fold each row exactly once.
+    Readers such as dashboards should only read and leave updates to the
+    benchmark or ``--backfill``.
+    """
+
+    GRANULARITIES = ('hourly', 'daily', 'total')
+    METRIC_COLUMNS = PerformanceQueries.METRIC_COLUMNS
+
+    def __init__(self, performance_db_path: str, relative_accuracy: float = 0.01, batch_size: int = 50000,
+                 busy_retries: int = 5, busy_backoff: float = 0.1):
+        """
+        Initialize the rollups for a performance database.
+
+        :param performance_db_path: Path to SQLite performance tracking database
+        :param relative_accuracy: Relative accuracy of the rollup sketches
+        :param batch_size: Raw rows folded in per pass while catching up
+        :param busy_retries: Attempts to take the write lock while another writer holds it
+        :param busy_backoff: Seconds before the first retry, doubled after each attempt
+        """
+        self.performance_db_path = performance_db_path
+        self.relative_accuracy = relative_accuracy
+        self.batch_size = batch_size
+        self.busy_retries = busy_retries
+        self.busy_backoff = busy_backoff
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Long-lived connection, opened lazily."""
+        with self._lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.performance_db_path, check_same_thread=False)
+            return self._conn
+
+    @staticmethod
+    def bucket_start(timestamp: str, granularity: str) -> str:
+        """
+        Start of the bucket an ISO timestamp falls into.
+
+        :param timestamp: ISO 8601 timestamp
+        :param granularity: 'hourly', 'daily' or 'total'
+        :return: Bucket start, '' for the all-time bucket
+        """
+        if granularity == 'total':
+            return ''
+        moment = datetime.fromisoformat(timestamp)
+        if granularity == 'hourly':
+            return moment.strftime('%Y-%m-%dT%H:00:00')
+        return moment.strftime('%Y-%m-%d')
+
+    def ensure_schema(self, conn: sqlite3.Connection):
+        """
+        Create the rollup tables and their watermark.
+
+        :param conn: Open database connection
+        """
+        for granularity in self.GRANULARITIES:
+            conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS performance_rollup_{granularity} (
+                bucket_start TEXT,
+                model_name TEXT,
+                metric TEXT,
+                count INTEGER,
+                sum REAL,
+                min REAL,
+                max REAL,
+                sketch TEXT,
+                PRIMARY KEY (model_name, metric, bucket_start)
+            )
+            ''')
+        conn.execute("CREATE TABLE IF NOT EXISTS performance_rollup_state (last_id INTEGER)")
+        if conn.execute("SELECT COUNT(*) FROM performance_rollup_state").fetchone()[0] == 0:
+            conn.execute("INSERT INTO performance_rollup_state VALUES (0)")
+
+    def available(self) -> bool:
+        """
+        Whether the rollup tables exist, i.e. have been updated or backfilled at least once.
+
+        :return: True when summaries can be read from the rollups
+        """
+        with self._lock:
+            return self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'performance_rollup_state'"
+            ).fetchone() is not None
+
+    def _begin_immediate(self, conn: sqlite3.Connection):
+        """Open a write transaction, retrying with backoff while the database is busy."""
+        delay = self.busy_backoff
+        for attempt in range(self.busy_retries):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                if attempt == self.busy_retries - 1 or not any(word in str(e) for word in ('locked', 'busy')):
+                    raise
+                time.sleep(delay)
+                delay *= 2
+
+    def _metric_columns(self, conn: sqlite3.Connection) -> List[str]:
+        """Metric columns present in this database's performance table."""
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(performance_metrics)")}
+        return [column for column in self.METRIC_COLUMNS if column in existing]
+
+    def update(self, conn: Optional[sqlite3.Connection] = None) -> int:
+        """
+        Fold performance rows appended since the last update into the rollups.
+
+        When ``conn`` is given the changes join the caller's transaction and
+        the caller commits; otherwise they are committed here. Either way the
+        watermark is only read inside a write transaction, which keeps other
+        updaters out until the fold is committed.
+
+        :param conn: Connection whose uncommitted inserts should be included
+        :return: Number of raw rows folded in
+        """
+        own_connection = conn is None
+        with self._lock:
+            conn = conn or self.conn
+            if not conn.in_transaction:
+                self._begin_immediate(conn)
+            try:
+                self.ensure_schema(conn)
+                columns = self._metric_columns(conn)
+                folded = 0
+                while True:
+                    last_id = conn.execute("SELECT last_id FROM performance_rollup_state").fetchone()[0]
+                    rows = conn.execute(
+                        f"SELECT id, timestamp, model_name, {', '.join(columns)} FROM performance_metrics "
+                        "WHERE id > ? ORDER BY id LIMIT ?",
+                        (last_id, self.batch_size)
+                    ).fetchall()
+                    if not rows:
+                        break
+                    self._fold(conn, rows, columns)
+                    conn.execute("UPDATE performance_rollup_state SET last_id = ?", (rows[-1][0],))
+                    folded += len(rows)
+            except BaseException:
+                if own_connection:
+                    conn.rollback()
+                raise
+            if own_connection:
+                conn.commit()
+            return folded
+
+    def _fold(self, conn: sqlite3.Connection, rows: List[tuple], columns: List[str]):
+        """Merge a batch of raw rows into the stored buckets."""
+        values: Dict[Tuple[str, str, str, str], List[float]] = {}
+        for row in rows:
+            timestamp, model = row[1], row[2]
+            buckets = [(granularity, self.bucket_start(timestamp, granularity)) for granularity in self.GRANULARITIES]
+            for column, value in zip(columns, row[3:]):
+                if value is None:
+                    continue
+                for granularity, bucket in buckets:
+                    values.setdefault((granularity, bucket, model, column), []).append(value)
+
+        for (granularity, bucket, model, column), bucket_values in values.items():
+            sketch = DDSketch(self.relative_accuracy)
+            sketch.add_many(bucket_values)
+            table = f"performance_rollup_{granularity}"
+            existing = conn.execute(
+                f"SELECT sketch FROM {table} WHERE model_name = ? AND metric = ? AND bucket_start = ?",
+                (model, column, bucket)
+            ).fetchone()
+            if existing is not None:
+                sketch.merge(DDSketch.from_json(existing[0]))
+            conn.execute(
+                f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (bucket, model, column, int(sketch.count), sketch.sum, sketch.min, sketch.max, sketch.to_json())
+            )
+
+    def backfill(self) -> int:
+        """
+        Rebuild every rollup from the raw performance table.
+
+        :return: Number of raw rows folded in
+        """
+        with self._lock:
+            conn = self.conn
+            self._begin_immediate(conn)
+            try:
+                self.ensure_schema(conn)
+                for granularity in self.GRANULARITIES:
+                    conn.execute(f"DELETE FROM performance_rollup_{granularity}")
+                conn.execute("UPDATE performance_rollup_state SET last_id = 0")
+                folded = self.update(conn)
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+            return folded
+
+    def _validate_columns(self, columns: Sequence[str]) -> List[str]:
+        """Reject anything that is not a known metric column."""
+        unknown = [column for column in columns if column not in self.METRIC_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown performance metric columns: {unknown}")
+        return list(columns)
+
+    def _total_sketches(self, column: str) -> Dict[str, DDSketch]:
+        """All-time sketch of a metric per model."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT model_name, sketch FROM performance_rollup_total WHERE metric = ?", (column,)
+            ).fetchall()
+        return {model: DDSketch.from_json(payload) for model, payload in rows}
+
+    def mean_metrics_per_model(self, columns: Sequence[str] = METRIC_COLUMNS) -> pd.DataFrame:
+        """
+        Average metrics per model from the all-time rollups.
+
+        :param columns: Metric columns to average
+        :return: DataFrame indexed by model name with one column per metric plus ``run_count``
+        """
+        columns = self._validate_columns(columns)
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT model_name, metric, count, sum FROM performance_rollup_total "
+                f"WHERE metric IN ({', '.join('?' for _ in columns)})",
+                columns
+            ).fetchall()
+        summary: Dict[str, Dict[str, Any]] = {}
+        for model, metric, count, total in rows:
+            entry = summary.setdefault(model, {'run_count': 0})
+            entry[metric] = total / count if count else None
+            entry['run_count'] = max(entry['run_count'], count)
+        df = pd.DataFrame.from_dict(summary, orient='index', columns=['run_count'] + columns)
+        df.index.name = 'model_name'
+        return df.sort_index()
+
+    def overall_mean(self, column: str) -> Optional[float]:
+        """
+        Mean of a metric across all models and runs.
+
+        :param column: Metric column
+        :return: Mean value, None when there is no data
+        """
+        column = self._validate_columns([column])[0]
+        with self._lock:
+            count, total = self.conn.execute(
+                "SELECT SUM(count), SUM(sum) FROM performance_rollup_total WHERE metric = ?", (column,)
+            ).fetchone()
+        return total / count if count else None
+
+    def overall_percentile(self, column: str, percentile: float) -> Optional[float]:
+        """
+        Percentile of a metric across all models and runs from the merged sketches.
+
+        :param column: Metric column
+        :param percentile: Percentile in the range [0, 100]
+        :return: Estimate within the sketch's relative accuracy, None when there is no data
+        """
+        column = self._validate_columns([column])[0]
+        merged = DDSketch(self.relative_accuracy)
+        for sketch in self._total_sketches(column).values():
+            merged.merge(sketch)
+        return merged.quantile(percentile / 100)
+
+    def series(self, column: str, granularity: str = 'daily', models: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Bucketed time series of a metric.
+
+        :param column: Metric column
+        :param granularity: 'hourly' or 'daily'
+        :param models: Restrict to these models, all models when omitted
+        :return: DataFrame with bucket_start, model_name, count, mean, min and max
+        """
+        column = self._validate_columns([column])[0]
+        if granularity not in ('hourly', 'daily'):
+            raise ValueError("granularity must be 'hourly' or 'daily'")
+        query = (
+            f"SELECT bucket_start, model_name, count, sum / count AS mean, min, max "
+            f"FROM performance_rollup_{granularity} WHERE metric = ?"
+        )
+        params: List[Any] = [column]
+        if models is not None:
+            query += f" AND model_name IN ({', '.join('?' for _ in models)})"
+            params.extend(models)
+        query += " ORDER BY model_name, bucket_start"
+        with self._lock:
+            return pd.read_sql_query(query, self.conn, params=params)
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain performance rollup tables")
+    parser.add_argument('db_path', nargs='?', default='reports/model_performance.db')
+    parser.add_argument('--backfill', action='store_true', help="Rebuild all rollups from the raw table")
+    args = parser.parse_args()
+
+    rollups = PerformanceRollups(args.db_path)
+    try:
+        folded = rollups.backfill() if args.backfill else rollups.update()
+    except sqlite3.Error as e:
+        print(f"Error updating rollups: {e}")
+        sys.exit(1)
+    finally:
+        rollups.close()
+    print(f"Folded {folded} performance rows into rollups of {args.db_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+from performance_queries import PerformanceQueries
+
+
+class PerformanceSnapshot:
+    """
+    In-process snapshot of the latest performance metrics for each model.
+
+    The snapshot is loaded once and then refreshed only when the underlying
+    SQLite database changes. Changes are detected with a cheap watermark made
+    of ``PRAGMA data_version`` and ``MAX(id)`` of the performance table, so a
+    routing decision never re-reads the whole table.
+    """
+
+    def __init__(self, performance_db_path: str, check_interval: float = 1.0, ttl_seconds: float = 300.0,
+                 queries: Optional[PerformanceQueries] = None):
+        """
+        Initialize the snapshot for a performance database.
+
+        :param performance_db_path: Path to SQLite performance tracking database
+        :param check_interval: Minimum seconds between two watermark checks
+        :param ttl_seconds: Maximum age of the snapshot before a forced full reload
+        :param queries: Shared query layer, created for the database if omitted
+        """
+        self.performance_db_path = performance_db_path
+        self.check_interval = check_interval
+        self.ttl_seconds = ttl_seconds
+        self.queries = queries or PerformanceQueries(performance_db_path)
+
+        self._lock = threading.Lock()
+        self._latest_metrics: Dict[str, Dict[str, Any]] = {}
+        self._watermark: Optional[Tuple[int, int]] = None
+        self._loaded_at: Optional[float] = None
+        self._checked_at: Optional[float] = None
+
+    def _full_reload(self, watermark: Tuple[int, int]):
+        """
+        Rebuild the snapshot from the newest row of every model.
+
+        :param watermark: Watermark the reload corresponds to
+        """
+        self._latest_metrics = self.queries.latest_metrics_per_model()
+        self._watermark = watermark
+        self._loaded_at = time.monotonic()
+
+    def _apply_new_rows(self, watermark: Tuple[int, int]):
+        """
+        Fold rows appended since the last watermark into the snapshot.
+
+        :param watermark: Watermark the refresh corresponds to
+        """
+        for row in self.queries.rows_after(self._watermark[1]):
+            current = self._latest_metrics.get(row['model_name'])
+            if current is None or (row['timestamp'], row['id']) >= (current['timestamp'], current['id']):
+                self._latest_metrics[row['model_name']] = row
+        self._watermark = watermark
+
+    def refresh(self, force: bool = False):
+        """
+        Bring the snapshot up to date with the database if it changed.
+
+        Appended rows are applied incrementally and a shrinking table (deletes,
+        a recreated table) triggers a full reload. The performance table is
+        append-only, so in-place updates are only picked up once the TTL
+        expires.
+
+        :param force: Reload unconditionally
+        """
+        with self._lock:
+            now = time.monotonic()
+            expired = self._loaded_at is None or (now - self._loaded_at) >= self.ttl_seconds
+            recently_checked = self._checked_at is not None and (now - self._checked_at) < self.check_interval
+            if not force and not expired and recently_checked:
+                return
+
+            try:
+                self._checked_at = now
+                # data_version only moves when another connection commits,
+                # so an unchanged value means nothing needs to be read.
+                watermark = self.queries.watermark()
+                reload = force or expired or self._watermark is None
+                if not reload and watermark[0] == self._watermark[0]:
+                    return
+
+                if reload or watermark[1] < self._watermark[1]:
+                    self._full_reload(watermark)
+                elif watermark[1] > self._watermark[1]:
+                    self._apply_new_rows(watermark)
+                else:
+                    self._watermark = watermark
+            except sqlite3.Error as e:
+                print(f"Error loading performance data: {e}")
+                self._latest_metrics = {}
+                self._watermark = None
+                self._loaded_at = now
+                self._checked_at = now
+
+    def get_latest_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return the newest metrics row of every model, keyed by model name.
+
+        :return: Mapping of model name to its latest metrics
+        """
+        self.refresh()
+        return self._latest_metrics
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self.queries.close()
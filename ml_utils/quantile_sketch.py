@@ -0,0 +1,498 @@
+import json
+import math
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+
+
+class DDSketch:
+    """
+    Mergeable streaming quantile sketch with relative-error guarantees.
+
+    Values are bucketed on a logarithmic grid so every quantile estimate is
+    within ``relative_accuracy`` of the true value. Two sketches with the same
+    accuracy merge by adding bucket counts, which makes them cheap to combine
+    across benchmark runs, processes and live traffic.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        """
+        Initialize an empty sketch.
+
+        :param relative_accuracy: Maximum relative error of quantile estimates
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in the range (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, float] = {}
+        self.zero_count = 0.0
+        self.count = 0.0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, weight: float = 1.0):
+        """
+        Add a value to the sketch.
+
+        :param value: Observed value, values <= 0 are counted in the zero bucket
+        :param weight: Number of observations the value stands for
+        """
+        if value > 0:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[index] = self.bins.get(index, 0.0) + weight
+        else:
+            self.zero_count += weight
+        self.count += weight
+        self.sum += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def add_many(self, values: Sequence[float]):
+        """
+        Add a batch of values at once, bucketing them with numpy.
+
+        :param values: Observed values, values <= 0 are counted in the zero bucket
+        """
+        if len(values) < 64:
+            # numpy's per-call overhead outweighs the loop for small batches
+            for value in values:
+                self.add(value)
+            return
+        values = np.asarray(values, dtype=float)
+        positive = values[values > 0]
+        indices, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(int), return_counts=True)
+        for index, count in zip(indices.tolist(), counts.tolist()):
+            self.bins[index] = self.bins.get(index, 0.0) + count
+        self.zero_count += len(values) - len(positive)
+        self.count += len(values)
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: 'DDSketch'):
+        """
+        Fold another sketch into this one.
+
+        :param other: Sketch built with the same relative accuracy
+        """
+        if not math.isclose(other.gamma, self.gamma):
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0.0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def scale(self, factor: float):
+        """
+        Multiply the weight of every value added so far, e.g. to decay old data.
+
+        Quantiles of the sketch alone are unchanged; its weight relative to
+        values added or merged afterwards shrinks by ``factor``.
+
+        :param factor: Weight multiplier in the range [0, 1]
+        """
+        for index in self.bins:
+            self.bins[index] *= factor
+        self.zero_count *= factor
+        self.count *= factor
+        self.sum *= factor
+
+    def copy(self) -> 'DDSketch':
+        """Return an independent copy of the sketch."""
+        clone = DDSketch(self.relative_accuracy)
+        clone.merge(self)
+        return clone
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate the value at quantile ``q``.
+
+        :param q: Quantile in the range [0, 1]
+        :return: Estimated value, None for an empty sketch
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("q must be in the range [0, 1]")
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        cumulative = self.zero_count
+        if cumulative > rank:
+            return 0.0
+
+        for index in sorted(self.bins):
+            cumulative += self.bins[index]
+            if cumulative > rank:
+                estimate = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Exact mean of the added values."""
+        return self.sum / self.count if self.count else None
+
+    def to_json(self) -> str:
+        """Serialize the sketch to a compact JSON string."""
+        return json.dumps({
+            'relative_accuracy': self.relative_accuracy,
+            'bins': self.bins,
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None
+        }, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, payload: str) -> 'DDSketch':
+        """
+        Rebuild a sketch serialized with ``to_json``.
+
+        :param payload: JSON string
+        :return: Restored sketch
+        """
+        data = json.loads(payload)
+        sketch = cls(data['relative_accuracy'])
+        sketch.bins = {int(index): count for index, count in data['bins'].items()}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        sketch.sum = data['sum']
+        if data['min'] is not None:
+            sketch.min = data['min']
+            sketch.max = data['max']
+        return sketch
+
+
+class LatencySketchStore:
+    """
+    Per-model latency sketches backed by the SQLite performance store.
+
+    Each writer (a benchmark run, a live router process) persists its
+    sketches under a ``source`` name. Writes merge this process's new
+    observations into the stored row inside a transaction, so several
+    processes sharing a source add up instead of overwriting each other.
+    Reads merge the stored sketches of every source with the observations
+    not yet persisted, so benchmark data and live traffic combine without
+    re-reading raw samples.
+
+    Observations decay with ``half_life``: quantiles follow recent latency
+    rather than the all-time distribution. Rows whose decayed sample count
+    falls below ``prune_below`` are deleted on reload, so the sources of old
+    benchmark runs do not accumulate.
+    """
+
+    METRICS = ('response_time', 'ttft', 'inter_chunk_gap')
+
+    def __init__(self, performance_db_path: str, source: str = 'live', relative_accuracy: float = 0.01,
+                 refresh_interval: float = 60.0, persist_interval: float = 30.0,
+                 half_life: Optional[float] = 6 * 3600.0, prune_below: float = 1.0):
+        """
+        Initialize the store and load persisted sketches.
+
+        :param performance_db_path: Path to SQLite performance tracking database
+        :param source: Name this process persists its sketches under
+        :param relative_accuracy: Relative accuracy of new sketches
+        :param refresh_interval: Seconds between reloads of persisted sketches
+        :param persist_interval: Minimum seconds between two writes of new observations
+        :param half_life: Seconds after which an observation's weight halves, None keeps all-time sketches
+        :param prune_below: Decayed sample count under which a stored row is deleted, 0 keeps every row
+        """
+        self.performance_db_path = performance_db_path
+        self.source = source
+        self.relative_accuracy = relative_accuracy
+        self.refresh_interval = refresh_interval
+        self.persist_interval = persist_interval
+        self.half_life = half_life
+        self.prune_below = prune_below
+
+        # Persisted sketches of all sources, decayed to _stored_at
+        self._stored: Dict[Tuple[str, str], DDSketch] = {}
+        self._stored_at = time.time()
+        # Observations of this process not yet persisted, each decayed to its _pending_at time
+        self._pending: Dict[Tuple[str, str], DDSketch] = {}
+        self._pending_at: Dict[Tuple[str, str], float] = {}
+        self._quantile_cache: Dict[Tuple[str, str, float], Optional[float]] = {}
+        self._loaded_at: Optional[float] = None
+        self._last_persisted = time.monotonic()
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.reload()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the store connection and make sure the sketch table exists."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.performance_db_path, check_same_thread=False)
+            self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS latency_sketches (
+                model_name TEXT,
+                metric TEXT,
+                source TEXT,
+                sample_count REAL,
+                sketch TEXT,
+                updated_at TEXT,
+                PRIMARY KEY (model_name, metric, source)
+            )
+            ''')
+            self._conn.commit()
+        return self._conn
+
+    def _decay(self, sketch: DDSketch, since: float, now: float):
+        """
+        Decay a sketch in place from one wall-clock time to a later one.
+
+        :param sketch: Sketch whose weights are current as of ``since``
+        :param since: Epoch seconds the sketch was last decayed to
+        :param now: Epoch seconds to decay it to
+        """
+        if self.half_life is not None and now > since:
+            sketch.scale(0.5 ** ((now - since) / self.half_life))
+
+    def reload(self):
+        """Reload the persisted sketches of every source, including this one."""
+        with self._lock:
+            try:
+                rows = self._connect().execute(
+                    "SELECT model_name, metric, source, sample_count, sketch, updated_at FROM latency_sketches"
+                ).fetchall()
+            except sqlite3.Error as e:
+                print(f"Error loading latency sketches: {e}")
+                rows = []
+
+            now = time.time()
+            stored: Dict[Tuple[str, str], DDSketch] = {}
+            expired = []
+            for model, metric, source, sample_count, payload, updated_at in rows:
+                updated = datetime.fromisoformat(updated_at).timestamp()
+                # Decide from the stored count, so negligible rows are never parsed
+                if self.half_life is not None and now > updated and \
+                        sample_count * 0.5 ** ((now - updated) / self.half_life) < self.prune_below:
+                    expired.append((model, metric, source, updated_at))
+                    continue
+                sketch = DDSketch.from_json(payload)
+                self._decay(sketch, updated, now)
+                key = (model, metric)
+                if key in stored:
+                    stored[key].merge(sketch)
+                else:
+                    stored[key] = sketch
+
+            if expired:
+                # Matching updated_at leaves rows alone that another writer refreshed meanwhile
+                try:
+                    with self._conn:
+                        self._conn.executemany(
+                            "DELETE FROM latency_sketches "
+                            "WHERE model_name = ? AND metric = ? AND source = ? AND updated_at = ?",
+                            expired
+                        )
+                except sqlite3.Error as e:
+                    print(f"Error pruning latency sketches: {e}")
+
+            self._stored = stored
+            self._stored_at = now
+            self._quantile_cache.clear()
+            self._loaded_at = time.monotonic()
+
+    def _add_pending(self, model: str, metric: str) -> DDSketch:
+        """Return the unpersisted sketch for a model and metric, decayed to now."""
+        key = (model, metric)
+        now = time.time()
+        sketch = self._pending.get(key)
+        if sketch is None:
+            sketch = self._pending[key] = DDSketch(self.relative_accuracy)
+        else:
+            self._decay(sketch, self._pending_at[key], now)
+        self._pending_at[key] = now
+        return sketch
+
+    def record(self, model: str, response_time_ms: float, ttft_ms: Optional[float] = None):
+        """
+        Add one request's latencies to the model's sketches.
+
+        :param model: Model that served the request
+        :param response_time_ms: End-to-end response time in milliseconds
+        :param ttft_ms: Time to first token in milliseconds, if measured
+        """
+        with self._lock:
+            self._add_pending(model, 'response_time').add(response_time_ms)
+            if ttft_ms is not None:
+                self._add_pending(model, 'ttft').add(ttft_ms)
+            self._quantile_cache.clear()
+            should_persist = (time.monotonic() - self._last_persisted) >= self.persist_interval
+
+        if should_persist:
+            self.persist()
+
+    def merge_sketch(self, model: str, metric: str, sketch: DDSketch):
+        """
+        Merge a pre-built sketch, e.g. from a benchmark run, into this source.
+
+        :param model: Model the sketch describes
+        :param metric: One of METRICS
+        :param sketch: Sketch of recent observations to merge
+        """
+        if metric not in self.METRICS:
+            raise ValueError(f"metric must be one of {self.METRICS}")
+        with self._lock:
+            self._add_pending(model, metric).merge(sketch)
+            self._quantile_cache.clear()
+
+    def replace_source(self, source: str, sketches: Dict[Tuple[str, str], DDSketch]):
+        """
+        Replace the stored sketches of a source, e.g. one benchmark run's cumulative sketches.
+
+        Unlike ``persist``, this overwrites rather than merges, so writing the
+        same sketches again leaves the store unchanged and an interrupted run
+        can safely rewrite them when it resumes.
+
+        :param source: Source to replace, normally not this store's own
+        :param sketches: Sketch per (model, metric)
+        """
+        for _, metric in sketches:
+            if metric not in self.METRICS:
+                raise ValueError(f"metric must be one of {self.METRICS}")
+        updated_at = datetime.now().isoformat()
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM latency_sketches WHERE source = ?", (source,))
+                    conn.executemany('''
+                    INSERT INTO latency_sketches (
+                        model_name, metric, source, sample_count, sketch, updated_at
+                    ) VALUES (?, ?, ?, ?, ?, ?)
+                    ''', [
+                        (model, metric, source, sketch.count, sketch.to_json(), updated_at)
+                        for (model, metric), sketch in sketches.items()
+                    ])
+            except sqlite3.Error as e:
+                print(f"Error replacing latency sketches of {source}: {e}")
+                return
+        self.reload()
+
+    def _reload_if_stale(self):
+        """Reload persisted sketches once ``refresh_interval`` has passed since the last load."""
+        if self._loaded_at is None or (time.monotonic() - self._loaded_at) >= self.refresh_interval:
+            self.reload()
+
+    def merged_sketch(self, model: str, metric: str = 'response_time') -> Optional[DDSketch]:
+        """
+        Return the combined sketch of all sources for a model and metric.
+
+        :param model: Model name
+        :param metric: One of METRICS
+        :return: Merged sketch, None when no data exists
+        """
+        self._reload_if_stale()
+        with self._lock:
+            key = (model, metric)
+            now = time.time()
+            parts = [(self._stored.get(key), self._stored_at), (self._pending.get(key), self._pending_at.get(key))]
+            if all(sketch is None for sketch, _ in parts):
+                return None
+            merged = DDSketch(self.relative_accuracy)
+            for sketch, decayed_at in parts:
+                if sketch is not None:
+                    sketch = sketch.copy()
+                    self._decay(sketch, decayed_at, now)
+                    merged.merge(sketch)
+            return merged
+
+    def quantile(self, model: str, percentile: float, metric: str = 'response_time') -> Optional[float]:
+        """
+        Percentile of a model's latency across all sources.
+
+        :param model: Model name
+        :param percentile: Percentile in the range [0, 100]
+        :param metric: One of METRICS
+        :return: Latency in milliseconds, None when no data exists
+        """
+        # Reloading clears the cache, so cached values never outlive refresh_interval
+        self._reload_if_stale()
+        key = (model, metric, percentile)
+        with self._lock:
+            if key in self._quantile_cache:
+                return self._quantile_cache[key]
+        merged = self.merged_sketch(model, metric)
+        value = merged.quantile(percentile / 100) if merged is not None else None
+        with self._lock:
+            self._quantile_cache[key] = value
+        return value
+
+    def persist(self):
+        """
+        Merge this process's new observations into the stored sketches of its source.
+
+        The stored row is read, decayed, merged and written back in one
+        immediate transaction, so concurrent writers under the same source
+        never overwrite each other's observations.
+        """
+        with self._lock:
+            self._last_persisted = time.monotonic()
+            if not self._pending:
+                return
+
+            now = time.time()
+            updated_at = datetime.fromtimestamp(now).isoformat()
+            pending = {}
+            for key, sketch in self._pending.items():
+                self._decay(sketch, self._pending_at[key], now)
+                pending[key] = sketch
+
+            conn = self._connect()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                rows = []
+                for (model, metric), sketch in pending.items():
+                    stored = conn.execute('''
+                    SELECT sketch, updated_at FROM latency_sketches
+                    WHERE model_name = ? AND metric = ? AND source = ?
+                    ''', (model, metric, self.source)).fetchone()
+                    combined = sketch.copy()
+                    if stored is not None:
+                        previous = DDSketch.from_json(stored[0])
+                        self._decay(previous, datetime.fromisoformat(stored[1]).timestamp(), now)
+                        combined.merge(previous)
+                    rows.append((model, metric, self.source, combined.count, combined.to_json(), updated_at))
+                conn.executemany('''
+                INSERT OR REPLACE INTO latency_sketches (
+                    model_name, metric, source, sample_count, sketch, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?)
+                ''', rows)
+                conn.commit()
+            except sqlite3.Error as e:
+                # Pending observations stay in memory and are written by the next persist
+                conn.rollback()
+                print(f"Error persisting latency sketches: {e}")
+                return
+
+            # Keep persisted observations visible until the next reload picks them up from the store
+            for sketch in self._stored.values():
+                self._decay(sketch, self._stored_at, now)
+            self._stored_at = now
+            for key, sketch in pending.items():
+                if key in self._stored:
+                    self._stored[key].merge(sketch)
+                else:
+                    self._stored[key] = sketch
+            self._pending = {}
+            self._pending_at = {}
+
+    def close(self):
+        """Persist pending sketches and close the store connection."""
+        self.persist()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,358 @@
+import time
+import hashlib
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Starting budgets per provider; unknown providers are only paced by AIMD concurrency
+PROVIDER_RATE_LIMITS: Dict[str, Dict[str, Any]] = {
+    'deepseek': {'requests_per_minute': 40},
+    'openai': {},
+    'anthropic': {},
+    'google': {}
+}
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """
+    Whether an SDK exception is a 429 response.
+
+    Covers OpenAI-compatible and Anthropic SDK errors (``status_code``) and
+    Google API errors (``code``).
+
+    :param error: Exception raised by a client call
+    :return: True for rate limit responses
+    """
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status is None and isinstance(getattr(error, 'code', None), int):
+        status = error.code
+    return status == 429
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    Delay requested by the server through ``Retry-After`` (or ``retry-after-ms``).
+
+    :param error: Exception raised by a client call
+    :return: Seconds to wait, None when the response carried no hint
+    """
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms is not None:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get('retry-after')
+    if retry_after is None:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        try:
+            return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate."""
+
+    def __init__(self, rate_per_second: float, capacity: float, now: float):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self.level = capacity
+        self.updated_at = now
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """
+        Seconds until ``amount`` can be taken.
+
+        Requests larger than the bucket only need it to be full and leave it
+        in debt, so they are delayed rather than starved.
+        """
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate_per_second
+
+    def consume(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= amount
+
+    def adjust(self, amount: float):
+        """Take (positive) or return (negative) budget after the fact."""
+        self.level = min(self.capacity, self.level - amount)
+
+
+class RateLimitPermit:
+    """
+    Admission of one request by an AdaptiveRateLimiter.
+
+    Use as a context manager: leaving the block releases the concurrency slot
+    and reports the outcome, treating a 429 exception as a rate limit signal.
+    Call ``record`` with the actual token usage when it is known.
+    """
+
+    def __init__(self, limiter: 'AdaptiveRateLimiter', estimated_tokens: int, started_at: float):
+        self.limiter = limiter
+        self.estimated_tokens = estimated_tokens
+        self.started_at = started_at
+        self.tokens_used: Optional[int] = None
+        self.released = False
+
+    def record(self, tokens: Optional[int]):
+        """
+        Report the request's actual token usage.
+
+        :param tokens: Prompt plus completion tokens
+        """
+        self.tokens_used = tokens
+
+    def __enter__(self) -> 'RateLimitPermit':
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc is None:
+            self.limiter.release(self, success=True)
+        elif is_rate_limit_error(exc):
+            self.limiter.release(self, success=False, rate_limited=True, retry_after=retry_after_seconds(exc))
+        else:
+            self.limiter.release(self, success=False)
+        return False
+
+
+class AdaptiveRateLimiter:
+    """
+    Client-side limiter for one provider and API key.
+
+    Requests are admitted against a requests-per-minute and a
+    tokens-per-minute token bucket and a concurrency limit that adapts
+    additively-increase / multiplicatively-decrease: every successful
+    response grows it by about one slot per window of requests, while a 429
+    (or latency above ``latency_target_ms``) cuts it by ``decrease_factor``.
+    A 429's ``Retry-After`` pauses all admissions until it expires.
+    Thread-safe, so benchmarks, validators and routers can share one instance.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 initial_concurrency: float = 4.0, min_concurrency: float = 1.0, max_concurrency: float = 64.0,
+                 additive_increase: float = 1.0, decrease_factor: float = 0.5,
+                 latency_target_ms: Optional[float] = None, decrease_cooldown: float = 1.0,
+                 default_retry_after: float = 1.0, burst_seconds: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the limiter.
+
+        :param requests_per_minute: Request budget, None for no request pacing
+        :param tokens_per_minute: Token budget, None for no token pacing
+        :param initial_concurrency: Starting in-flight limit
+        :param min_concurrency: Lower bound of the in-flight limit
+        :param max_concurrency: Upper bound of the in-flight limit
+        :param additive_increase: Slots added per window of successful requests
+        :param decrease_factor: Multiplier applied to the limit on congestion
+        :param latency_target_ms: Latency above which a success counts as congestion, None to ignore latency
+        :param decrease_cooldown: Seconds during which further congestion signals are ignored after a decrease
+        :param default_retry_after: Pause after a 429 without Retry-After
+        :param burst_seconds: Seconds of budget the buckets may accumulate
+        :param clock: Monotonic time source in seconds
+        """
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.additive_increase = additive_increase
+        self.decrease_factor = decrease_factor
+        self.latency_target_ms = latency_target_ms
+        self.decrease_cooldown = decrease_cooldown
+        self.default_retry_after = default_retry_after
+        self.clock = clock
+
+        now = clock()
+        self.request_bucket = None
+        if requests_per_minute:
+            rate = requests_per_minute / 60
+            self.request_bucket = TokenBucket(rate, max(1.0, rate * burst_seconds), now)
+        self.token_bucket = None
+        if tokens_per_minute:
+            rate = tokens_per_minute / 60
+            self.token_bucket = TokenBucket(rate, max(1.0, rate * burst_seconds), now)
+
+        self.concurrency_limit = float(min(max(initial_concurrency, min_concurrency), max_concurrency))
+        self.in_flight = 0
+        self.blocked_until = now
+        self.rate_limited_count = 0
+        self._last_decrease: Optional[float] = None
+        self._condition = threading.Condition()
+
+    def _wait_time(self, estimated_tokens: int, now: float) -> Optional[float]:
+        """
+        Seconds until a request could be admitted.
+
+        :return: 0 when admissible now, None when waiting for a slot to free up
+        """
+        wait = max(self.blocked_until - now, 0.0)
+        if self.request_bucket is not None:
+            wait = max(wait, self.request_bucket.wait_time(1, now))
+        if self.token_bucket is not None and estimated_tokens:
+            wait = max(wait, self.token_bucket.wait_time(estimated_tokens, now))
+        if wait == 0.0 and self.in_flight >= int(self.concurrency_limit):
+            return None
+        return wait
+
+    def _admit(self, estimated_tokens: int, now: float) -> RateLimitPermit:
+        if self.request_bucket is not None:
+            self.request_bucket.consume(1, now)
+        if self.token_bucket is not None and estimated_tokens:
+            self.token_bucket.consume(estimated_tokens, now)
+        self.in_flight += 1
+        return RateLimitPermit(self, estimated_tokens, now)
+
+    def try_acquire(self, estimated_tokens: int = 0) -> Optional[RateLimitPermit]:
+        """
+        Admit a request only if that is possible right now.
+
+        :param estimated_tokens: Expected prompt plus completion tokens
+        :return: Permit, or None when the request would have to wait
+        """
+        with self._condition:
+            now = self.clock()
+            if self._wait_time(estimated_tokens, now) == 0.0:
+                return self._admit(estimated_tokens, now)
+            return None
+
+    def acquire(self, estimated_tokens: int = 0, timeout: Optional[float] = None) -> RateLimitPermit:
+        """
+        Block until a request is admitted.
+
+        :param estimated_tokens: Expected prompt plus completion tokens
+        :param timeout: Maximum seconds to wait, None waits forever
+        :return: Permit to release once the request finishes
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = self.clock()
+                wait = self._wait_time(estimated_tokens, now)
+                if wait == 0.0:
+                    return self._admit(estimated_tokens, now)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Timed out waiting for rate limiter admission")
+                if wait is None:
+                    self._condition.wait(remaining)
+                else:
+                    self._condition.wait(wait if remaining is None else min(wait, remaining))
+
+    def request(self, estimated_tokens: int = 0, timeout: Optional[float] = None) -> RateLimitPermit:
+        """Alias of ``acquire`` that reads naturally in a ``with`` statement."""
+        return self.acquire(estimated_tokens, timeout)
+
+    def _decrease(self, now: float):
+        """Multiplicatively shrink the concurrency limit, at most once per cooldown."""
+        if self._last_decrease is not None and now - self._last_decrease < self.decrease_cooldown:
+            return
+        self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit * self.decrease_factor)
+        self._last_decrease = now
+
+    def release(self, permit: RateLimitPermit, success: bool, rate_limited: bool = False,
+                retry_after: Optional[float] = None):
+        """
+        Finish a request and feed its outcome into the limits.
+
+        :param permit: Permit returned by ``acquire``
+        :param success: Whether the request succeeded
+        :param rate_limited: Whether the request was answered with a 429
+        :param retry_after: Server-requested pause in seconds, if any
+        """
+        with self._condition:
+            if permit.released:
+                return
+            permit.released = True
+            now = self.clock()
+            self.in_flight -= 1
+
+            if self.token_bucket is not None and permit.tokens_used is not None:
+                # Settle the estimate against what the request really used
+                self.token_bucket.adjust(permit.tokens_used - permit.estimated_tokens)
+
+            if rate_limited:
+                self.rate_limited_count += 1
+                pause = retry_after if retry_after is not None else self.default_retry_after
+                self.blocked_until = max(self.blocked_until, now + pause)
+                self._decrease(now)
+            elif success:
+                latency_ms = (now - permit.started_at) * 1000
+                if self.latency_target_ms is not None and latency_ms > self.latency_target_ms:
+                    self._decrease(now)
+                else:
+                    self.concurrency_limit = min(
+                        self.max_concurrency,
+                        self.concurrency_limit + self.additive_increase / self.concurrency_limit
+                    )
+            self._condition.notify_all()
+
+    def call(self, fn: Callable[..., Any], *args, estimated_tokens: int = 0, max_retries: int = 3, **kwargs) -> Any:
+        """
+        Run a client call under the limiter, retrying 429s after their Retry-After.
+
+        Token usage is settled from the response's ``usage`` when present.
+
+        :param fn: Client call to make
+        :param estimated_tokens: Expected prompt plus completion tokens
+        :param max_retries: Retries after rate limit responses before giving up
+        :return: The call's return value
+        """
+        for attempt in range(max_retries + 1):
+            with self.acquire(estimated_tokens) as permit:
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    if is_rate_limit_error(e) and attempt < max_retries:
+                        # Report the 429 now and retry once the pause it set has expired
+                        self.release(permit, success=False, rate_limited=True, retry_after=retry_after_seconds(e))
+                        continue
+                    raise
+                usage = getattr(result, 'usage', None)
+                if usage is not None and getattr(usage, 'total_tokens', None) is not None:
+                    permit.record(usage.total_tokens)
+                return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limiter state."""
+        with self._condition:
+            return {
+                'concurrency_limit': self.concurrency_limit,
+                'in_flight': self.in_flight,
+                'rate_limited_count': self.rate_limited_count,
+                'blocked_for_s': max(self.blocked_until - self.clock(), 0.0)
+            }
+
+
+_limiters: Dict[Tuple[str, str], AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, api_key: Optional[str] = None, **limits) -> AdaptiveRateLimiter:
+    """
+    Process-wide limiter for a provider and API key.
+
+    Every caller using the same provider and key shares one budget. Limits
+    only apply when the limiter is first created.
+
+    :param provider: Provider name, e.g. 'deepseek' or 'openai'
+    :param api_key: API key the budget belongs to; only its hash is kept as a key
+    :param limits: AdaptiveRateLimiter arguments overriding PROVIDER_RATE_LIMITS
+    :return: Shared limiter
+    """
+    key = (provider, hashlib.sha256((api_key or '').encode()).hexdigest()[:16])
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = AdaptiveRateLimiter(**{**PROVIDER_RATE_LIMITS.get(provider, {}), **limits})
+        return limiter
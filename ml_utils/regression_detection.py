@@ -0,0 +1,315 @@
+import sys
+import math
+import sqlite3
+import argparse
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+from request_samples import RequestSampleStore
+
+# Per-request metrics compared between runs, and whether a higher value is worse
+REGRESSION_METRICS = {
+    'latency_ms': True,
+    'ttft_ms': True,
+    'tokens_per_second': False
+}
+
+
+@dataclass
+class MetricComparison:
+    """Comparison of one metric for one model and scenario between two sets of runs"""
+    model_name: str
+    scenario: str
+    metric: str
+    baseline_samples: int
+    candidate_samples: int
+    baseline_median: float
+    candidate_median: float
+    # Relative change of the median, signed so that positive always means worse
+    change: float
+    ci_low: float
+    ci_high: float
+    p_value: float
+    regressed: bool
+
+
+def list_runs(performance_db_path: str) -> pd.DataFrame:
+    """
+    Stored benchmark runs, oldest first.
+
+    :param performance_db_path: Path to SQLite performance tracking database
+    :return: DataFrame with run_id, started_at and samples
+    """
+    conn = sqlite3.connect(performance_db_path)
+    try:
+        return pd.read_sql_query('''
+        SELECT run_id, MIN(timestamp) AS started_at, COUNT(*) AS samples
+        FROM request_samples
+        GROUP BY run_id
+        ORDER BY started_at
+        ''', conn)
+    finally:
+        conn.close()
+
+
+def load_run_samples(performance_db_path: str, run_ids: Sequence[str]) -> pd.DataFrame:
+    """
+    Completed request samples of some runs with per-request throughput.
+
+    :param performance_db_path: Path to SQLite performance tracking database
+    :param run_ids: Runs to load
+    :return: DataFrame with model_name, scenario and one column per regression metric
+    """
+    statuses = RequestSampleStore.COMPLETED_STATUSES
+    conn = sqlite3.connect(performance_db_path)
+    try:
+        samples = pd.read_sql_query(f'''
+        SELECT run_id, model_name, scenario, ttft_ms, latency_ms, output_tokens
+        FROM request_samples
+        WHERE run_id IN ({', '.join('?' for _ in run_ids)})
+            AND status IN ({', '.join('?' for _ in statuses)})
+        ''', conn, params=list(run_ids) + list(statuses))
+    finally:
+        conn.close()
+    seconds = samples['latency_ms'].where(samples['latency_ms'] > 0) / 1000
+    samples['tokens_per_second'] = samples['output_tokens'] / seconds
+    samples['scenario'] = samples['scenario'].fillna('')
+    return samples
+
+
+def _rank(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Average ranks (1-based, ties share their mean rank) and the size of each tie group."""
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    average_ranks = np.cumsum(counts) - (counts - 1) / 2
+    return average_ranks[inverse], counts
+
+
+def mann_whitney_u(x: Sequence[float], y: Sequence[float], alternative: str = 'two-sided') -> Tuple[float, float]:
+    """
+    Mann-Whitney U test with the tie-corrected normal approximation.
+
+    :param x: First sample
+    :param y: Second sample
+    :param alternative: 'two-sided', 'greater' (x tends to exceed y) or 'less'
+    :return: U statistic of ``x`` and p-value
+    """
+    if alternative not in ('two-sided', 'greater', 'less'):
+        raise ValueError("alternative must be 'two-sided', 'greater' or 'less'")
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n1, n2 = len(x), len(y)
+    if n1 == 0 or n2 == 0:
+        raise ValueError("both samples must be non-empty")
+
+    ranks, ties = _rank(np.concatenate([x, y]))
+    u = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    mean = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - (ties ** 3 - ties).sum() / (n * (n - 1)))
+    if variance <= 0:
+        return float(u), 1.0
+    sigma = math.sqrt(variance)
+
+    # Continuity correction of 0.5 towards the mean
+    if alternative == 'greater':
+        p = 0.5 * math.erfc((u - mean - 0.5) / sigma / math.sqrt(2))
+    elif alternative == 'less':
+        p = 0.5 * math.erfc(-(u - mean + 0.5) / sigma / math.sqrt(2))
+    else:
+        p = math.erfc(max(abs(u - mean) - 0.5, 0) / sigma / math.sqrt(2))
+    return float(u), min(1.0, p)
+
+
+def _bootstrap_medians(values: np.ndarray, n_resamples: int, rng: np.random.Generator,
+                       max_cells: int = 2_000_000) -> np.ndarray:
+    """Medians of bootstrap resamples, drawn in blocks to bound memory on large samples."""
+    block = max(1, max_cells // len(values))
+    return np.concatenate([
+        np.median(values[rng.integers(0, len(values), (min(block, n_resamples - start), len(values)))], axis=1)
+        for start in range(0, n_resamples, block)
+    ])
+
+
+def bootstrap_relative_change(baseline: Sequence[float], candidate: Sequence[float], n_resamples: int = 2000,
+                              confidence: float = 0.95,
+                              rng: Optional[np.random.Generator] = None) -> Tuple[float, float, float]:
+    """
+    Relative change of the median with a percentile bootstrap confidence interval.
+
+    :param baseline: Baseline sample
+    :param candidate: Candidate sample
+    :param n_resamples: Bootstrap resamples
+    :param confidence: Confidence level of the interval
+    :param rng: Random generator, seeded for reproducible intervals
+    :return: Change ``candidate / baseline - 1`` of the medians and the interval bounds
+    """
+    baseline = np.asarray(baseline, dtype=float)
+    candidate = np.asarray(candidate, dtype=float)
+    rng = rng or np.random.default_rng()
+
+    baseline_medians = _bootstrap_medians(baseline, n_resamples, rng)
+    candidate_medians = _bootstrap_medians(candidate, n_resamples, rng)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        changes = candidate_medians / baseline_medians - 1
+    changes = changes[np.isfinite(changes)]
+
+    point = np.median(candidate) / np.median(baseline) - 1 if np.median(baseline) else float('nan')
+    if len(changes) == 0:
+        return float(point), float('nan'), float('nan')
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(changes, [tail, 100 - tail])
+    return float(point), float(low), float(high)
+
+
+def compare_samples(baseline: pd.DataFrame, candidate: pd.DataFrame, threshold: float = 0.10, alpha: float = 0.05,
+                    n_resamples: int = 2000, confidence: float = 0.95, min_samples: int = 5,
+                    seed: int = 0) -> List[MetricComparison]:
+    """
+    Compare every metric per model and scenario present in both sample sets.
+
+    A metric regressed when the one-sided Mann-Whitney test in the worsening
+    direction is significant at ``alpha``, the whole bootstrap interval lies
+    on the worse side, and the median got worse by more than ``threshold``.
+
+    :param baseline: Samples as returned by ``load_run_samples``
+    :param candidate: Samples as returned by ``load_run_samples``
+    :param threshold: Relative worsening of the median that counts as a regression
+    :param alpha: Significance level
+    :param n_resamples: Bootstrap resamples per comparison
+    :param confidence: Confidence level of the bootstrap interval
+    :param min_samples: Groups with fewer samples on either side are skipped
+    :param seed: Seed of the bootstrap resampling
+    :return: One comparison per model, scenario and metric
+    """
+    rng = np.random.default_rng(seed)
+    baseline_groups = dict(tuple(baseline.groupby(['model_name', 'scenario'])))
+    comparisons = []
+
+    for (model_name, scenario), candidate_group in candidate.groupby(['model_name', 'scenario']):
+        baseline_group = baseline_groups.get((model_name, scenario))
+        if baseline_group is None:
+            continue
+        for metric, higher_is_worse in REGRESSION_METRICS.items():
+            before = baseline_group[metric].dropna().to_numpy()
+            after = candidate_group[metric].dropna().to_numpy()
+            if len(before) < min_samples or len(after) < min_samples:
+                continue
+
+            change, low, high = bootstrap_relative_change(before, after, n_resamples, confidence, rng)
+            _, p_value = mann_whitney_u(after, before, 'greater' if higher_is_worse else 'less')
+            if not higher_is_worse:
+                change, low, high = -change, -high, -low
+
+            comparisons.append(MetricComparison(
+                model_name=model_name,
+                scenario=scenario,
+                metric=metric,
+                baseline_samples=len(before),
+                candidate_samples=len(after),
+                baseline_median=float(np.median(before)),
+                candidate_median=float(np.median(after)),
+                change=change,
+                ci_low=low,
+                ci_high=high,
+                p_value=p_value,
+                regressed=bool(p_value < alpha and low > 0 and change > threshold)
+            ))
+
+    return comparisons
+
+
+def resolve_runs(performance_db_path: str, baseline_run_ids: Optional[Sequence[str]] = None,
+                 candidate_run_id: Optional[str] = None) -> Tuple[List[str], str]:
+    """
+    Fill in default runs: the latest run as candidate and the run before it as baseline.
+
+    :param performance_db_path: Path to SQLite performance tracking database
+    :param baseline_run_ids: Baseline runs, pooled together
+    :param candidate_run_id: Candidate run
+    :return: Baseline run ids and candidate run id
+    """
+    runs = list(list_runs(performance_db_path)['run_id'])
+    if candidate_run_id is None:
+        if not runs:
+            raise ValueError(f"No benchmark runs stored in {performance_db_path}")
+        candidate_run_id = runs[-1]
+    if not baseline_run_ids:
+        earlier = runs[:runs.index(candidate_run_id)] if candidate_run_id in runs else []
+        if not earlier:
+            raise ValueError(f"No run before {candidate_run_id} to compare against")
+        baseline_run_ids = [earlier[-1]]
+    return list(baseline_run_ids), candidate_run_id
+
+
+def compare_runs(performance_db_path: str, baseline_run_ids: Optional[Sequence[str]] = None,
+                 candidate_run_id: Optional[str] = None, **options) -> List[MetricComparison]:
+    """
+    Compare a candidate run against baseline runs stored in the performance database.
+
+    :param performance_db_path: Path to SQLite performance tracking database
+    :param baseline_run_ids: Baseline runs, the run before the candidate when omitted
+    :param candidate_run_id: Candidate run, the latest run when omitted
+    :param options: Keyword arguments of ``compare_samples``
+    :return: One comparison per model, scenario and metric
+    """
+    baseline_run_ids, candidate_run_id = resolve_runs(performance_db_path, baseline_run_ids, candidate_run_id)
+    return compare_samples(
+        load_run_samples(performance_db_path, baseline_run_ids),
+        load_run_samples(performance_db_path, [candidate_run_id]),
+        **options
+    )
+
+
+def format_comparisons(comparisons: List[MetricComparison]) -> str:
+    """
+    Render comparisons as a fixed-width table.
+
+    :param comparisons: Comparisons to render
+    :return: Table text, regressions marked with '!'
+    """
+    lines = [
+        f"  {'model':<16} {'scenario':<28} {'metric':<18} {'baseline':>10} {'candidate':>10} "
+        f"{'change':>8} {'95% CI':>17} {'p':>7}"
+    ]
+    for c in comparisons:
+        lines.append(
+            f"{'!' if c.regressed else ' '} {c.model_name:<16.16} {c.scenario:<28.28} {c.metric:<18} "
+            f"{c.baseline_median:>10.1f} {c.candidate_median:>10.1f} {c.change:>+8.1%} "
+            f"{f'[{c.ci_low:+.1%}, {c.ci_high:+.1%}]':>17} {c.p_value:>7.4f}"
+        )
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect statistically significant regressions between benchmark runs")
+    parser.add_argument('db_path', nargs='?', default='reports/model_performance.db')
+    parser.add_argument('--baseline', nargs='+', help="Baseline run ids, pooled (default: the run before the candidate)")
+    parser.add_argument('--candidate', help="Candidate run id (default: the latest run)")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Relative worsening that counts as a regression")
+    parser.add_argument('--alpha', type=float, default=0.05, help="Significance level")
+    parser.add_argument('--resamples', type=int, default=2000, help="Bootstrap resamples")
+    parser.add_argument('--list', action='store_true', help="List stored runs and exit")
+    args = parser.parse_args()
+
+    try:
+        if args.list:
+            print(list_runs(args.db_path).to_string(index=False))
+            return
+        baseline, candidate = resolve_runs(args.db_path, args.baseline, args.candidate)
+        comparisons = compare_runs(args.db_path, baseline, candidate, threshold=args.threshold,
+                                   alpha=args.alpha, n_resamples=args.resamples)
+    except (sqlite3.Error, ValueError) as e:
+        print(f"Error comparing runs: {e}")
+        sys.exit(2)
+
+    print(f"Candidate {candidate} vs baseline {', '.join(baseline)}")
+    print(format_comparisons(comparisons))
+    regressions = [c for c in comparisons if c.regressed]
+    print(f"{len(regressions)} significant regressions above {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Pytest plugin failing the session on significant benchmark regressions.
+#
+# Enabled for tests/ by conftest.py, elsewhere with ``-p regression_gate`` and ml_utils on the path.
+# With ``--regression-db`` the latest run (or ``--regression-candidate``) is compared after the tests
+# against the run before it (or ``--regression-baseline``), and the session fails when any metric
+# regressed significantly by more than ``--regression-threshold``.
+import pytest
+
+from regression_detection import compare_runs, format_comparisons, resolve_runs
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('regression', 'benchmark regression gate')
+    group.addoption('--regression-db', default=None,
+                    help="Performance database whose runs are compared after the session")
+    group.addoption('--regression-baseline', action='append', default=None,
+                    help="Baseline run id, repeatable (default: the run before the candidate)")
+    group.addoption('--regression-candidate', default=None, help="Candidate run id (default: the latest run)")
+    group.addoption('--regression-threshold', type=float, default=0.10,
+                    help="Relative worsening of a median that fails the session")
+    group.addoption('--regression-alpha', type=float, default=0.05, help="Significance level")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    db_path = config.getoption('regression_db')
+    if not db_path:
+        return
+
+    threshold = config.getoption('regression_threshold')
+    try:
+        baseline, candidate = resolve_runs(
+            db_path, config.getoption('regression_baseline'), config.getoption('regression_candidate')
+        )
+        comparisons = compare_runs(db_path, baseline, candidate, threshold=threshold,
+                                   alpha=config.getoption('regression_alpha'))
+    except Exception as e:
+        config._regression_report = (f"Error comparing runs: {e}", True)
+        session.exitstatus = pytest.ExitCode.USAGE_ERROR
+        return
+
+    regressions = [c for c in comparisons if c.regressed]
+    report = (
+        f"Candidate {candidate} vs baseline {', '.join(baseline)}\n"
+        f"{format_comparisons(comparisons)}\n"
+        f"{len(regressions)} significant regressions above {threshold:.0%}"
+    )
+    config._regression_report = (report, bool(regressions))
+    if regressions and session.exitstatus == pytest.ExitCode.OK:
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    report = getattr(config, '_regression_report', None)
+    if report is None:
+        return
+    text, failed = report
+    terminalreporter.section('benchmark regressions', red=failed, green=not failed)
+    terminalreporter.write_line(text)
@@ -0,0 +1,354 @@
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from batched_writer import BatchedWriter
+
+
+class RequestSampleStore(BatchedWriter):
+    """
+    Raw per-request sample store in the SQLite performance database.
+
+    Every benchmarked request becomes one ``request_samples`` row, so
+    percentiles can be recomputed and results sliced by run, model or
+    scenario after the fact. Rows are queued and written by a background
+    thread with one ``executemany`` per batch on a WAL-mode connection, which
+    keeps ingest well above 10k samples per second. Aggregates are derived
+    from the stored samples.
+
+    Samples are never silently lost: a busy or locked database is retried
+    with backoff, rows that still fail are kept and written with the next
+    batch, and ``flush`` returns False while any are outstanding.
+    """
+
+    SUCCESS = 'success'
+    INVALID = 'invalid'
+    ERROR = 'error'
+    TIMEOUT = 'timeout'
+
+    # Requests that returned a response, whether or not it passed validation
+    COMPLETED_STATUSES = (SUCCESS, INVALID)
+
+    COLUMNS = (
+        'run_id', 'timestamp', 'model_name', 'scenario', 'ttft_ms', 'latency_ms',
+        'input_tokens', 'output_tokens', 'status', 'error_class', 'batch_offset'
+    )
+
+    def __init__(self, performance_db_path: str, max_pending: int = 1000, batch_size: int = 5000,
+                 flush_interval: float = 0.5, full_policy: str = BatchedWriter.BLOCK,
+                 block_timeout: Optional[float] = None, busy_timeout: float = 5.0, busy_retries: int = 5,
+                 busy_backoff: float = 0.1):
+        """
+        Initialize the store and start its writer thread.
+
+        :param performance_db_path: Path to SQLite performance tracking database
+        :param max_pending: Maximum number of queued submissions
+        :param batch_size: Number of samples written per transaction
+        :param flush_interval: Maximum seconds a sample waits before being written
+        :param full_policy: 'block' (default) to apply backpressure or 'drop' to discard samples
+        :param block_timeout: Maximum seconds to wait under the 'block' policy, None waits forever
+        :param busy_timeout: Seconds SQLite waits for a lock before an attempt fails
+        :param busy_retries: Attempts per batch while the database is busy or locked
+        :param busy_backoff: Seconds before the first retry, doubled after each attempt
+        """
+        self.performance_db_path = os.path.abspath(performance_db_path)
+        self.busy_timeout = busy_timeout
+        self.busy_retries = busy_retries
+        self.busy_backoff = busy_backoff
+        self.written_samples = 0
+        self.failed_writes = 0
+        # Rows whose write failed, written ahead of the next batch
+        self._unwritten: List[tuple] = []
+        self._write_conn: Optional[sqlite3.Connection] = None
+        self._read_conn: Optional[sqlite3.Connection] = None
+        self._read_lock = threading.Lock()
+        self._insert_sql = (
+            f"INSERT INTO request_samples ({', '.join(self.COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in self.COLUMNS)})"
+        )
+
+        # Create the schema up front so readers never race the first write
+        conn = self._connect()
+        self._create_schema(conn)
+        conn.close()
+
+        super().__init__(
+            max_pending=max_pending,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            full_policy=full_policy,
+            block_timeout=block_timeout,
+            thread_name='request-sample-store'
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a WAL-mode connection to the performance database."""
+        conn = sqlite3.connect(self.performance_db_path, timeout=self.busy_timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only risks the last transactions on power loss, never corruption
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection):
+        """Create the sample table and its indexes."""
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS request_samples (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT,
+            timestamp TEXT,
+            model_name TEXT,
+            scenario TEXT,
+            ttft_ms REAL,
+            latency_ms REAL,
+            input_tokens INTEGER,
+            output_tokens INTEGER,
+            status TEXT,
+            error_class TEXT,
+            batch_offset INTEGER
+        )
+        ''')
+        # Databases created before samples were tagged with their corpus batch
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(request_samples)")}
+        if 'batch_offset' not in columns:
+            conn.execute("ALTER TABLE request_samples ADD COLUMN batch_offset INTEGER")
+        conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_request_samples_run_model
+        ON request_samples (run_id, model_name)
+        ''')
+        conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_request_samples_model_timestamp
+        ON request_samples (model_name, timestamp)
+        ''')
+        conn.commit()
+
+    def record(self, run_id: str, model_name: str, scenario: str, latency_ms: Optional[float],
+               ttft_ms: Optional[float] = None, input_tokens: Optional[int] = None,
+               output_tokens: Optional[int] = None, status: str = SUCCESS,
+               error_class: Optional[str] = None, timestamp: Optional[str] = None,
+               batch_offset: Optional[int] = None) -> bool:
+        """
+        Enqueue one request sample.
+
+        :param run_id: Benchmark run the request belongs to
+        :param model_name: Model that served the request
+        :param scenario: Scenario name
+        :param latency_ms: End-to-end latency in milliseconds, None if the request never completed
+        :param ttft_ms: Time to first token in milliseconds
+        :param input_tokens: Prompt tokens
+        :param output_tokens: Completion tokens
+        :param status: One of 'success', 'invalid', 'error', 'timeout'
+        :param error_class: Exception class name for failed requests
+        :param timestamp: ISO timestamp, now when omitted
+        :param batch_offset: Corpus offset of the batch the request belongs to, see ``delete_batch``
+        :return: False if the sample was dropped
+        """
+        return self.write((
+            run_id, timestamp or datetime.now().isoformat(), model_name, scenario, ttft_ms, latency_ms,
+            input_tokens, output_tokens, status, error_class, batch_offset
+        ))
+
+    def record_many(self, samples: List[Dict[str, Any]]) -> bool:
+        """
+        Enqueue several samples as one submission.
+
+        :param samples: Dictionaries keyed by COLUMNS; missing optional fields are stored as NULL
+        :return: False if the samples were dropped
+        """
+        now = datetime.now().isoformat()
+        return self.write_many([
+            (
+                sample['run_id'], sample.get('timestamp') or now, sample['model_name'], sample.get('scenario'),
+                sample.get('ttft_ms'), sample.get('latency_ms'), sample.get('input_tokens'),
+                sample.get('output_tokens'), sample.get('status', self.SUCCESS), sample.get('error_class'),
+                sample.get('batch_offset')
+            )
+            for sample in samples
+        ])
+
+    @property
+    def unwritten_samples(self) -> int:
+        """Samples whose write failed and is still outstanding."""
+        return len(self._unwritten)
+
+    def _write_batch(self, batch: List[tuple]):
+        """
+        Insert a batch of samples, after any previously failed rows, in a single transaction.
+
+        :param batch: Sample rows in COLUMNS order
+        """
+        rows = self._unwritten + batch
+        delay = self.busy_backoff
+        for attempt in range(self.busy_retries):
+            try:
+                if self._write_conn is None:
+                    self._write_conn = self._connect()
+                with self._write_conn:
+                    self._write_conn.executemany(self._insert_sql, rows)
+                self.written_samples += len(rows)
+                self._unwritten = []
+                return
+            except sqlite3.Error as e:
+                error = e
+                busy = isinstance(e, sqlite3.OperationalError) and any(
+                    word in str(e) for word in ('locked', 'busy')
+                )
+                if not busy or attempt == self.busy_retries - 1:
+                    break
+                time.sleep(delay)
+                delay *= 2
+
+        self._unwritten = rows
+        self.failed_writes += 1
+        print(f"Error writing request samples, {len(rows)} kept for the next write: {error}")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until everything enqueued so far is written.
+
+        :param timeout: Maximum seconds to wait, None waits forever
+        :return: True if the flush completed in time and no sample is left unwritten
+        """
+        return super().flush(timeout) and not self._unwritten
+
+    def _on_flush(self):
+        """Retry samples left over from failed writes."""
+        if self._unwritten:
+            self._write_batch([])
+
+    def _on_stop(self):
+        """Retry outstanding samples once more, then close the writer connection."""
+        if self._unwritten:
+            self._write_batch([])
+            if self._unwritten:
+                print(f"Error: {len(self._unwritten)} request samples could not be written to "
+                      f"{self.performance_db_path}")
+        if self._write_conn is not None:
+            self._write_conn.close()
+            self._write_conn = None
+
+    def delete_batch(self, run_id: str, batch_offset: int) -> int:
+        """
+        Delete a run's samples of one corpus batch, so the batch can be stored again.
+
+        :param run_id: Benchmark run
+        :param batch_offset: Corpus offset the batch starts at
+        :return: Number of samples deleted
+        """
+        # Queued samples of the batch must reach the table before they can be deleted
+        self.flush()
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "DELETE FROM request_samples WHERE run_id = ? AND batch_offset = ?", (run_id, batch_offset)
+                )
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def _query(self, query: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        """Run a read query on the shared read connection."""
+        with self._read_lock:
+            if self._read_conn is None:
+                self._read_conn = self._connect()
+                self._read_conn.row_factory = sqlite3.Row
+            return self._read_conn.execute(query, params).fetchall()
+
+    def run_summary(self, run_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Aggregate one run's samples per model.
+
+        Latency, TTFT and throughput figures only count completed requests;
+        throughput is total output tokens over total completed latency.
+        Call ``flush`` first to include samples still queued.
+
+        :param run_id: Benchmark run
+        :return: Mapping of model name to request counts, latency and token statistics
+        """
+        completed = ', '.join(f"'{status}'" for status in self.COMPLETED_STATUSES)
+        rows = self._query(f'''
+        SELECT model_name,
+            COUNT(*) AS requests,
+            SUM(status = '{self.SUCCESS}') AS success_count,
+            SUM(status IN ({completed})) AS completed_count,
+            AVG(CASE WHEN status IN ({completed}) THEN latency_ms END) AS avg_latency_ms,
+            AVG(CASE WHEN status IN ({completed}) THEN ttft_ms END) AS avg_ttft_ms,
+            SUM(CASE WHEN status IN ({completed}) THEN output_tokens END) AS output_tokens,
+            SUM(CASE WHEN status IN ({completed}) THEN latency_ms END) AS completed_latency_ms,
+            SUM(latency_ms) AS total_latency_ms
+        FROM request_samples
+        WHERE run_id = ?
+        GROUP BY model_name
+        ''', (run_id,))
+
+        medians = self.latency_percentiles(50, run_id=run_id)
+        summary = {}
+        for row in rows:
+            completed_seconds = (row['completed_latency_ms'] or 0) / 1000
+            summary[row['model_name']] = {
+                'requests': row['requests'],
+                'success_count': row['success_count'],
+                'error_count': row['requests'] - row['success_count'],
+                'avg_latency_ms': row['avg_latency_ms'],
+                'median_latency_ms': medians.get(row['model_name']),
+                'avg_ttft_ms': row['avg_ttft_ms'],
+                'output_tokens': row['output_tokens'] or 0,
+                'tokens_per_second': (row['output_tokens'] or 0) / completed_seconds if completed_seconds > 0 else 0.0,
+                'total_latency_s': (row['total_latency_ms'] or 0) / 1000
+            }
+        return summary
+
+    def latency_percentiles(self, percentile: float, column: str = 'latency_ms', run_id: Optional[str] = None,
+                            models: Optional[Sequence[str]] = None) -> Dict[str, float]:
+        """
+        Nearest-rank percentile of completed requests per model, computed with
+        window functions inside SQLite.
+
+        :param percentile: Percentile in the range (0, 100]
+        :param column: 'latency_ms' or 'ttft_ms'
+        :param run_id: Restrict to one run, all runs when omitted
+        :param models: Restrict to these models, all models when omitted
+        :return: Mapping of model name to percentile value
+        """
+        if not 0 < percentile <= 100:
+            raise ValueError("percentile must be in the range (0, 100]")
+        if column not in ('latency_ms', 'ttft_ms'):
+            raise ValueError("column must be 'latency_ms' or 'ttft_ms'")
+
+        filters = [f"{column} IS NOT NULL", f"status IN ({', '.join('?' for _ in self.COMPLETED_STATUSES)})"]
+        params: List[Any] = list(self.COMPLETED_STATUSES)
+        if run_id is not None:
+            filters.append("run_id = ?")
+            params.append(run_id)
+        if models is not None:
+            filters.append(f"model_name IN ({', '.join('?' for _ in models)})")
+            params.extend(models)
+        fraction = percentile / 100
+
+        rows = self._query(f'''
+        SELECT model_name, value FROM (
+            SELECT model_name, {column} AS value,
+                ROW_NUMBER() OVER (PARTITION BY model_name ORDER BY {column}) AS value_rank,
+                COUNT(*) OVER (PARTITION BY model_name) AS value_count
+            FROM request_samples
+            WHERE {' AND '.join(filters)}
+        )
+        WHERE value_rank = MAX(1, CAST(? * value_count AS INTEGER) + (? * value_count > CAST(? * value_count AS INTEGER)))
+        ''', params + [fraction, fraction, fraction])
+        return {row['model_name']: row['value'] for row in rows}
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """
+        Write pending samples and close the store connections.
+
+        :param timeout: Maximum seconds to wait for the final flush
+        """
+        super().close(timeout)
+        with self._read_lock:
+            if self._read_conn is not None:
+                self._read_conn.close()
+                self._read_conn = None
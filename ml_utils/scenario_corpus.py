@@ -0,0 +1,143 @@
+import os
+import json
+import gzip
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+
+@dataclass
+class CorpusEntry:
+    """One scenario read from a corpus, with the byte offset just past its line"""
+    index: int
+    next_offset: int
+    scenario: Dict[str, Any]
+
+
+class ScenarioCorpus:
+    """
+    Benchmark scenarios streamed lazily from a JSONL file.
+
+    Each non-empty line is a JSON object holding at least a prompt. Lines
+    are read one at a time, so a corpus of any size costs only the memory of
+    the batch being evaluated. Reading can start from a byte offset recorded
+    by a checkpoint; ``.gz`` corpora are supported but have to be
+    decompressed up to that offset again.
+    """
+
+    def __init__(self, path: str, prompt_field: str = 'prompt', name_field: str = 'name'):
+        """
+        Initialize the corpus.
+
+        :param path: JSONL file, optionally gzip-compressed
+        :param prompt_field: Field holding the prompt
+        :param name_field: Field holding the scenario name, ``scenario-<index>`` when missing
+        """
+        self.path = path
+        self.prompt_field = prompt_field
+        self.name_field = name_field
+
+    def _open(self):
+        return gzip.open(self.path, 'rb') if self.path.endswith('.gz') else open(self.path, 'rb')
+
+    def entries(self, start_offset: int = 0, start_index: int = 0) -> Iterator[CorpusEntry]:
+        """
+        Stream scenarios with their position in the file.
+
+        Lines that are not JSON objects with a prompt are reported and skipped.
+
+        :param start_offset: Byte offset to resume reading from
+        :param start_index: Index of the first scenario read
+        :return: Iterator of corpus entries
+        """
+        index = start_index
+        with self._open() as f:
+            f.seek(start_offset)
+            while True:
+                line = f.readline()
+                if not line:
+                    break
+                offset = f.tell()
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    prompt = record[self.prompt_field]
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"Skipping malformed scenario before byte {offset} of {self.path}: {e}")
+                    continue
+                scenario = dict(record, prompt=prompt, name=record.get(self.name_field) or f"scenario-{index}")
+                yield CorpusEntry(index=index, next_offset=offset, scenario=scenario)
+                index += 1
+
+    def batches(self, batch_size: int, start_offset: int = 0, start_index: int = 0) -> Iterator[List[CorpusEntry]]:
+        """
+        Stream scenarios in batches.
+
+        :param batch_size: Scenarios per batch
+        :param start_offset: Byte offset to resume reading from
+        :param start_index: Index of the first scenario read
+        :return: Iterator of entry lists, the last one possibly shorter
+        """
+        batch = []
+        for entry in self.entries(start_offset, start_index):
+            batch.append(entry)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (entry.scenario for entry in self.entries())
+
+
+class SweepCheckpoint:
+    """
+    Progress of a sweep over a scenario corpus, kept in a small JSON file.
+
+    The state records the corpus, the byte offset up to which scenarios are
+    done and whatever the benchmark needs to resume its run. It is replaced
+    atomically, so an interruption leaves either the previous or the new
+    state behind.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the checkpoint.
+
+        :param path: Checkpoint file
+        """
+        self.path = path
+
+    def load(self, corpus_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Read the saved state of a sweep over a corpus.
+
+        :param corpus_path: Corpus the sweep reads
+        :return: Saved state, None when there is none or it belongs to another corpus
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            state = json.load(f)
+        if state.get('corpus') != os.path.abspath(corpus_path):
+            print(f"Ignoring checkpoint {self.path} of another corpus: {state.get('corpus')}")
+            return None
+        return state
+
+    def save(self, corpus_path: str, state: Dict[str, Any]):
+        """
+        Replace the saved state.
+
+        :param corpus_path: Corpus the sweep reads
+        :param state: JSON-serializable state, including the resume ``offset``
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(dict(state, corpus=os.path.abspath(corpus_path)), f)
+        os.replace(self.path + '.tmp', self.path)
+
+    def clear(self):
+        """Remove the checkpoint once the sweep has completed."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,61 @@
+import os
+import json
+from typing import Dict, List, Any, Optional
+
+from batched_writer import BatchedWriter
+
+
+class SelectionLogSink(BatchedWriter):
+    """
+    Non-blocking JSONL writer for model selection logs.
+
+    Callers enqueue log entries and return immediately; a background thread
+    serializes them and appends them to disk in batches, flushing when a batch
+    reaches ``batch_size`` entries or ``flush_interval`` seconds have passed.
+    """
+
+    def __init__(self, log_file: str = 'logs/model_selection.jsonl', max_pending: int = 10000,
+                 batch_size: int = 512, flush_interval: float = 1.0, full_policy: str = BatchedWriter.DROP,
+                 block_timeout: Optional[float] = None):
+        """
+        Initialize the sink and start its writer thread.
+
+        :param log_file: Path of the JSONL log to append to
+        :param max_pending: Maximum number of queued submissions
+        :param batch_size: Number of entries that triggers a write
+        :param flush_interval: Maximum seconds an entry waits before being written
+        :param full_policy: 'drop' to discard entries or 'block' to wait when the queue is full
+        :param block_timeout: Maximum seconds to wait under the 'block' policy, None waits forever
+        """
+        # Resolved now so later working-directory changes don't move the log
+        self.log_file = os.path.abspath(log_file)
+        self._log_dir_ready = False
+        super().__init__(
+            max_pending=max_pending,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            full_policy=full_policy,
+            block_timeout=block_timeout,
+            thread_name='selection-log-sink'
+        )
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        """
+        Append a batch of entries to the log file with a single write.
+
+        Write errors propagate to the writer loop, which reports them and
+        counts the batch in ``failed_entries``.
+
+        :param batch: Entries to write
+        """
+        lines = ''.join(json.dumps(entry) + '\n' for entry in batch)
+        try:
+            if not self._log_dir_ready:
+                os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
+                self._log_dir_ready = True
+            with open(self.log_file, 'a') as f:
+                f.write(lines)
+        except OSError:
+            # The directory may have been removed; recreate it before the next batch
+            self._log_dir_ready = False
+            raise
@@ -0,0 +1,218 @@
+import os
+import json
+import gzip
+import time
+import threading
+from collections import defaultdict, deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from completion_cache import cache_key
+
+# Request parameters that identify a recorded interaction; transport options are ignored
+MATCH_PARAMS = ('model', 'messages', 'temperature', 'top_p', 'max_tokens', 'stream')
+
+
+class CassetteMissError(LookupError):
+    """Raised when a replayed request was never recorded."""
+
+
+def interaction_key(request: Dict[str, Any]) -> str:
+    """
+    Address of a request within a cassette.
+
+    :param request: ``chat.completions.create`` keyword arguments
+    :return: Key matching requests that differ only in transport options
+    """
+    params = {name: request.get(name) for name in MATCH_PARAMS}
+    return cache_key(**params)
+
+
+class _RecordingStream:
+    """Passes a stream's chunks through while timestamping them."""
+
+    def __init__(self, stream: Any, recorder: 'CassetteRecorder', request: Dict[str, Any], started_at: float):
+        self._stream = stream
+        self._recorder = recorder
+        self._request = request
+        self._started_at = started_at
+        self._chunks: List[List[Any]] = []
+
+    def __iter__(self) -> Iterator[Any]:
+        for chunk in self._stream:
+            offset_ms = (time.perf_counter() - self._started_at) * 1000
+            self._chunks.append([round(offset_ms, 3), chunk.model_dump(exclude_none=True)])
+            yield chunk
+        self._recorder._append({
+            'request': self._request,
+            'chunks': self._chunks,
+            'total_ms': round((time.perf_counter() - self._started_at) * 1000, 3)
+        })
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+class _RecordingCompletions:
+    def __init__(self, completions: Any, recorder: 'CassetteRecorder'):
+        self._completions = completions
+        self._recorder = recorder
+
+    def create(self, **kwargs) -> Any:
+        request = {name: kwargs[name] for name in MATCH_PARAMS if name in kwargs}
+        started_at = time.perf_counter()
+        response = self._completions.create(**kwargs)
+        if kwargs.get('stream'):
+            return _RecordingStream(response, self._recorder, request, started_at)
+        self._recorder._append({
+            'request': request,
+            'response': response.model_dump(exclude_none=True),
+            'total_ms': round((time.perf_counter() - started_at) * 1000, 3)
+        })
+        return response
+
+
+class CassetteRecorder:
+    """
+    Records chat completions made through a client into a cassette file.
+
+    Wrap an OpenAI-compatible client and use it as usual. Each completed
+    request is appended to the cassette as one gzip-compressed JSON line
+    holding the request, and either every streamed chunk with its arrival
+    offset in milliseconds from the moment the request was sent or the
+    non-streaming response with its latency. Streams are recorded once they
+    have been fully consumed.
+    """
+
+    def __init__(self, client: Any, path: str):
+        """
+        Initialize the recorder, appending to an existing cassette.
+
+        :param client: OpenAI-compatible client
+        :param path: Cassette file, conventionally ``*.jsonl.gz``
+        """
+        self._client = client
+        self.path = path
+        self.recorded = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.chat = type('Chat', (), {})()
+        self.chat.completions = _RecordingCompletions(client.chat.completions, self)
+
+    def _append(self, interaction: Dict[str, Any]):
+        line = json.dumps(interaction, separators=(',', ':'), ensure_ascii=False) + '\n'
+        with self._lock:
+            # One gzip member per interaction keeps appends cheap and the file readable as a whole
+            with gzip.open(self.path, 'at', encoding='utf-8') as f:
+                f.write(line)
+            self.recorded += 1
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+def load_cassette(path: str) -> List[Dict[str, Any]]:
+    """
+    Read every interaction of a cassette.
+
+    :param path: Cassette file
+    :return: Interactions in recording order
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class _ReplayStream:
+    """Re-emits recorded chunks on their original schedule, scaled by the replay speed."""
+
+    def __init__(self, chunks: List[Tuple[float, Any]], speed: Optional[float], sleep: Callable[[float], None]):
+        self._chunks = chunks
+        self._speed = speed
+        self._sleep = sleep
+        self._started_at = time.perf_counter()
+
+    def __iter__(self) -> Iterator[Any]:
+        for offset_ms, chunk in self._chunks:
+            if self._speed is not None:
+                # Sleep to an absolute deadline so per-chunk overhead does not accumulate as drift
+                delay = self._started_at + offset_ms / 1000 / self._speed - time.perf_counter()
+                if delay > 0:
+                    self._sleep(delay)
+            yield chunk
+
+    def close(self):
+        pass
+
+
+class _ReplayCompletions:
+    def __init__(self, client: 'CassetteClient'):
+        self._client = client
+
+    def create(self, **kwargs) -> Any:
+        client = self._client
+        replay = client._next_interaction(kwargs)
+        if 'chunks' in replay:
+            return _ReplayStream(replay['chunks'], client.speed, client.sleep)
+
+        if client.speed is not None:
+            client.sleep(replay['total_ms'] / 1000 / client.speed)
+        return replay['response']
+
+
+class CassetteClient:
+    """
+    Network-free stand-in for an OpenAI client that replays a cassette.
+
+    ``chat.completions.create`` returns the recorded stream or response for
+    a matching request. Chunks arrive on their recorded schedule divided by
+    ``speed``: 1.0 replays original timing, 2.0 twice as fast and None as
+    fast as the caller consumes them. Requests recorded several times are
+    replayed in recording order, cycling once exhausted.
+
+    Chunk and response objects are built once when the cassette is loaded,
+    so replay cost is the caller's own handling; every replay of a recording
+    returns the same objects, which callers must not modify.
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = 1.0, sleep: Callable[[float], None] = time.sleep):
+        """
+        Load a cassette for replay.
+
+        :param path: Cassette file
+        :param speed: Timing scale factor, None for maximum speed
+        :param sleep: Sleep function, replaceable in tests
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive or None")
+        from openai.types.chat import ChatCompletion, ChatCompletionChunk
+        self.path = path
+        self.speed = speed
+        self.sleep = sleep
+        self.interactions = load_cassette(path)
+        # Replayable form of each interaction, with the SDK objects built up front
+        self._by_key: Dict[str, deque] = defaultdict(deque)
+        for interaction in self.interactions:
+            if 'chunks' in interaction:
+                replay = {'chunks': [(offset_ms, ChatCompletionChunk.construct(**payload))
+                                     for offset_ms, payload in interaction['chunks']]}
+            else:
+                replay = {'response': ChatCompletion.construct(**interaction['response']),
+                          'total_ms': interaction['total_ms']}
+            self._by_key[interaction_key(interaction['request'])].append(replay)
+        self._lock = threading.Lock()
+        self.chat = type('Chat', (), {})()
+        self.chat.completions = _ReplayCompletions(self)
+
+    def _next_interaction(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Pop the next replayable recording of a request and queue it again at the back."""
+        with self._lock:
+            recordings = self._by_key.get(interaction_key(request))
+            if not recordings:
+                raise CassetteMissError(
+                    f"No recorded interaction for model {request.get('model')!r} in {self.path}"
+                )
+            interaction = recordings.popleft()
+            recordings.append(interaction)
+            return interaction
+
+    def close(self):
+        pass
@@ -0,0 +1,271 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import numpy as np
+
+from token_accounting import count_tokens, tokenizer_source
+
+
+@dataclass
+class StreamMeasurement:
+    """Timing and token accounting of one streamed completion."""
+    content: str
+    ttft_ms: Optional[float]
+    total_time_ms: float
+    inter_chunk_gaps_ms: List[float] = field(default_factory=list)
+    output_tokens: int = 0
+    input_tokens: Optional[int] = None
+    # 'usage' when reported by the provider, otherwise 'tiktoken' or 'estimate' (see token_accounting)
+    token_source: str = 'usage'
+    # True when the caller stopped the stream before the provider finished it
+    cancelled: bool = False
+
+    @property
+    def chunk_count(self) -> int:
+        """Number of content-bearing chunks received."""
+        return len(self.inter_chunk_gaps_ms) + (1 if self.ttft_ms is not None else 0)
+
+    @property
+    def tokens_per_second(self) -> float:
+        """Output tokens over the full request duration."""
+        return self.output_tokens / (self.total_time_ms / 1000) if self.total_time_ms > 0 else 0.0
+
+    @property
+    def decode_tokens_per_second(self) -> float:
+        """Output tokens after the first one over the time spent streaming them."""
+        if self.ttft_ms is None or self.output_tokens < 2:
+            return 0.0
+        decode_ms = self.total_time_ms - self.ttft_ms
+        return (self.output_tokens - 1) / (decode_ms / 1000) if decode_ms > 0 else 0.0
+
+    def gap_percentile(self, percentile: float) -> Optional[float]:
+        """
+        Percentile of the inter-chunk gaps.
+
+        :param percentile: Percentile in the range [0, 100]
+        :return: Gap in milliseconds, None when fewer than two chunks arrived
+        """
+        if not self.inter_chunk_gaps_ms:
+            return None
+        return float(np.percentile(self.inter_chunk_gaps_ms, percentile))
+
+
+class StreamTimer:
+    """
+    Records arrival times of streamed content chunks.
+
+    Call ``start`` right before issuing the request, ``chunk`` for every
+    piece of content as it arrives and ``finish`` once the stream ends.
+    Chunks without content (role headers, usage-only trailers) must not be
+    passed to ``chunk`` so they do not distort TTFT or the gap distribution.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self._started_at: Optional[float] = None
+        self._last_chunk_at: Optional[float] = None
+        self.ttft_ms: Optional[float] = None
+        self.gaps_ms: List[float] = []
+        self.parts: List[str] = []
+
+    def start(self):
+        """Mark the moment the request is sent."""
+        self._started_at = self.clock()
+
+    def chunk(self, text: str):
+        """Record the arrival of a content chunk."""
+        now = self.clock()
+        if self._last_chunk_at is None:
+            self.ttft_ms = (now - self._started_at) * 1000
+        else:
+            self.gaps_ms.append((now - self._last_chunk_at) * 1000)
+        self._last_chunk_at = now
+        self.parts.append(text)
+
+    def finish(self, output_tokens: Optional[int] = None, input_tokens: Optional[int] = None,
+               model: Optional[str] = None) -> StreamMeasurement:
+        """
+        Close the measurement.
+
+        :param output_tokens: Completion tokens reported by the provider, if any
+        :param input_tokens: Prompt tokens reported by the provider, if any
+        :param model: Model whose tokenizer counts the content when no usage was reported
+        :return: Measurement; without usage data the content is counted locally
+        """
+        total_time_ms = (self.clock() - self._started_at) * 1000
+        content = ''.join(self.parts)
+        token_source = 'usage'
+        if output_tokens is None:
+            output_tokens = count_tokens(content, model)
+            token_source = tokenizer_source(model)
+        return StreamMeasurement(
+            content=content,
+            ttft_ms=self.ttft_ms,
+            total_time_ms=total_time_ms,
+            inter_chunk_gaps_ms=self.gaps_ms,
+            output_tokens=output_tokens,
+            input_tokens=input_tokens,
+            token_source=token_source
+        )
+
+
+def measure_openai_stream(client, model: str, messages: List[Dict[str, str]], max_tokens: int = 500,
+                          on_chunk: Optional[Callable[[str], bool]] = None, **request_kwargs) -> StreamMeasurement:
+    """
+    Stream a chat completion from an OpenAI-compatible endpoint (OpenAI, NVIDIA NIM).
+
+    Usage is requested through ``stream_options`` so the final chunk carries
+    the exact completion token count. When ``on_chunk`` returns True the
+    stream is closed right away; the provider stops generating, no usage
+    chunk arrives and the measurement is marked ``cancelled``.
+
+    :param client: ``openai.OpenAI`` client
+    :param model: Model identifier
+    :param messages: Chat messages
+    :param max_tokens: Completion token limit
+    :param on_chunk: Called with each content chunk, returns True to cancel the stream
+    :return: Stream measurement
+    """
+    timer = StreamTimer()
+    usage = None
+    extra_body = {'stream_options': {'include_usage': True}, **request_kwargs.pop('extra_body', {})}
+
+    timer.start()
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        stream=True,
+        extra_body=extra_body,
+        **request_kwargs
+    )
+    cancelled = False
+    for chunk in stream:
+        if getattr(chunk, 'usage', None) is not None:
+            usage = chunk.usage
+        if chunk.choices and chunk.choices[0].delta.content:
+            timer.chunk(chunk.choices[0].delta.content)
+            if on_chunk is not None and on_chunk(chunk.choices[0].delta.content):
+                stream.close()
+                cancelled = True
+                break
+
+    measurement = timer.finish(
+        output_tokens=usage.completion_tokens if usage is not None else None,
+        input_tokens=usage.prompt_tokens if usage is not None else None,
+        model=model
+    )
+    measurement.cancelled = cancelled
+    return measurement
+
+
+def measure_anthropic_stream(client, model: str, prompt: str, max_tokens: int = 500) -> StreamMeasurement:
+    """
+    Stream a completion from Anthropic.
+
+    Uses the Messages API event stream, whose ``message_start`` and
+    ``message_delta`` events carry input and output token usage. SDKs that
+    predate it fall back to the streaming Text Completions API, which reports
+    no usage.
+
+    :param client: ``anthropic.Anthropic`` client
+    :param model: Model identifier
+    :param prompt: User prompt
+    :param max_tokens: Completion token limit
+    :return: Stream measurement
+    """
+    timer = StreamTimer()
+
+    if hasattr(client, 'messages'):
+        input_tokens = None
+        output_tokens = None
+        timer.start()
+        stream = client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True
+        )
+        for event in stream:
+            if event.type == 'message_start':
+                input_tokens = event.message.usage.input_tokens
+            elif event.type == 'content_block_delta' and getattr(event.delta, 'text', None):
+                timer.chunk(event.delta.text)
+            elif event.type == 'message_delta':
+                output_tokens = event.usage.output_tokens
+        return timer.finish(output_tokens=output_tokens, input_tokens=input_tokens, model=model)
+
+    import anthropic
+    timer.start()
+    stream = client.completions.create(
+        model=model,
+        max_tokens_to_sample=max_tokens,
+        prompt=f"{anthropic.HUMAN_PROMPT} {prompt}{anthropic.AI_PROMPT}",
+        stream=True
+    )
+    for completion in stream:
+        if completion.completion:
+            timer.chunk(completion.completion)
+    return timer.finish(model=model)
+
+
+def measure_gemini_stream(genai, model: str, prompt: str, max_tokens: int = 500) -> StreamMeasurement:
+    """
+    Stream a completion from Google through ``google.generativeai``.
+
+    :param genai: Configured ``google.generativeai`` module
+    :param model: Model identifier
+    :param prompt: User prompt
+    :param max_tokens: Completion token limit
+    :return: Stream measurement
+    """
+    timer = StreamTimer()
+    usage = None
+
+    timer.start()
+    stream = genai.GenerativeModel(model).generate_content(
+        prompt,
+        generation_config={'max_output_tokens': max_tokens},
+        stream=True
+    )
+    for chunk in stream:
+        if getattr(chunk, 'usage_metadata', None) is not None:
+            usage = chunk.usage_metadata
+        text = chunk.text if chunk.parts else ''
+        if text:
+            timer.chunk(text)
+
+    return timer.finish(
+        output_tokens=getattr(usage, 'candidates_token_count', None) if usage is not None else None,
+        input_tokens=getattr(usage, 'prompt_token_count', None) if usage is not None else None,
+        model=model
+    )
+
+
+def summarize_streams(measurements: Iterable[StreamMeasurement]) -> Dict[str, Any]:
+    """
+    Aggregate stream measurements into capacity-planning figures.
+
+    Token throughput is total output tokens over total streaming time, so long
+    responses weigh in proportionally rather than as one sample each.
+
+    :param measurements: Stream measurements
+    :return: Dictionary of TTFT, inter-chunk gap and throughput statistics
+    """
+    measurements = list(measurements)
+    ttfts = [m.ttft_ms for m in measurements if m.ttft_ms is not None]
+    gaps = [gap for m in measurements for gap in m.inter_chunk_gaps_ms]
+    total_tokens = sum(m.output_tokens for m in measurements)
+    total_seconds = sum(m.total_time_ms for m in measurements) / 1000
+
+    return {
+        'requests': len(measurements),
+        'output_tokens': total_tokens,
+        'tokens_per_second': total_tokens / total_seconds if total_seconds > 0 else 0.0,
+        'avg_ttft_ms': float(np.mean(ttfts)) if ttfts else None,
+        'p95_ttft_ms': float(np.percentile(ttfts, 95)) if ttfts else None,
+        'p50_inter_chunk_ms': float(np.percentile(gaps, 50)) if gaps else None,
+        'p95_inter_chunk_ms': float(np.percentile(gaps, 95)) if gaps else None,
+        'p99_inter_chunk_ms': float(np.percentile(gaps, 99)) if gaps else None,
+        'usage_reported': sum(1 for m in measurements if m.token_source == 'usage')
+    }
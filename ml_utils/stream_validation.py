@@ -0,0 +1,124 @@
+import re
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+
+class MarkerScanner:
+    """
+    Multi-pattern matcher fed text incrementally.
+
+    Each piece of text is searched together with a carried-over tail of the
+    text before it, one character shorter than the longest pattern, so
+    matches that span chunk boundaries are found and none is reported twice.
+    A compiled alternation of all patterns rules out most chunks in one
+    regex search; only chunks it hits are searched per pattern with
+    ``str.find``. Matching is case-insensitive.
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        """
+        Prepare the scanner.
+
+        :param patterns: Non-empty strings to look for
+        """
+        if any(not pattern for pattern in patterns):
+            raise ValueError("patterns must be non-empty")
+        self.patterns = list(patterns)
+        self._lowered = [pattern.lower() for pattern in self.patterns]
+        # One C-level search rules out the common chunk that contains no pattern at all
+        self._any_pattern = re.compile('|'.join(map(re.escape, self._lowered)))
+        self._tail_length = max((len(pattern) for pattern in self._lowered), default=1) - 1
+        self._tail = ''
+
+    def feed(self, text: str) -> Set[int]:
+        """
+        Advance over the next piece of text.
+
+        :param text: Text following everything fed so far
+        :return: Indices of the patterns whose match ends within ``text``
+        """
+        tail = self._tail
+        window = tail + text.lower()
+        found: Set[int] = set()
+        if self._any_pattern.search(window):
+            for index, pattern in enumerate(self._lowered):
+                # Occurrences ending inside the tail were reported by the previous call
+                if window.find(pattern, max(0, len(tail) - len(pattern) + 1)) != -1:
+                    found.add(index)
+        self._tail = window[-self._tail_length:] if self._tail_length else ''
+        return found
+
+    def reset(self):
+        """Forget the text fed so far."""
+        self._tail = ''
+
+
+class StreamingValidator:
+    """
+    Validates a streamed response chunk by chunk.
+
+    A response passes when every required marker appears and no forbidden
+    marker does. ``feed`` reports as soon as the verdict can no longer
+    change: a forbidden marker decides a failure, and once every required
+    marker has been seen a pass is decided if no forbidden markers are
+    configured. Callers can then cancel the stream instead of paying for
+    the rest of the generation.
+    """
+
+    def __init__(self, required: Sequence[str] = (), forbidden: Sequence[str] = ()):
+        """
+        Initialize the validator.
+
+        :param required: Markers that must all appear
+        :param forbidden: Markers that fail the response when they appear
+        """
+        self.required = list(required)
+        self.forbidden = list(forbidden)
+        self._matcher = MarkerScanner(self.required + self.forbidden) if self.required or self.forbidden else None
+        self._missing = set(range(len(self.required)))
+        self.failed_on: Optional[str] = None
+
+    @classmethod
+    def for_scenario(cls, scenario: Dict[str, Any]) -> 'StreamingValidator':
+        """
+        Validator for a benchmark scenario.
+
+        Required markers are the scenario's ``expected_sections``, or its
+        ``expected_components`` when it has no sections; ``forbidden_markers``
+        are optional.
+
+        :param scenario: Scenario dictionary
+        :return: Validator
+        """
+        required = scenario.get('expected_sections') or scenario.get('expected_components') or ()
+        return cls(required=required, forbidden=scenario.get('forbidden_markers', ()))
+
+    @property
+    def decided(self) -> bool:
+        """Whether more text can no longer change the verdict."""
+        return self.failed_on is not None or (not self._missing and not self.forbidden)
+
+    @property
+    def passed(self) -> bool:
+        """Verdict over the text fed so far."""
+        return self.failed_on is None and not self._missing
+
+    @property
+    def missing(self) -> List[str]:
+        """Required markers not seen yet."""
+        return [self.required[index] for index in sorted(self._missing)]
+
+    def feed(self, text: str) -> bool:
+        """
+        Validate the next chunk of the response.
+
+        :param text: Chunk content
+        :return: True once the verdict is decided; always False without markers, which have nothing to decide early
+        """
+        if self._matcher is None:
+            return False
+        for index in self._matcher.feed(text):
+            if index < len(self.required):
+                self._missing.discard(index)
+            elif self.failed_on is None:
+                self.failed_on = self.forbidden[index - len(self.required)]
+        return self.decided
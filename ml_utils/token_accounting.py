@@ -0,0 +1,146 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to an approximation of BPE tokenization
+    tiktoken = None
+
+# Encoding for models tiktoken does not know, such as DeepSeek or Claude served through compatible endpoints
+DEFAULT_ENCODING = 'cl100k_base'
+
+# Pieces BPE tokenizers rarely merge across: CJK characters, letter runs, digit groups, whitespace, punctuation
+_PIECES = re.compile(
+    r"(?P<cjk>[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff])"
+    r"|(?P<letters>[^\W\d_]+)"
+    r"|(?P<digits>\d{1,3})"
+    r"|(?P<space>\s+)"
+    r"|(?P<symbols>[^\w\s]+|_+)"
+)
+
+
+@dataclass
+class TokenUsage:
+    """Token counts of one completion and where they came from."""
+    output_tokens: int
+    input_tokens: Optional[int] = None
+    # 'usage' when reported by the provider, otherwise 'tiktoken' or 'estimate'
+    source: str = 'usage'
+
+
+def approximate_token_count(text: str) -> int:
+    """
+    Approximate the token count of text without a tokenizer.
+
+    Mirrors how BPE vocabularies split text: every CJK character is about
+    one token, letter runs take one token per five characters, numbers one
+    per three digits and punctuation one per two symbols. A single space
+    merges into the following word; other whitespace runs cost one token.
+
+    :param text: Text to count
+    :return: Estimated token count
+    """
+    count = 0
+    for match in _PIECES.finditer(text):
+        kind = match.lastgroup
+        length = match.end() - match.start()
+        if kind in ('cjk', 'digits'):
+            count += 1
+        elif kind == 'letters':
+            count += -(-length // 5)
+        elif kind == 'symbols':
+            count += -(-length // 2)
+        elif match.group() != ' ':
+            count += 1
+    return count
+
+
+@lru_cache(maxsize=None)
+def get_encoder(model: Optional[str] = None):
+    """
+    Tokenizer for a model, loaded once per process.
+
+    :param model: Model identifier; unknown models use ``DEFAULT_ENCODING``
+    :return: tiktoken encoding, None when tiktoken is unavailable
+    """
+    if tiktoken is None:
+        return None
+    try:
+        if model:
+            try:
+                # Provider-prefixed identifiers such as 'openai/gpt-4o' name the model last
+                return tiktoken.encoding_for_model(model.split('/')[-1])
+            except KeyError:
+                pass
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as e:
+        # Encodings are downloaded on first use; offline machines fall back to the approximation
+        print(f"Error loading tokenizer for {model}: {e}")
+        return None
+
+
+def tokenizer_source(model: Optional[str] = None) -> str:
+    """
+    Name of the local counting method used for a model.
+
+    :param model: Model identifier
+    :return: 'tiktoken' or 'estimate'
+    """
+    return 'tiktoken' if get_encoder(model) is not None else 'estimate'
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Count the tokens of text locally.
+
+    Results are memoized, since benchmarks send the same prompts repeatedly.
+
+    :param text: Text to count
+    :param model: Model whose tokenizer to use
+    :return: Token count
+    """
+    encoder = get_encoder(model)
+    if encoder is None:
+        return approximate_token_count(text)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[Dict[str, str]], model: Optional[str] = None) -> int:
+    """
+    Count the tokens of chat messages locally, ignoring per-message framing.
+
+    :param messages: Chat messages
+    :param model: Model whose tokenizer to use
+    :return: Token count
+    """
+    return sum(count_tokens(str(message.get('content') or ''), model) for message in messages)
+
+
+def response_usage(response: Any, model: Optional[str] = None,
+                   messages: Optional[List[Dict[str, str]]] = None) -> TokenUsage:
+    """
+    Token usage of a non-streamed chat completion.
+
+    Provider ``usage`` fields are used when present; otherwise the
+    completion, and the prompt when ``messages`` are given, are counted
+    locally.
+
+    :param response: OpenAI-compatible chat completion
+    :param model: Model identifier, defaults to the response's model
+    :param messages: Messages sent, to count prompt tokens without usage data
+    :return: Token usage
+    """
+    usage = getattr(response, 'usage', None)
+    if usage is not None and getattr(usage, 'completion_tokens', None) is not None:
+        return TokenUsage(output_tokens=usage.completion_tokens, input_tokens=getattr(usage, 'prompt_tokens', None))
+
+    model = model or getattr(response, 'model', None)
+    content = ''.join(choice.message.content or '' for choice in response.choices)
+    return TokenUsage(
+        output_tokens=count_tokens(content, model),
+        input_tokens=count_message_tokens(messages, model) if messages is not None else None,
+        source=tokenizer_source(model)
+    )
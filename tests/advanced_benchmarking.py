@@ -1,21 +1,49 @@
 import os
+import sys
 import json
 import sqlite3
 import time
+import uuid
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import plotly.graph_objects as go
 import plotly.io as pio
 import numpy as np
 from dataclasses import dataclass, asdict
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
-from openai import OpenAI
-import anthropic  # Added for Claude support
-import google.generativeai as palm  # Added for PaLM support
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from client_registry import get_client
+from performance_rollups import PerformanceRollups
+from quantile_sketch import DDSketch, LatencySketchStore
+from request_samples import RequestSampleStore
+from scenario_corpus import ScenarioCorpus, SweepCheckpoint
+from rate_limiter import get_rate_limiter
+from stream_metrics import measure_anthropic_stream, measure_gemini_stream, measure_openai_stream
+from token_accounting import count_tokens
 
 # Load environment variables
 load_dotenv()
 
+# Environment variable holding each provider's API key
+PROVIDER_API_KEY_ENV = {
+    'openai': 'OPENAI_API_KEY',
+    'deepseek': 'NVIDIA_API_KEY',
+    'anthropic': 'ANTHROPIC_API_KEY',
+    'google': 'GOOGLE_API_KEY'
+}
+
+# Default in-flight requests per provider for the concurrent benchmark mode
+PROVIDER_CONCURRENCY_LIMITS = {
+    'openai': 8,
+    'deepseek': 4,
+    'anthropic': 4,
+    'google': 4
+}
+
 @dataclass
 class ModelPerformanceMetrics:
     timestamp: str
@@ -27,12 +55,22 @@ class ModelPerformanceMetrics:
     task_success_rate: float
     error_rate: float
     total_execution_time: float
+    avg_time_to_first_token: float = 0.0
+    p95_inter_chunk_latency: float = 0.0
 
 class AdvancedModelBenchmark:
     def __init__(self, models: List[Dict[str, Any]]):
         """Initialize benchmark with multiple models and their configurations"""
         self.models = models
+        self.model_configs = {model_config['name']: model_config for model_config in models}
         self.clients = self._initialize_clients()
+        # Shared per provider and key with every other client in the process
+        self.rate_limiters = {
+            model_config['name']: get_rate_limiter(
+                model_config['type'], os.getenv(PROVIDER_API_KEY_ENV.get(model_config['type'], ''))
+            )
+            for model_config in models
+        }
         
         # Expanded real-world use case scenarios
         self.scenarios = [
@@ -63,35 +101,36 @@ class AdvancedModelBenchmark:
         
         # Initialize SQLite database
         self._initialize_database()
+        
+        # Latency sketches shared with the router for tail-aware scoring
+        self.latency_sketches = LatencySketchStore('reports/model_performance.db', source='benchmark')
+        
+        # Raw per-request samples; run aggregates are derived from them
+        self.sample_store = RequestSampleStore('reports/model_performance.db')
+        # Run id of the most recent sweep, for comparing runs with regression_detection.py
+        self.last_run_id = None
     
     def _initialize_clients(self) -> Dict[str, Any]:
-        """Initialize clients for different models"""
+        """Initialize clients for different models, shared process-wide per endpoint and key"""
         clients = {}
         for model_config in self.models:
             model_type = model_config['type']
+            base_url = None
+            if model_type == 'deepseek':
+                base_url = os.getenv('DEEPSEEK_BASE_URL', "https://integrate.api.nvidia.com/v1")
             
-            if model_type == 'openai':
-                clients[model_config['name']] = OpenAI(
-                    api_key=os.getenv('OPENAI_API_KEY')
-                )
-            elif model_type == 'anthropic':
-                clients[model_config['name']] = anthropic.Anthropic(
-                    api_key=os.getenv('ANTHROPIC_API_KEY')
-                )
-            elif model_type == 'google':
-                palm.configure(api_key=os.getenv('GOOGLE_API_KEY'))
-                clients[model_config['name']] = palm
-            elif model_type == 'deepseek':
-                clients[model_config['name']] = OpenAI(
-                    base_url="https://integrate.api.nvidia.com/v1",
-                    api_key=os.getenv('NVIDIA_API_KEY')
-                )
+            clients[model_config['name']] = get_client(
+                model_type,
+                api_key=os.getenv(PROVIDER_API_KEY_ENV[model_type]),
+                base_url=base_url
+            )
         
         return clients
     
     def _initialize_database(self):
         """Create SQLite database for performance tracking"""
         self.conn = sqlite3.connect('reports/model_performance.db')
+        self.conn.execute("PRAGMA journal_mode=WAL")
         cursor = self.conn.cursor()
         
         cursor.execute('''
@@ -105,26 +144,50 @@ class AdvancedModelBenchmark:
             avg_token_generation_rate REAL,
             task_success_rate REAL,
             error_rate REAL,
-            total_execution_time REAL
+            total_execution_time REAL,
+            avg_time_to_first_token REAL,
+            p95_inter_chunk_latency REAL
         )
         ''')
+        
+        # Databases created before streaming measurement lack the latency columns
+        existing_columns = {row[1] for row in cursor.execute("PRAGMA table_info(performance_metrics)")}
+        for column in ('avg_time_to_first_token', 'p95_inter_chunk_latency'):
+            if column not in existing_columns:
+                cursor.execute(f"ALTER TABLE performance_metrics ADD COLUMN {column} REAL")
+        
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_performance_metrics_model_timestamp
+        ON performance_metrics (model_name, timestamp)
+        ''')
+        
+        # Rollups are updated with every insert; databases that predate them catch up here
+        self.rollups = PerformanceRollups('reports/model_performance.db')
+        self.rollups.update(self.conn)
         self.conn.commit()
     
-    def _log_performance_to_database(self, metrics: ModelPerformanceMetrics):
-        """Log performance metrics to SQLite database"""
+    def _log_performance_to_database(self, all_metrics: List[ModelPerformanceMetrics]):
+        """Log performance metrics of a run to SQLite database in one transaction"""
         cursor = self.conn.cursor()
-        cursor.execute('''
+        cursor.executemany('''
         INSERT INTO performance_metrics (
             timestamp, model_name, total_queries, avg_response_time, 
             median_response_time, avg_token_generation_rate, 
-            task_success_rate, error_rate, total_execution_time
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            metrics.timestamp, metrics.model_name, metrics.total_queries,
-            metrics.avg_response_time, metrics.median_response_time,
-            metrics.avg_token_generation_rate, metrics.task_success_rate,
-            metrics.error_rate, metrics.total_execution_time
-        ))
+            task_success_rate, error_rate, total_execution_time,
+            avg_time_to_first_token, p95_inter_chunk_latency
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (
+                metrics.timestamp, metrics.model_name, metrics.total_queries,
+                metrics.avg_response_time, metrics.median_response_time,
+                metrics.avg_token_generation_rate, metrics.task_success_rate,
+                metrics.error_rate, metrics.total_execution_time,
+                metrics.avg_time_to_first_token, metrics.p95_inter_chunk_latency
+            )
+            for metrics in all_metrics
+        ])
+        # Fold the new rows into the hourly/daily/all-time rollups in the same transaction
+        self.rollups.update(self.conn)
         self.conn.commit()
     
     def _generate_performance_visualization(self, all_metrics: List[ModelPerformanceMetrics]):
@@ -156,72 +219,403 @@ class AdvancedModelBenchmark:
             yaxis_title='Tokens per Second'
         )
         pio.write_html(fig_token_rate, file='reports/token_generation_rate.html')
+        
+        # Time to First Token
+        fig_ttft = go.Figure()
+        for metrics in all_metrics:
+            fig_ttft.add_trace(go.Bar(
+                x=[metrics.model_name],
+                y=[metrics.avg_time_to_first_token],
+                name='Avg Time to First Token (ms)'
+            ))
+        fig_ttft.update_layout(
+            title='Time to First Token Across Models',
+            yaxis_title='Time to First Token (ms)'
+        )
+        pio.write_html(fig_ttft, file='reports/time_to_first_token.html')
     
-    def run_benchmark(self) -> List[ModelPerformanceMetrics]:
-        """Run comprehensive benchmarking across models and scenarios"""
-        all_metrics = []
+    def run_benchmark(self, repetitions: int = 1) -> List[ModelPerformanceMetrics]:
+        """Run comprehensive benchmarking across models and scenarios, one request at a time"""
         timestamp = datetime.now().isoformat()
+        return self._finalize_benchmark(self._evaluate_grid(self.scenarios, repetitions), timestamp)
+    
+    def _evaluate_grid(self, scenarios: List[Dict[str, Any]], repetitions: int) -> Dict[str, List[Dict[str, Any]]]:
+        """Evaluate every model on every scenario sequentially"""
+        results_by_model = {}
         
         for model_config in self.models:
             model_name = model_config['name']
-            model_results = {
-                "response_times": [],
-                "success_count": 0,
-                "error_count": 0,
-                "total_time": 0
-            }
-            
-            for scenario in self.scenarios:
+            evaluations = []
+            for scenario in scenarios:
+                for _ in range(repetitions):
+                    try:
+                        evaluations.append(self._evaluate_model(model_name, scenario))
+                    except Exception as e:
+                        print(f"Error evaluating {model_name}: {e}")
+                        evaluations.append(self._failed_evaluation(scenario, RequestSampleStore.ERROR, e))
+            results_by_model[model_name] = evaluations
+        
+        return results_by_model
+    
+    async def run_benchmark_async(self, repetitions: int = 1, concurrency_limits: Dict[str, int] = None,
+                                  request_timeout: float = 120.0, sweep_timeout: float = None) -> List[ModelPerformanceMetrics]:
+        """
+        Run the model x scenario x repetition grid concurrently.
+        
+        Each provider gets its own concurrency limit, so a sweep takes about as
+        long as its slowest shard instead of the sum of all requests.
+        Evaluations exceeding request_timeout are counted as timeouts, but keep
+        their provider slot until the request actually returns; evaluations
+        still pending when sweep_timeout expires are cancelled. Results are
+        aggregated exactly like run_benchmark.
+        """
+        timestamp = datetime.now().isoformat()
+        results_by_model = await self._evaluate_grid_async(
+            self.scenarios, repetitions, concurrency_limits, request_timeout, sweep_timeout
+        )
+        return self._finalize_benchmark(results_by_model, timestamp)
+    
+    async def _evaluate_grid_async(self, scenarios: List[Dict[str, Any]], repetitions: int,
+                                   concurrency_limits: Dict[str, int] = None, request_timeout: float = 120.0,
+                                   sweep_timeout: float = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Evaluate every model on every scenario concurrently within per-provider limits"""
+        limits = {**PROVIDER_CONCURRENCY_LIMITS, **(concurrency_limits or {})}
+        providers = {model_config['type'] for model_config in self.models}
+        semaphores = {provider: asyncio.Semaphore(limits.get(provider, 1)) for provider in providers}
+        
+        # SDK clients are synchronous, so evaluations run on a pool sized to the limits
+        executor = ThreadPoolExecutor(max_workers=sum(limits.get(provider, 1) for provider in providers))
+        loop = asyncio.get_running_loop()
+        
+        async def evaluate(model_config: Dict[str, Any], scenario: Dict[str, Any]):
+            model_name = model_config['name']
+            async with semaphores[model_config['type']]:
+                work = loop.run_in_executor(executor, self._evaluate_model, model_name, scenario)
                 try:
-                    result = self._evaluate_model(model_name, scenario)
-                    model_results['response_times'].extend(result['response_times'])
-                    model_results['success_count'] += result['success_count']
-                    model_results['error_count'] += result['error_count']
-                    model_results['total_time'] += result['total_time']
+                    return await asyncio.wait_for(asyncio.shield(work), timeout=request_timeout)
+                except asyncio.TimeoutError as e:
+                    print(f"Timeout evaluating {model_name} on {scenario['name']}")
+                    # The worker thread cannot be interrupted; its slot stays taken until it
+                    # returns, so abandoned requests never push a provider over its limit
+                    await asyncio.gather(work, return_exceptions=True)
+                    return self._failed_evaluation(scenario, RequestSampleStore.TIMEOUT, e)
                 except Exception as e:
                     print(f"Error evaluating {model_name}: {e}")
-                    model_results['error_count'] += len(self.scenarios)
+                    return self._failed_evaluation(scenario, RequestSampleStore.ERROR, e)
+        
+        grid = {
+            (model_config['name'], scenario_index, repetition): asyncio.ensure_future(evaluate(model_config, scenario))
+            for model_config in self.models
+            for scenario_index, scenario in enumerate(scenarios)
+            for repetition in range(repetitions)
+        }
+        
+        try:
+            _, pending = await asyncio.wait(grid.values(), timeout=sweep_timeout)
+            if pending:
+                print(f"Sweep timeout reached, cancelling {len(pending)} pending evaluations")
+        finally:
+            # Also reached when the caller cancels the sweep
+            for task in grid.values():
+                task.cancel()
+            await asyncio.gather(*grid.values(), return_exceptions=True)
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        results_by_model = {model_config['name']: [] for model_config in self.models}
+        for (model_name, scenario_index, _), task in grid.items():
+            if task.done() and not task.cancelled():
+                results_by_model[model_name].append(task.result())
+            else:
+                results_by_model[model_name].append(self._failed_evaluation(
+                    scenarios[scenario_index], RequestSampleStore.TIMEOUT, asyncio.CancelledError()
+                ))
+        
+        return results_by_model
+    
+    def run_corpus(self, corpus: ScenarioCorpus, checkpoint_path: str = 'reports/corpus_checkpoint.json',
+                   batch_size: int = 100, repetitions: int = 1, sequential: bool = False,
+                   concurrency_limits: Dict[str, int] = None,
+                   request_timeout: float = 120.0) -> List[ModelPerformanceMetrics]:
+        """
+        Benchmark every model on a scenario corpus streamed batch by batch.
+        
+        Samples are tagged with the corpus offset their batch starts at, and
+        the run's cumulative latency sketches travel in the checkpoint. Storing
+        a batch first deletes samples already tagged with its offset and then
+        rewrites the run's sketches, so a batch interrupted anywhere before the
+        checkpoint advances past it is evaluated and stored again without
+        counting anything twice. An interrupted sweep started again with the
+        same corpus and checkpoint continues the same run. Run metrics are
+        aggregated from all stored samples of the run.
+        """
+        checkpoint = SweepCheckpoint(checkpoint_path)
+        state = checkpoint.load(corpus.path)
+        if state is None:
+            state = {'run_id': uuid.uuid4().hex, 'timestamp': datetime.now().isoformat(), 'offset': 0,
+                     'completed': 0, 'latency_sketches': {}}
+        else:
+            print(f"Resuming run {state['run_id']} after {state['completed']} scenarios")
+        saved_sketches = state.get('latency_sketches', {})
+        sketches = {
+            (model_name, metric): DDSketch.from_json(saved_sketches[model_name][metric])
+            if metric in saved_sketches.get(model_name, {}) else DDSketch()
+            for model_name in (model_config['name'] for model_config in self.models)
+            for metric in LatencySketchStore.METRICS
+        }
+        
+        for batch in corpus.batches(batch_size, state['offset'], state['completed']):
+            scenarios = [entry.scenario for entry in batch]
+            if sequential:
+                results_by_model = self._evaluate_grid(scenarios, repetitions)
+            else:
+                results_by_model = asyncio.run(self._evaluate_grid_async(
+                    scenarios, repetitions, concurrency_limits, request_timeout
+                ))
+            self._store_evaluations(state['run_id'], results_by_model, state['timestamp'],
+                                    batch_offset=state['offset'])
+            self._add_latency_sketches(sketches, results_by_model)
+            self._store_run_sketches(state['run_id'], sketches)
             
-            metrics = ModelPerformanceMetrics(
-                timestamp=timestamp,
-                model_name=model_name,
-                total_queries=len(self.scenarios),
-                avg_response_time=np.mean(model_results['response_times']) if model_results['response_times'] else 0,
-                median_response_time=np.median(model_results['response_times']) if model_results['response_times'] else 0,
-                avg_token_generation_rate=len(model_results['response_times']) / model_results['total_time'] if model_results['total_time'] > 0 else 0,
-                task_success_rate=(model_results['success_count'] / len(self.scenarios)) * 100,
-                error_rate=(model_results['error_count'] / len(self.scenarios)) * 100,
-                total_execution_time=model_results['total_time']
+            state['offset'] = batch[-1].next_offset
+            state['completed'] += len(batch)
+            state['latency_sketches'] = {}
+            for (model_name, metric), sketch in sketches.items():
+                state['latency_sketches'].setdefault(model_name, {})[metric] = sketch.to_json()
+            checkpoint.save(corpus.path, state)
+            print(f"Completed {state['completed']} scenarios of {corpus.path}")
+        
+        metrics = self._complete_run(state['run_id'], state['timestamp'], {
+            model_name: sketch.quantile(0.95) or 0
+            for (model_name, metric), sketch in sketches.items() if metric == 'inter_chunk_gap'
+        })
+        checkpoint.clear()
+        return metrics
+    
+    def _metrics_from_samples(self, model_name: str, summary: Dict[str, Any], timestamp: str,
+                              p95_inter_chunk_latency: float) -> ModelPerformanceMetrics:
+        """Build model metrics from the run's stored request samples"""
+        total_queries = summary.get('requests', 0)
+        return ModelPerformanceMetrics(
+            timestamp=timestamp,
+            model_name=model_name,
+            total_queries=total_queries,
+            avg_response_time=summary.get('avg_latency_ms') or 0,
+            median_response_time=summary.get('median_latency_ms') or 0,
+            avg_token_generation_rate=summary.get('tokens_per_second', 0),
+            task_success_rate=(summary['success_count'] / total_queries) * 100 if total_queries else 0,
+            error_rate=(summary['error_count'] / total_queries) * 100 if total_queries else 0,
+            total_execution_time=summary.get('total_latency_s', 0),
+            avg_time_to_first_token=summary.get('avg_ttft_ms') or 0,
+            # Chunk gaps are not kept per sample, their distribution lives in the latency sketches
+            p95_inter_chunk_latency=p95_inter_chunk_latency
+        )
+    
+    def _store_evaluations(self, run_id: str, results_by_model: Dict[str, List[Dict[str, Any]]], timestamp: str,
+                           batch_offset: Optional[int] = None):
+        """Store evaluation samples under a run, replacing samples already stored for the same corpus batch"""
+        if batch_offset is not None:
+            self.sample_store.delete_batch(run_id, batch_offset)
+        self.sample_store.record_many([
+            dict(sample, run_id=run_id, model_name=model_name, timestamp=timestamp, batch_offset=batch_offset)
+            for model_name, evaluations in results_by_model.items()
+            for result in evaluations
+            for sample in result['samples']
+        ])
+        if not self.sample_store.flush():
+            # Aggregates and regression checks would silently miss these requests
+            raise RuntimeError(f"{self.sample_store.unwritten_samples} request samples could not be stored")
+    
+    def _add_latency_sketches(self, sketches: Dict[Tuple[str, str], DDSketch],
+                              results_by_model: Dict[str, List[Dict[str, Any]]]):
+        """Add evaluation latencies to per (model, metric) sketches"""
+        for model_name, evaluations in results_by_model.items():
+            latencies = {
+                'response_time': [value for result in evaluations for value in result['response_times']],
+                'ttft': [value for result in evaluations for value in result['ttfts']],
+                'inter_chunk_gap': [value for result in evaluations for value in result['inter_chunk_gaps']]
+            }
+            for metric, values in latencies.items():
+                sketches.setdefault((model_name, metric), DDSketch()).add_many(values)
+    
+    def _store_run_sketches(self, run_id: str, sketches: Dict[Tuple[str, str], DDSketch]):
+        """Replace a run's latency sketches in the store shared with the router"""
+        self.latency_sketches.replace_source(
+            f"benchmark-{run_id}", {key: sketch for key, sketch in sketches.items() if sketch.count}
+        )
+    
+    def _complete_run(self, run_id: str, timestamp: str,
+                      p95_inter_chunk_latencies: Dict[str, float]) -> List[ModelPerformanceMetrics]:
+        """Aggregate, persist and visualize a run from its stored samples"""
+        self.last_run_id = run_id
+        run_summary = self.sample_store.run_summary(run_id)
+        all_metrics = [
+            self._metrics_from_samples(
+                model_config['name'], run_summary.get(model_config['name'], {}), timestamp,
+                p95_inter_chunk_latencies.get(model_config['name'], 0)
             )
-            
-            all_metrics.append(metrics)
-            self._log_performance_to_database(metrics)
+            for model_config in self.models
+        ]
+        
+        self._log_performance_to_database(all_metrics)
         
         # Generate visualizations
         self._generate_performance_visualization(all_metrics)
         
         return all_metrics
     
+    def _finalize_benchmark(self, results_by_model: Dict[str, List[Dict[str, Any]]],
+                            timestamp: str) -> List[ModelPerformanceMetrics]:
+        """Store samples, then aggregate, persist and visualize the results of a benchmark sweep"""
+        run_id = uuid.uuid4().hex
+        self._store_evaluations(run_id, results_by_model, timestamp)
+        sketches = {}
+        self._add_latency_sketches(sketches, results_by_model)
+        self._store_run_sketches(run_id, sketches)
+        
+        p95_inter_chunk_latencies = {}
+        for model_name, evaluations in results_by_model.items():
+            inter_chunk_gaps = [value for result in evaluations for value in result['inter_chunk_gaps']]
+            p95_inter_chunk_latencies[model_name] = np.percentile(inter_chunk_gaps, 95) if inter_chunk_gaps else 0
+        
+        return self._complete_run(run_id, timestamp, p95_inter_chunk_latencies)
+    
+    def _stream_completion(self, model_name: str, prompt: str, max_tokens: int = 500):
+        """Stream one completion from the model's provider and measure it"""
+        model_config = self.model_configs[model_name]
+        model_type = model_config['type']
+        # 'model' holds the provider's identifier when it differs from the display name
+        model_id = model_config.get('model', model_name)
+        client = self.clients[model_name]
+        
+        with self.rate_limiters[model_name].request(estimated_tokens=count_tokens(prompt, model_id) + max_tokens) as permit:
+            if model_type in ('openai', 'deepseek'):
+                measurement = measure_openai_stream(
+                    client, model_id, [{"role": "user", "content": prompt}], max_tokens=max_tokens
+                )
+            elif model_type == 'anthropic':
+                measurement = measure_anthropic_stream(client, model_id, prompt, max_tokens=max_tokens)
+            elif model_type == 'google':
+                measurement = measure_gemini_stream(client, model_id, prompt, max_tokens=max_tokens)
+            else:
+                raise ValueError(f"Unsupported model type: {model_type}")
+            permit.record((measurement.input_tokens or 0) + measurement.output_tokens)
+        return measurement
+    
+    @staticmethod
+    def _empty_evaluation() -> Dict[str, Any]:
+        """Result of an evaluation before any request completed"""
+        return {
+            "response_times": [],
+            "ttfts": [],
+            "inter_chunk_gaps": [],
+            "output_tokens": 0,
+            "generation_time": 0,
+            "success_count": 0,
+            "error_count": 0,
+            "total_time": 0,
+            "samples": []
+        }
+    
+    def _failed_evaluation(self, scenario: Dict[str, Any], status: str, error: BaseException) -> Dict[str, Any]:
+        """Result of an evaluation that raised, timed out or was cancelled"""
+        result = self._empty_evaluation()
+        result['error_count'] = 1
+        result['samples'].append({
+            "scenario": scenario['name'],
+            "status": status,
+            "error_class": type(error).__name__
+        })
+        return result
+    
     def _evaluate_model(self, model_name: str, scenario: Dict[str, Any]) -> Dict[str, Any]:
-        """Evaluate a specific model's performance on a scenario"""
-        # Implementation similar to previous version, adapted for multiple model types
-        # Would include specific logic for each model type's API call
-        pass
+        """Evaluate a specific model's performance on a scenario from a streamed response"""
+        start_time = time.time()
+        result = self._empty_evaluation()
+        
+        try:
+            measurement = self._stream_completion(model_name, scenario['prompt'])
+            
+            result['response_times'].append(measurement.total_time_ms)
+            if measurement.ttft_ms is not None:
+                result['ttfts'].append(measurement.ttft_ms)
+            result['inter_chunk_gaps'].extend(measurement.inter_chunk_gaps_ms)
+            result['output_tokens'] = measurement.output_tokens
+            result['generation_time'] = measurement.total_time_ms / 1000
+            
+            success = bool(measurement.content.strip())
+            if success:
+                result['success_count'] += 1
+            else:
+                result['error_count'] += 1
+            
+            result['samples'].append({
+                "scenario": scenario['name'],
+                "ttft_ms": measurement.ttft_ms,
+                "latency_ms": measurement.total_time_ms,
+                "input_tokens": measurement.input_tokens,
+                "output_tokens": measurement.output_tokens,
+                "status": RequestSampleStore.SUCCESS if success else RequestSampleStore.INVALID
+            })
+        
+        except Exception as e:
+            result['error_count'] += 1
+            result['samples'].append({
+                "scenario": scenario['name'],
+                "latency_ms": (time.time() - start_time) * 1000,
+                "status": RequestSampleStore.ERROR,
+                "error_class": type(e).__name__
+            })
+            print(f"Error with {model_name}: {e}")
+        
+        result['total_time'] = time.time() - start_time
+        return result
 
 def main():
+    parser = argparse.ArgumentParser(description="Benchmark AI models across real-world scenarios")
+    parser.add_argument('--sequential', action='store_true', help="Run requests one at a time")
+    parser.add_argument('--repetitions', type=int, default=1, help="Requests per model and scenario")
+    parser.add_argument('--request-timeout', type=float, default=120.0, help="Seconds before a request is cancelled")
+    parser.add_argument('--corpus', help="JSONL scenario corpus streamed instead of the built-in scenarios")
+    parser.add_argument('--prompt-field', default='prompt', help="Corpus field holding the prompt")
+    parser.add_argument('--name-field', default='name', help="Corpus field holding the scenario name")
+    parser.add_argument('--batch-size', type=int, default=100, help="Corpus scenarios evaluated per checkpoint")
+    parser.add_argument('--checkpoint', default='reports/corpus_checkpoint.json',
+                        help="Progress file an interrupted corpus sweep resumes from")
+    args = parser.parse_args()
+    
     models = [
         {"name": "gpt-3.5-turbo", "type": "openai"},
-        {"name": "deepseek-r1", "type": "deepseek"},
+        {"name": "deepseek-r1", "type": "deepseek", "model": "deepseek-ai/deepseek-r1"},
         {"name": "claude-2", "type": "anthropic"},
         {"name": "palm-2", "type": "google"}
     ]
     
     benchmark = AdvancedModelBenchmark(models)
-    results = benchmark.run_benchmark()
+    if args.corpus:
+        results = benchmark.run_corpus(
+            ScenarioCorpus(args.corpus, prompt_field=args.prompt_field, name_field=args.name_field),
+            checkpoint_path=args.checkpoint,
+            batch_size=args.batch_size,
+            repetitions=args.repetitions,
+            sequential=args.sequential,
+            request_timeout=args.request_timeout
+        )
+    elif args.sequential:
+        results = benchmark.run_benchmark(repetitions=args.repetitions)
+    else:
+        results = asyncio.run(benchmark.run_benchmark_async(
+            repetitions=args.repetitions,
+            request_timeout=args.request_timeout
+        ))
+    
+    benchmark.sample_store.close()
     
     # Generate comprehensive JSON report
     with open('reports/comprehensive_benchmark_report.json', 'w') as f:
         json.dump([asdict(result) for result in results], f, indent=2)
+    
+    print(f"Stored samples of run {benchmark.last_run_id}; compare it with the previous run using "
+          f"python ml_utils/regression_detection.py reports/model_performance.db --candidate {benchmark.last_run_id}")
 
 if __name__ == "__main__":
     main()
@@ -3,18 +3,32 @@ import sys
 import json
 import pytest
 from dotenv import load_dotenv
-from openai import OpenAI
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from client_registry import get_client
+from completion_cache import CachingClient, cached_client_from_env
+from token_accounting import response_usage
 
 # Load environment variables
 load_dotenv()
 
 class TestDeepSeekAPIResponses:
-    def setup_method(self):
-        """Initialize OpenAI client with NVIDIA endpoint"""
-        self.client = OpenAI(
-            base_url="https://integrate.api.nvidia.com/v1",
-            api_key=os.getenv('NVIDIA_API_KEY')
-        )
+    @classmethod
+    def setup_class(cls):
+        """Reuse the shared OpenAI client for the NVIDIA endpoint, with one completion cache per session"""
+        # These requests use default sampling, so only COMPLETION_CACHE=force replays them from disk
+        cls.client = cached_client_from_env(get_client(
+            'deepseek',
+            api_key=os.getenv('NVIDIA_API_KEY'),
+            base_url=os.getenv('DEEPSEEK_BASE_URL', "https://integrate.api.nvidia.com/v1")
+        ))
+    
+    @classmethod
+    def teardown_class(cls):
+        """Report what the completion cache saved and close it"""
+        if isinstance(cls.client, CachingClient):
+            print(f"Completion cache: {cls.client.cache.stats()}")
+            cls.client.cache.close()
     
     def validate_response(self, response):
         """Common response validation checks"""
@@ -94,9 +108,9 @@ class TestDeepSeekAPIResponses:
         
         self.validate_response(response)
         
-        # Check token limit
-        content = response.choices[0].message.content
-        assert len(content.split()) <= 500, "Response exceeds specified token limit"
+        # Check token limit in model tokens, from usage data or the model's tokenizer
+        usage = response_usage(response, "deepseek-ai/deepseek-r1")
+        assert usage.output_tokens <= 500, f"Response exceeds specified token limit: {usage.output_tokens} tokens ({usage.source})"
 
 if __name__ == "__main__":
     pytest.main([__file__])
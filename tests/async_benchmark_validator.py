@@ -0,0 +1,129 @@
+import os
+import sys
+import asyncio
+import sqlite3
+import time
+import threading
+import dataclasses
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from mock_inference_server import MockInferenceServer, MockServerConfig
+from request_samples import RequestSampleStore
+
+MODELS = [
+    {"name": "deepseek-r1", "type": "deepseek", "model": "deepseek-ai/deepseek-r1"},
+    {"name": "gpt-3.5-turbo", "type": "openai"}
+]
+
+
+def deterministic_evaluation(benchmark, model_name, scenario):
+    """Measurements derived from the model and prompt, identical however the grid is scheduled"""
+    seed = sum(map(ord, model_name + scenario['prompt']))
+    result = benchmark._empty_evaluation()
+    response_time = 100 + seed % 997
+    success = seed % 4 != 0
+    result['response_times'].append(response_time)
+    result['ttfts'].append(response_time / 4)
+    result['inter_chunk_gaps'].extend((seed * k) % 41 / 7 for k in range(1, 6))
+    result['output_tokens'] = seed % 300
+    result['generation_time'] = response_time / 1000
+    result['success_count' if success else 'error_count'] += 1
+    result['samples'].append({
+        "scenario": scenario['name'],
+        "ttft_ms": response_time / 4,
+        "latency_ms": response_time,
+        "output_tokens": seed % 300,
+        "status": RequestSampleStore.SUCCESS if success else RequestSampleStore.INVALID
+    })
+    return result
+
+
+class TestAsyncBenchmark:
+    @pytest.fixture
+    def benchmark(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv('NVIDIA_API_KEY', 'mock')
+        monkeypatch.setenv('OPENAI_API_KEY', 'mock')
+        from advanced_benchmarking import AdvancedModelBenchmark
+        benchmark = AdvancedModelBenchmark(MODELS)
+        yield benchmark
+        benchmark.sample_store.close()
+
+    def test_async_grid_matches_sequential(self, benchmark):
+        """The concurrent grid aggregates to exactly the sequential metrics"""
+        benchmark._evaluate_model = lambda model_name, scenario: deterministic_evaluation(
+            benchmark, model_name, scenario
+        )
+        sequential = benchmark.run_benchmark(repetitions=2)
+        concurrent = asyncio.run(benchmark.run_benchmark_async(
+            repetitions=2, concurrency_limits={'deepseek': 2, 'openai': 3}
+        ))
+
+        assert [dataclasses.replace(metrics, timestamp='') for metrics in concurrent] == \
+            [dataclasses.replace(metrics, timestamp='') for metrics in sequential]
+        assert concurrent[0].total_queries == 2 * len(benchmark.scenarios)
+
+    def test_request_timeouts_hold_provider_slot(self, benchmark, monkeypatch):
+        """A timed-out request counts as a timeout and keeps its provider slot until it returns"""
+        evaluate_model = benchmark._evaluate_model
+        in_flight = {'deepseek': 0, 'openai': 0}
+        peak = dict(in_flight)
+        lock = threading.Lock()
+        stalled = []
+
+        def counting_evaluate(model_name, scenario):
+            provider = benchmark.model_configs[model_name]['type']
+            with lock:
+                in_flight[provider] += 1
+                peak[provider] = max(peak[provider], in_flight[provider])
+                stall = provider == 'deepseek' and not stalled
+                stalled.append(stall)
+            try:
+                if stall:
+                    # A hung connection the SDK call does not give up on
+                    time.sleep(3.0)
+                return evaluate_model(model_name, scenario)
+            finally:
+                with lock:
+                    in_flight[provider] -= 1
+
+        benchmark._evaluate_model = counting_evaluate
+        benchmark.scenarios = benchmark.scenarios[:4]
+        with MockInferenceServer(MockServerConfig(ttft_median_ms=5, completion_tokens=5,
+                                                  tokens_per_second=5000)) as server:
+            monkeypatch.setattr(benchmark, 'clients', {
+                model['name']: benchmark.clients[model['name']].with_options(base_url=server.base_url)
+                for model in MODELS
+            })
+            metrics = asyncio.run(benchmark.run_benchmark_async(
+                concurrency_limits={'deepseek': 1, 'openai': 3}, request_timeout=1.5
+            ))
+
+        assert peak['deepseek'] == 1
+        assert [(m.model_name, m.total_queries, m.error_rate) for m in metrics] == [
+            ('deepseek-r1', 4, 25), ('gpt-3.5-turbo', 4, 0)
+        ]
+        with sqlite3.connect('reports/model_performance.db') as conn:
+            statuses = conn.execute(
+                "SELECT status, COUNT(*) FROM request_samples WHERE run_id = ? AND model_name = ? GROUP BY status",
+                (benchmark.last_run_id, 'deepseek-r1')
+            ).fetchall()
+        assert sorted(statuses) == [(RequestSampleStore.SUCCESS, 3), (RequestSampleStore.TIMEOUT, 1)]
+
+    def test_requests_within_timeout_complete(self, benchmark, monkeypatch):
+        """A generous timeout lets every request against the mock server succeed"""
+        benchmark.scenarios = benchmark.scenarios[:3]
+        with MockInferenceServer(MockServerConfig(ttft_median_ms=5, completion_tokens=5,
+                                                  tokens_per_second=5000)) as server:
+            monkeypatch.setattr(benchmark, 'clients', {
+                model['name']: benchmark.clients[model['name']].with_options(base_url=server.base_url)
+                for model in MODELS
+            })
+            metrics = asyncio.run(benchmark.run_benchmark_async(request_timeout=10))
+
+        assert [(m.total_queries, m.task_success_rate) for m in metrics] == [(3, 100), (3, 100)]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
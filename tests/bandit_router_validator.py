@@ -0,0 +1,93 @@
+import os
+import sys
+import pytest
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from bandit_router import OnlineBanditRouter
+
+# Success probability and latency of two simulated endpoints
+ENDPOINTS = {
+    'fast-model': (0.9, 600.0),
+    'slow-model': (0.5, 3000.0)
+}
+
+
+def simulate(router, rounds, seed=0):
+    """Route requests to the simulated endpoints and feed back their outcomes"""
+    rng = np.random.default_rng(seed)
+    models = list(ENDPOINTS)
+    selections = []
+    for _ in range(rounds):
+        model = router.select(models, 'medium')
+        success_rate, latency = ENDPOINTS[model]
+        success = bool(rng.random() < success_rate)
+        router.record_outcome(model, latency=latency, success=success, tokens=200 if success else 0)
+        selections.append(model)
+    return selections
+
+
+class TestOnlineBanditRouter:
+    def setup_method(self):
+        """Each test opens routers on its own database"""
+        self.routers = []
+
+    def teardown_method(self):
+        for router in self.routers:
+            router.close()
+
+    def make_router(self, tmp_path, **kwargs):
+        router = OnlineBanditRouter(str(tmp_path / 'performance.db'), persist_interval=3600, **kwargs)
+        self.routers.append(router)
+        return router
+
+    @pytest.mark.parametrize('strategy', [OnlineBanditRouter.THOMPSON, OnlineBanditRouter.UCB])
+    def test_converges_to_better_arm(self, tmp_path, strategy):
+        """Both strategies send most late traffic to the endpoint with the higher reward"""
+        router = self.make_router(tmp_path, strategy=strategy, seed=1)
+        selections = simulate(router, 400)
+
+        assert selections[-100:].count('fast-model') >= 85
+        fast, slow = router.arms[('fast-model', 'medium')], router.arms[('slow-model', 'medium')]
+        assert fast.mean_reward > slow.mean_reward
+
+    def test_discount_forgets_old_outcomes(self, tmp_path):
+        """With discounting, recent successes outweigh a long history of slow failures"""
+        discounted = self.make_router(tmp_path, discount=0.9)
+        undiscounted = OnlineBanditRouter(str(tmp_path / 'other.db'), discount=1.0, persist_interval=3600)
+        self.routers.append(undiscounted)
+
+        for router in (discounted, undiscounted):
+            for _ in range(200):
+                router.record_outcome('model', latency=10000, success=False, tokens=0)
+            for _ in range(50):
+                router.record_outcome('model', latency=100, success=True, tokens=100)
+
+        recent, all_time = discounted.arms[('model', 'medium')], undiscounted.arms[('model', 'medium')]
+        assert recent.mean_reward > 0.8 > 0.5 > all_time.mean_reward
+        # Latency, tokens and failures decay with the same discount as the posterior
+        old_weight = 0.9 ** 50
+        assert recent.mean_latency_ms < 200
+        assert recent.failure_rate == pytest.approx(old_weight * (1 - 0.9 ** 200) / (1 - old_weight * 0.9 ** 200))
+        assert all_time.mean_latency_ms == pytest.approx((200 * 10000 + 50 * 100) / 250)
+        assert all_time.failure_rate == pytest.approx(0.8)
+
+    def test_persist_and_reload_round_trip(self, tmp_path):
+        """Arm statistics written on close are restored by a new router"""
+        router = self.make_router(tmp_path, discount=0.95)
+        simulate(router, 50)
+        expected = {
+            key: (arm.alpha, arm.beta, arm.pulls, arm.reward_sum, arm.latency_sum_ms, arm.tokens_sum, arm.failures)
+            for key, arm in router.arms.items()
+        }
+        router.close()
+
+        reloaded = self.make_router(tmp_path)
+        assert {
+            key: (arm.alpha, arm.beta, arm.pulls, arm.reward_sum, arm.latency_sum_ms, arm.tokens_sum, arm.failures)
+            for key, arm in reloaded.arms.items()
+        } == expected
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import tempfile
+from typing import List, Dict
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from adaptive_model_router import AdaptiveModelSelector
+from router_selection_benchmark import populate_database
+
+BATCH_SIZES = [10, 100, 1_000, 10_000]
+HISTORY_ROWS = 10_000
+
+
+def make_tasks(count: int) -> List[Dict[str, str]]:
+    """Generate synthetic routing tasks with mixed complexity"""
+    complexities = ['low', 'medium', 'high', 'extreme']
+    rng = np.random.default_rng(7)
+    return [
+        {"description": f"Synthetic task {i}", "complexity": complexities[rng.integers(len(complexities))]}
+        for i in range(count)
+    ]
+
+
+def run_benchmark() -> List[Dict[str, float]]:
+    """Compare looping select_optimal_model with one select_optimal_models call"""
+    results = []
+    original_cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Selection logs are written relative to the working directory
+        os.chdir(workdir)
+        try:
+            db_path = os.path.join(workdir, 'performance.db')
+            selector = AdaptiveModelSelector(performance_db_path=db_path)
+            populate_database(db_path, HISTORY_ROWS, selector.models)
+            # Warm the snapshot so both paths start from the same state
+            selector.performance_snapshot.get_latest_metrics()
+
+            for batch_size in BATCH_SIZES:
+                tasks = make_tasks(batch_size)
+
+                start = time.perf_counter()
+                looped = [selector.select_optimal_model(task['description'], task['complexity']) for task in tasks]
+                loop_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                batched = selector.select_optimal_models(tasks)
+                batch_time = time.perf_counter() - start
+
+                assert looped == batched, "Batch routing diverged from per-task routing"
+
+                results.append({
+                    'tasks': batch_size,
+                    'loop_tasks_per_second': batch_size / loop_time,
+                    'batch_tasks_per_second': batch_size / batch_time,
+                    'speedup': loop_time / batch_time
+                })
+            selector.close()
+        finally:
+            os.chdir(original_cwd)
+
+    return results
+
+
+def main():
+    print(f"{'tasks':>8} {'loop tasks/s':>14} {'batch tasks/s':>15} {'speedup':>9}")
+    for result in run_benchmark():
+        print(f"{result['tasks']:>8} {result['loop_tasks_per_second']:>14.0f} "
+              f"{result['batch_tasks_per_second']:>15.0f} {result['speedup']:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
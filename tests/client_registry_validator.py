@@ -0,0 +1,44 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from client_registry import close_clients, get_client
+from mock_inference_server import MockInferenceServer, MockServerConfig
+
+
+class TestClientRegistry:
+    def setup_method(self):
+        """Start a fast mock server"""
+        self.server = MockInferenceServer(MockServerConfig(seed=3, ttft_median_ms=1, completion_tokens=1)).start()
+
+    def teardown_method(self):
+        close_clients()
+        self.server.stop()
+
+    def test_clients_are_shared_per_endpoint_and_key(self):
+        """One client per provider, base URL and API key"""
+        client = get_client('deepseek', api_key='key-a', base_url=self.server.base_url)
+
+        assert get_client('deepseek', api_key='key-a', base_url=self.server.base_url) is client
+        assert get_client('deepseek', api_key='key-b', base_url=self.server.base_url) is not client
+        assert get_client('openai', api_key='key-a', base_url=self.server.base_url) is not client
+
+    def test_connections_are_reused(self):
+        """Requests through the registry, including per-caller copies, share keep-alive connections"""
+        client = get_client('deepseek', api_key='mock', base_url=self.server.base_url)
+        no_retries = client.with_options(max_retries=0)
+
+        for i in range(10):
+            (client if i % 2 else no_retries).chat.completions.create(
+                model="deepseek-ai/deepseek-r1",
+                messages=[{"role": "user", "content": f"Ping {i}"}],
+                max_tokens=1
+            )
+
+        assert self.server.requests_served == 10
+        assert self.server.connections_accepted == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
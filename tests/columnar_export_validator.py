@@ -0,0 +1,150 @@
+import os
+import sys
+import sqlite3
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from performance_queries import IncrementalMetricHistory, PerformanceQueries
+
+pytest.importorskip('pyarrow')
+from columnar_export import ColumnarExporter, ColumnarHistory
+
+MODELS = ('deepseek-r1', 'gpt-3.5-turbo', 'meta/llama-3')
+
+
+def create_performance_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE performance_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, model_name TEXT, total_queries INTEGER,
+            avg_response_time REAL, median_response_time REAL, avg_token_generation_rate REAL,
+            task_success_rate REAL, error_rate REAL, total_execution_time REAL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE request_samples (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT, timestamp TEXT, model_name TEXT, scenario TEXT,
+            ttft_ms REAL, latency_ms REAL, input_tokens INTEGER, output_tokens INTEGER, status TEXT, error_class TEXT
+        )
+    ''')
+    return conn
+
+
+def insert_runs(conn, start, count, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = [
+        ((datetime(2024, 1, 1) + timedelta(hours=5 * (start + i))).isoformat(), MODELS[i % 3],
+         float(rng.lognormal(7, 0.4)), float(rng.uniform(80, 100)))
+        for i in range(count)
+    ]
+    conn.executemany(
+        "INSERT INTO performance_metrics (timestamp, model_name, avg_response_time, task_success_rate) "
+        "VALUES (?, ?, ?, ?)", rows
+    )
+    conn.executemany(
+        "INSERT INTO request_samples (run_id, timestamp, model_name, scenario, latency_ms, status) "
+        "VALUES ('run', ?, ?, 'qa', ?, 'ok')", [(row[0], row[1], row[2]) for row in rows]
+    )
+    conn.commit()
+
+
+class TestColumnarExport:
+    def setup_method(self):
+        """Each test exports its own performance database"""
+        self.conn = None
+
+    def teardown_method(self):
+        if self.conn is not None:
+            self.conn.close()
+
+    def test_incremental_export_matches_sqlite(self, tmp_path):
+        """Repeated exports append only new rows and aggregate like SQLite"""
+        path = str(tmp_path / 'performance.db')
+        root = str(tmp_path / 'columnar')
+        self.conn = create_performance_db(path)
+        exporter = ColumnarExporter(path, root)
+
+        insert_runs(self.conn, 0, 200)
+        assert exporter.export() == {'request_samples': 200, 'performance_metrics': 200}
+        insert_runs(self.conn, 200, 40, seed=1)
+        assert exporter.export()['performance_metrics'] == 40
+        assert exporter.export()['performance_metrics'] == 0
+
+        columns = ['avg_response_time', 'task_success_rate']
+        expected = PerformanceQueries(path).mean_metrics_per_model(columns)
+        actual = ColumnarHistory(root).mean_metrics_per_model(columns)
+        assert list(actual.index) == list(expected.index)
+        assert np.allclose(actual[columns].to_numpy(), expected[columns].to_numpy())
+        assert (actual['run_count'].to_numpy() == expected['run_count'].to_numpy()).all()
+
+    def test_pruned_filtered_read(self, tmp_path):
+        """Model and time filters return exactly the matching rows and columns"""
+        path = str(tmp_path / 'performance.db')
+        root = str(tmp_path / 'columnar')
+        self.conn = create_performance_db(path)
+        insert_runs(self.conn, 0, 300)
+        ColumnarExporter(path, root).export()
+
+        start, end = datetime(2024, 1, 10, 7), datetime(2024, 1, 20)
+        samples = ColumnarHistory(root).read('request_samples', ['timestamp', 'latency_ms'],
+                                             models=['meta/llama-3'], start=start, end=end)
+        expected = self.conn.execute(
+            "SELECT COUNT(*) FROM request_samples WHERE model_name = 'meta/llama-3' AND timestamp >= ? AND timestamp < ?",
+            (start.isoformat(), end.isoformat())
+        ).fetchone()[0]
+
+        assert list(samples.columns) == ['timestamp', 'latency_ms']
+        assert len(samples) == expected > 0
+        assert samples['timestamp'].min() >= start and samples['timestamp'].max() < end
+
+    def test_compaction_preserves_rows(self, tmp_path):
+        """Compaction leaves one part per partition with the same contents"""
+        path = str(tmp_path / 'performance.db')
+        root = str(tmp_path / 'columnar')
+        self.conn = create_performance_db(path)
+        exporter = ColumnarExporter(path, root)
+        for batch in range(4):
+            insert_runs(self.conn, batch * 3, 3, seed=batch)
+            exporter.export()
+
+        history = ColumnarHistory(root)
+        before = history.metric_history(['avg_response_time'])
+        assert exporter.compact(min_files=2) > 0
+        after = history.metric_history(['avg_response_time'])
+
+        partitions = [files for _, _, files in os.walk(os.path.join(root, 'performance_metrics')) if files]
+        assert all(len(files) == 1 for files in partitions)
+        assert before.equals(after)
+
+    def test_incremental_history_reads_only_new_parts(self, tmp_path):
+        """An incremental history over the export picks up newly exported rows and matches a full read"""
+        path = str(tmp_path / 'performance.db')
+        root = str(tmp_path / 'columnar')
+        self.conn = create_performance_db(path)
+        exporter = ColumnarExporter(path, root)
+        insert_runs(self.conn, 0, 30)
+        exporter.export()
+
+        columnar = ColumnarHistory(root)
+        history = IncrementalMetricHistory(columnar, ['avg_response_time'])
+        assert history.refresh() == sorted(MODELS)
+        assert len(history.history) == 30
+        assert history.last_id == columnar.max_id() == 30
+
+        insert_runs(self.conn, 30, 9, seed=1)
+        exporter.export()
+        assert len(columnar.metric_history(['avg_response_time'], after_id=history.last_id)) == 9
+
+        full = columnar.metric_history(['avg_response_time'])
+        history.refresh()
+        refreshed = history.history
+        assert len(refreshed) == 39
+        assert refreshed['id'].tolist() == full['id'].tolist()
+        assert history.queries.first_row_key() == (1, datetime(2024, 1, 1))
+        assert len(history.downsampled(MODELS[0], 'avg_response_time', 5)) == 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
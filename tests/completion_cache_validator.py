@@ -0,0 +1,102 @@
+import os
+import sys
+import pytest
+from openai import OpenAI
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from completion_cache import CachingClient, CompletionCache, cache_key
+from mock_inference_server import MockInferenceServer, MockServerConfig
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCompletionCache:
+    def setup_method(self):
+        """Start a fast mock server"""
+        self.server = MockInferenceServer(MockServerConfig(seed=9, ttft_median_ms=1, completion_tokens=5)).start()
+        self.client = OpenAI(base_url=self.server.base_url, api_key='mock', max_retries=0)
+        self.clock = FakeClock()
+
+    def teardown_method(self):
+        self.server.stop()
+
+    def ask(self, client, content="What is 15 * 7?", **params):
+        return client.chat.completions.create(
+            model="deepseek-ai/deepseek-r1",
+            messages=[{"role": "user", "content": content}],
+            max_tokens=5,
+            **params
+        )
+
+    def test_greedy_repeats_are_served_from_cache(self, tmp_path):
+        """A repeated temperature-0 request never reaches the server"""
+        cached = CachingClient(self.client, CompletionCache(str(tmp_path / 'cache.db')))
+        first = self.ask(cached, temperature=0)
+        second = self.ask(cached, temperature=0)
+
+        assert self.server.requests_served == 1
+        assert second.choices[0].message.content == first.choices[0].message.content
+        assert second.usage.total_tokens == first.usage.total_tokens
+        stats = cached.cache.stats()
+        assert (stats['hits'], stats['misses']) == (1, 1)
+        assert stats['bytes_served'] == stats['size_bytes'] > 0
+
+    def test_sampled_requests_bypass_unless_forced(self, tmp_path):
+        """Non-deterministic requests go to the server unless caching is forced"""
+        cached = CachingClient(self.client, CompletionCache(str(tmp_path / 'cache.db')))
+        self.ask(cached)
+        self.ask(cached, temperature=0.7)
+        assert self.server.requests_served == 2
+        assert cached.cache.stats()['bypasses'] == 2
+
+        forced = CachingClient(self.client, cached.cache, force=True)
+        self.ask(forced, temperature=0.7)
+        self.ask(forced, temperature=0.7)
+        assert self.server.requests_served == 3
+
+    def test_key_covers_sampling_parameters(self):
+        """Requests differing in any keyed parameter get different addresses"""
+        messages = [{"role": "user", "content": "Hi"}]
+        base = cache_key("m", messages, temperature=0, max_tokens=10)
+
+        assert base == cache_key("m", [{"content": "Hi", "role": "user"}], temperature=0, max_tokens=10)
+        assert base != cache_key("m", messages, temperature=0, max_tokens=11)
+        assert base != cache_key("m", messages, temperature=0, top_p=0.5, max_tokens=10)
+
+    def test_ttl_expiry(self, tmp_path):
+        """Entries older than the TTL are misses"""
+        cache = CompletionCache(str(tmp_path / 'cache.db'), ttl_seconds=60, clock=self.clock)
+        cache.put('key', 'm', {'id': 1})
+
+        self.clock.now += 30
+        assert cache.get('key') == {'id': 1}
+        self.clock.now += 61
+        assert cache.get('key') is None
+        assert cache.stats()['entries'] == 0
+
+    def test_lru_eviction(self, tmp_path):
+        """The least recently used entries are evicted beyond the size bound"""
+        cache = CompletionCache(str(tmp_path / 'cache.db'), clock=self.clock)
+        for key in ('a', 'b', 'c'):
+            self.clock.now += 1
+            cache.put(key, 'm', {'text': key * 100})
+        cache.max_bytes = cache.stats()['size_bytes'] - 1
+
+        self.clock.now += 1
+        cache.get('a')
+        self.clock.now += 1
+        cache.put('d', 'm', {'text': 'd' * 100})
+
+        assert cache.get('a') is not None
+        assert cache.get('b') is None
+        assert cache.stats()['evictions'] >= 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,154 @@
+import os
+import sys
+import json
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from adaptive_model_router import AdaptiveModelSelector
+from complexity_classifier import TaskComplexityClassifier
+from router_scoring_validator import create_performance_db
+
+LABELLED_TASKS = {
+    'low': ["Fix a typo in the README", "Rename a variable", "Translate a greeting to French"],
+    'medium': ["Write unit tests for a parser", "Summarize a technical report", "Refactor a helper module"],
+    'high': ["Implement a REST API with authentication", "Optimize a slow SQL query plan",
+             "Debug a race condition in a worker pool"],
+    'extreme': ["Design a distributed consensus protocol", "Prove the correctness of a lock-free queue",
+                "Build a compiler for a new programming language"]
+}
+
+
+def selection_entries(repeat=5, complexity_source='caller'):
+    return [
+        {'task_description': description, 'task_complexity': complexity,
+         'selected_model': 'deepseek-r1', 'complexity_source': complexity_source}
+        for _ in range(repeat)
+        for complexity, descriptions in LABELLED_TASKS.items()
+        for description in descriptions
+    ]
+
+
+def append_log(path, entries, trailing=''):
+    with open(path, 'a') as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + '\n')
+        f.write(trailing)
+
+
+class TestTaskComplexityClassifier:
+    def test_learns_labelled_complexities_and_skips_inferred(self, tmp_path):
+        """Caller-labelled entries train the model; its own inferred labels are ignored"""
+        log_file = tmp_path / 'model_selection.jsonl'
+        append_log(log_file, selection_entries())
+        # Wrong labels that came from inference must not be learned
+        append_log(log_file, [dict(entry, task_complexity='low') for entry in selection_entries(10, 'inferred')])
+
+        classifier = TaskComplexityClassifier()
+        assert classifier.predict("Design a distributed consensus protocol") == 'medium'
+        assert classifier.train_from_log(str(log_file)) == 60
+
+        for complexity, descriptions in LABELLED_TASKS.items():
+            assert [classifier.predict(description) for description in descriptions] == [complexity] * 3
+            assert classifier.predict_many(descriptions + ['']) == [complexity] * 3 + ['medium']
+
+    def test_trains_only_on_appended_entries(self, tmp_path):
+        """Each run reads from the saved offset and leaves a partially written line for later"""
+        log_file = tmp_path / 'model_selection.jsonl'
+        append_log(log_file, selection_entries(2))
+        classifier = TaskComplexityClassifier()
+        assert classifier.train_from_log(str(log_file)) == 24
+        assert classifier.train_from_log(str(log_file)) == 0
+
+        partial = json.dumps(selection_entries(1)[0])
+        append_log(log_file, selection_entries(1), trailing=partial[:20])
+        assert classifier.train_from_log(str(log_file)) == 12
+        append_log(log_file, [], trailing=partial[20:] + '\n')
+        assert classifier.train_from_log(str(log_file)) == 1
+        assert classifier.training_samples == 37
+
+        # A rotated log that is shorter than the offset is read from the start
+        os.replace(log_file, tmp_path / 'old.jsonl')
+        append_log(log_file, selection_entries(1))
+        assert classifier.train_from_log(str(log_file)) == 12
+
+    def test_saved_model_resumes_from_its_offset(self, tmp_path):
+        """A restored model predicts like the saved one and only trains on entries added since"""
+        log_file, model_path = tmp_path / 'model_selection.jsonl', str(tmp_path / 'complexity_model.pkl')
+        append_log(log_file, selection_entries())
+        first = TaskComplexityClassifier()
+        assert first.update_from_log(str(log_file), model_path) == 60
+
+        append_log(log_file, selection_entries(1))
+        second = TaskComplexityClassifier()
+        assert second.update_from_log(str(log_file), model_path) == 12
+        assert second.training_samples == 72
+        descriptions = [description for group in LABELLED_TASKS.values() for description in group]
+        assert second.predict_many(descriptions) == first.predict_many(descriptions)
+
+        # Nothing new: the saved model is loaded and nothing is retrained
+        third = TaskComplexityClassifier()
+        assert third.update_from_log(str(log_file), model_path) == 0
+        assert third.is_trained and third.training_samples == 72
+
+
+class TestComplexityInference:
+    def setup_method(self):
+        self.selector = None
+
+    def teardown_method(self):
+        if self.selector is not None:
+            self.selector.close()
+
+    def make_selector(self, tmp_path):
+        if not (tmp_path / 'model_performance.db').exists():
+            create_performance_db(str(tmp_path / 'model_performance.db'), [('deepseek-r1', 900, 850, 80, 98, 1)])
+        self.selector = AdaptiveModelSelector(
+            performance_db_path=str(tmp_path / 'model_performance.db'),
+            selection_log_file=str(tmp_path / 'model_selection.jsonl')
+        )
+        # Training runs in the background; wait for it to see its effect
+        self.selector.complexity_training.join(timeout=30)
+        return self.selector
+
+    def test_select_optimal_model_infers_missing_complexity(self, tmp_path):
+        """Complexity omitted by the caller is inferred and logged as such"""
+        log_file = tmp_path / 'model_selection.jsonl'
+        append_log(log_file, selection_entries())
+        selector = self.make_selector(tmp_path)
+        assert selector.complexity_classifier.training_samples == 60
+        assert os.path.exists(selector.complexity_model_path)
+
+        selector.select_optimal_model(LABELLED_TASKS['extreme'][0])
+        selector.select_optimal_models([{"description": LABELLED_TASKS['low'][0]}])
+        selector.select_optimal_model(LABELLED_TASKS['low'][1], 'high')
+        selector.selection_log.flush()
+        with open(log_file) as f:
+            logged = [json.loads(line) for line in f][-3:]
+        assert [(entry['task_complexity'], entry['complexity_source']) for entry in logged] == \
+            [('extreme', 'inferred'), ('low', 'inferred'), ('high', 'caller')]
+
+        # A restarted selector loads the saved model and trains only on the one new caller entry
+        selector.close()
+        selector = self.make_selector(tmp_path)
+        assert selector.complexity_classifier.training_samples == 61
+        assert selector.infer_task_complexity(LABELLED_TASKS['extreme'][0]) == 'extreme'
+
+    def test_route_task_reports_complexity_it_routed_under(self, tmp_path):
+        """The complexity returned is the one used and logged, even if inference changes right after"""
+        log_file = tmp_path / 'model_selection.jsonl'
+        selector = self.make_selector(tmp_path)
+        # A retrained classifier swapped in between two inferences
+        levels = iter(['low', 'extreme'])
+        selector.infer_task_complexity = lambda description: next(levels)
+
+        model, complexity = selector.route_task("Summarize a report")
+        selector.selection_log.flush()
+        with open(log_file) as f:
+            logged = [json.loads(line) for line in f][-1]
+        assert complexity == 'low'
+        assert (logged['selected_model'], logged['task_complexity'], logged['complexity_source']) == \
+            (model, 'low', 'inferred')
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
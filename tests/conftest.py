@@ -0,0 +1,7 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+
+# Opt-in benchmark regression gate, active only with --regression-db
+pytest_plugins = ['regression_gate']
@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+import argparse
+from typing import Any, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from openai import OpenAI
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from client_registry import close_clients, get_client, measure_handshake_ms
+from mock_inference_server import MockInferenceServer, MockServerConfig
+
+# Load environment variables
+load_dotenv()
+
+
+def time_requests(client_for_request: Callable[[], Any], model: str, requests: int) -> float:
+    """Issue sequential small completions and return the elapsed seconds"""
+    start = time.perf_counter()
+    for i in range(requests):
+        client = client_for_request()
+        client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": f"Ping {i}"}],
+            max_tokens=1
+        )
+    return time.perf_counter() - start
+
+
+def run_benchmark(base_url: str, api_key: str, model: str, requests: int,
+                  server: Optional[MockInferenceServer] = None) -> Dict[str, Dict[str, float]]:
+    """Compare a fresh client per request with the shared registry client"""
+    results = {}
+    fresh_clients = []
+
+    def fresh_client():
+        # What setup_method used to do before every test
+        client = OpenAI(base_url=base_url, api_key=api_key, max_retries=0)
+        fresh_clients.append(client)
+        return client
+
+    shared = get_client('deepseek', api_key=api_key, base_url=base_url).with_options(max_retries=0)
+    modes = {'fresh client': fresh_client, 'shared client': lambda: shared}
+
+    for mode, client_for_request in modes.items():
+        connections_before = server.connections_accepted if server else None
+        elapsed = time_requests(client_for_request, model, requests)
+        results[mode] = {
+            'ms_per_request': elapsed * 1000 / requests,
+            'connections': server.connections_accepted - connections_before if server else None
+        }
+        for client in fresh_clients:
+            client.close()
+        fresh_clients.clear()
+
+    close_clients()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Handshake time saved by pooled, reused clients")
+    parser.add_argument('--base-url', default=os.getenv('DEEPSEEK_BASE_URL', "https://integrate.api.nvidia.com/v1"))
+    parser.add_argument('--mock', action='store_true', help="Run against an in-process mock inference server")
+    parser.add_argument('--model', default="deepseek-ai/deepseek-r1")
+    parser.add_argument('--requests', type=int, default=1000)
+    args = parser.parse_args()
+
+    server = MockInferenceServer(MockServerConfig(ttft_median_ms=1, completion_tokens=1)).start() if args.mock else None
+    base_url = server.base_url if server else args.base_url
+    try:
+        handshake_ms = measure_handshake_ms(base_url)
+        results = run_benchmark(base_url, os.getenv('NVIDIA_API_KEY') or 'mock', args.model, args.requests, server)
+    finally:
+        if server:
+            server.stop()
+
+    print(f"Connection setup (TCP{' + TLS' if base_url.startswith('https') else ''}): {handshake_ms:.2f} ms")
+    print(f"{'mode':>14} {'ms/request':>11} {'connections':>12}")
+    for mode, result in results.items():
+        connections = '-' if result['connections'] is None else result['connections']
+        print(f"{mode:>14} {result['ms_per_request']:>11.2f} {connections:>12}")
+
+    fresh, shared = results['fresh client'], results['shared client']
+    if fresh['connections'] is not None:
+        avoided_per_1k = (fresh['connections'] - shared['connections']) * 1000 / args.requests
+    else:
+        # Without a server-side count assume one connection per fresh client and one in total when shared
+        avoided_per_1k = (args.requests - 1) * 1000 / args.requests
+    print(f"Handshake time saved per 1k requests: {avoided_per_1k * handshake_ms:.0f} ms "
+          f"({avoided_per_1k:.0f} connections avoided)")
+    print(f"Wall time saved per 1k requests: {(fresh['ms_per_request'] - shared['ms_per_request']) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import os
+import sys
+import sqlite3
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from downsampling import lttb_indices
+from performance_queries import IncrementalMetricHistory, PerformanceQueries
+
+
+def create_performance_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE performance_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, model_name TEXT, total_queries INTEGER,
+            avg_response_time REAL, median_response_time REAL, avg_token_generation_rate REAL,
+            task_success_rate REAL, error_rate REAL, total_execution_time REAL
+        )
+    ''')
+    return conn
+
+
+def insert_runs(conn, start, count, models=('deepseek-r1', 'gpt-3.5-turbo')):
+    conn.executemany(
+        "INSERT INTO performance_metrics (timestamp, model_name, avg_response_time, task_success_rate) "
+        "VALUES (?, ?, ?, ?)",
+        [((datetime(2024, 1, 1) + timedelta(minutes=start + i)).isoformat(), models[i % len(models)], 1000.0 + i, 90.0)
+         for i in range(count)]
+    )
+    conn.commit()
+
+
+class TestLttb:
+    def test_keeps_endpoints_and_extremes(self):
+        """Downsampling keeps the first, last and spike points"""
+        x = np.arange(10000, dtype=float)
+        y = np.sin(x / 500)
+        y[4321] = 50
+        y[7777] = -50
+
+        kept = lttb_indices(x, y, 200)
+
+        assert len(kept) == 200
+        assert kept[0] == 0 and kept[-1] == 9999
+        assert np.all(np.diff(kept) > 0)
+        assert 4321 in kept and 7777 in kept
+
+    def test_short_series_unchanged(self):
+        """Series within the bound are returned whole"""
+        assert list(lttb_indices(np.arange(5), np.arange(5), 10)) == [0, 1, 2, 3, 4]
+
+
+class TestIncrementalMetricHistory:
+    def test_only_new_rows_are_fetched(self, tmp_path):
+        """Refreshes extend the cached history with rows past the last seen id"""
+        path = str(tmp_path / 'performance.db')
+        conn = create_performance_db(path)
+        insert_runs(conn, 0, 100)
+        history = IncrementalMetricHistory(PerformanceQueries(path), ['avg_response_time'])
+
+        assert history.refresh() == ['deepseek-r1', 'gpt-3.5-turbo']
+        assert len(history.history) == 100
+        insert_runs(conn, 100, 10)
+        fetched = history.queries.metric_history(['avg_response_time'], after_id=history.last_id)
+        assert len(fetched) == 10
+
+        history.refresh()
+        refreshed = history.history
+        assert len(refreshed) == 110
+        assert history.last_id == 110
+        assert refreshed.groupby('model_name')['timestamp'].is_monotonic_increasing.all()
+
+    def test_downsampled_series_is_bounded_and_invalidated(self, tmp_path):
+        """Trend lines stay within the point bound and pick up new rows"""
+        path = str(tmp_path / 'performance.db')
+        conn = create_performance_db(path)
+        insert_runs(conn, 0, 5000, models=('deepseek-r1',))
+        history = IncrementalMetricHistory(PerformanceQueries(path), ['avg_response_time'])
+        history.refresh()
+
+        series = history.downsampled('deepseek-r1', 'avg_response_time', 300)
+        assert len(series) == 300
+        assert history.downsampled('deepseek-r1', 'avg_response_time', 300) is series
+
+        insert_runs(conn, 5000, 1, models=('deepseek-r1',))
+        history.refresh()
+        assert history.downsampled('deepseek-r1', 'avg_response_time', 300)['avg_response_time'].iloc[-1] == 1000.0
+
+    def test_history_matches_full_query(self, tmp_path):
+        """Appending per model keeps every series in timestamp order, including late-arriving rows"""
+        path = str(tmp_path / 'performance.db')
+        conn = create_performance_db(path)
+        insert_runs(conn, 1000, 50)
+        history = IncrementalMetricHistory(PerformanceQueries(path), ['avg_response_time', 'task_success_rate'])
+        history.refresh()
+        insert_runs(conn, 0, 20)
+        insert_runs(conn, 1050, 30)
+        history.refresh()
+
+        full = PerformanceQueries(path).metric_history(['avg_response_time', 'task_success_rate'])
+        assert history.history['id'].tolist() == full['id'].tolist()
+        assert history.history['avg_response_time'].tolist() == full['avg_response_time'].tolist()
+
+    def test_only_changed_models_are_downsampled_again(self, tmp_path):
+        """New rows for one model keep the cached series of the others"""
+        path = str(tmp_path / 'performance.db')
+        conn = create_performance_db(path)
+        insert_runs(conn, 0, 100)
+        history = IncrementalMetricHistory(PerformanceQueries(path), ['avg_response_time'])
+        history.refresh()
+        deepseek = history.downsampled('deepseek-r1', 'avg_response_time', 10)
+        gpt = history.downsampled('gpt-3.5-turbo', 'avg_response_time', 10)
+
+        insert_runs(conn, 100, 3, models=('deepseek-r1',))
+        history.refresh()
+        assert history.downsampled('gpt-3.5-turbo', 'avg_response_time', 10) is gpt
+        assert history.downsampled('deepseek-r1', 'avg_response_time', 10) is not deepseek
+
+    def test_rebuilt_database_with_more_rows_reloads(self, tmp_path):
+        """A database replaced by one with more rows is reloaded rather than appended to"""
+        path = str(tmp_path / 'performance.db')
+        conn = create_performance_db(path)
+        insert_runs(conn, 0, 10)
+        history = IncrementalMetricHistory(PerformanceQueries(path), ['avg_response_time'])
+        history.refresh()
+
+        # Rebuild in place: same ids, different history, more rows than before
+        conn.execute("DELETE FROM performance_metrics")
+        conn.execute("DELETE FROM sqlite_sequence")
+        conn.commit()
+        insert_runs(conn, 500, 25)
+        history.refresh()
+
+        assert len(history.history) == 25
+        assert history.history['timestamp'].min() == datetime(2024, 1, 1) + timedelta(minutes=500)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
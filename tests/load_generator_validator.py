@@ -0,0 +1,104 @@
+import os
+import sys
+import time
+import threading
+import pytest
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from load_generator import HdrHistogram, LoadStepResult, OpenLoopLoadGenerator, find_saturation_knee
+
+
+class TestHdrHistogram:
+    def test_percentiles_keep_three_significant_digits(self):
+        """Percentiles stay within 0.1% of the exact values across the range"""
+        values = np.random.default_rng(3).lognormal(mean=5, sigma=2, size=20000)
+        histogram = HdrHistogram()
+        for value in values:
+            histogram.record(value)
+
+        for percentile in (50, 90, 99, 99.9):
+            exact = np.percentile(values, percentile, method='inverted_cdf')
+            assert histogram.percentile(percentile) == pytest.approx(exact, rel=1e-3, abs=1e-3)
+
+    def test_coordinated_omission_correction(self):
+        """A stall in a closed loop backfills the requests that were never sent"""
+        corrected = HdrHistogram()
+        for _ in range(99):
+            corrected.record_corrected(10, expected_interval_ms=100)
+        corrected.record_corrected(1000, expected_interval_ms=100)
+
+        assert corrected.total_count == 99 + 10
+        # Uncorrected, p95 would be 10 ms; the backfilled samples push it past the stall interval
+        assert corrected.percentile(95) > 100
+
+    def test_merge(self):
+        """Merged histograms equal one histogram of all values"""
+        left, right, combined = HdrHistogram(), HdrHistogram(), HdrHistogram()
+        for value in range(1, 1000):
+            (left if value % 2 else right).record(value)
+            combined.record(value)
+        left.merge(right)
+
+        assert left.summary() == combined.summary()
+
+
+class TestOpenLoopLoadGenerator:
+    def test_poisson_arrivals_match_target_rate(self):
+        """The arrival schedule averages the target rate"""
+        generator = OpenLoopLoadGenerator(lambda: None, seed=1)
+        offsets = generator.arrival_offsets(rate_rps=200, duration_s=50)
+
+        assert len(offsets) == pytest.approx(10000, rel=0.05)
+        assert np.all(np.diff(offsets) >= 0)
+
+    def test_queueing_counts_as_latency(self):
+        """Latency is measured from the scheduled send time, not the dispatch time"""
+        generator = OpenLoopLoadGenerator(lambda: time.sleep(0.05), max_in_flight=1, seed=2)
+        step = generator.run_step(rate_rps=60, duration_s=1.0)
+
+        # One worker serves 20 rps, so requests queue far beyond their 50 ms service time
+        assert step.service_time.percentile(50) < 80
+        assert step.latency.percentile(99) > 500
+
+    def test_requests_outstanding_after_drain_are_counted(self):
+        """Running requests time out with their latency so far, unstarted ones are dropped"""
+        release = threading.Event()
+        generator = OpenLoopLoadGenerator(lambda: release.wait(5), max_in_flight=2, drain_timeout=0.3, seed=5)
+        try:
+            step = generator.run_step(rate_rps=20, duration_s=0.5)
+        finally:
+            release.set()
+        time.sleep(0.1)
+
+        assert step.timed_out == 2
+        assert step.dropped == step.offered - 2
+        assert step.completed == step.errors == 0
+        assert step.error_rate == 1.0
+        # Each hung request waited out at least the drain timeout
+        assert step.latency.total_count == 2
+        assert step.latency.percentile(0) >= 300
+        # Requests finishing after the step ended leave its result alone
+        assert step.to_dict()['latency_ms']['count'] == 2 and step.service_time.total_count == 0
+
+    def test_knee_detection(self):
+        """Ramping past capacity reports the saturation knee"""
+        generator = OpenLoopLoadGenerator(lambda: time.sleep(0.02), max_in_flight=2, seed=4)
+        steps = generator.ramp([10, 40, 200], step_duration_s=1.0)
+        knee = find_saturation_knee(steps)
+
+        assert knee['knee_rps'] == 200
+        assert knee['max_sustainable_rps'] == 40
+
+    def test_errors_count_toward_knee(self):
+        """A step with too many failures is past the knee"""
+        healthy = LoadStepResult(target_rps=10, duration_s=1, offered=10, completed=10, achieved_rps=10)
+        failing = LoadStepResult(target_rps=20, duration_s=1, offered=20, completed=10, errors=10, achieved_rps=20)
+
+        knee = find_saturation_knee([healthy, failing])
+        assert knee['knee_rps'] == 20
+        assert 'error rate' in knee['reason']
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,89 @@
+import os
+import sys
+import time
+import pytest
+from openai import OpenAI, RateLimitError, InternalServerError
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from mock_inference_server import MockInferenceServer, MockServerConfig
+from stream_metrics import measure_openai_stream
+
+
+class TestMockInferenceServer:
+    def setup_method(self):
+        """Start a fast, seeded mock server"""
+        self.server = MockInferenceServer(MockServerConfig(
+            seed=7,
+            ttft_median_ms=50,
+            tokens_per_second=200,
+            tokens_per_second_std=0,
+            completion_tokens=20
+        )).start()
+        self.client = OpenAI(base_url=self.server.base_url, api_key='mock', max_retries=0)
+
+    def teardown_method(self):
+        self.server.stop()
+
+    def test_non_streaming_completion(self):
+        """Non-streaming responses carry content and usage"""
+        response = self.client.chat.completions.create(
+            model="deepseek-ai/deepseek-r1",
+            messages=[{"role": "user", "content": "What is 15 * 7?"}],
+            max_tokens=10
+        )
+
+        assert response.choices[0].message.content
+        assert response.usage.completion_tokens == 10
+        assert response.usage.prompt_tokens > 0
+
+    def test_streaming_timing(self):
+        """Streams honour the configured time to first token and token rate"""
+        measurement = measure_openai_stream(
+            self.client, "deepseek-ai/deepseek-r1", [{"role": "user", "content": "Stream please"}], max_tokens=20
+        )
+
+        assert measurement.token_source == 'usage'
+        assert measurement.output_tokens == 20
+        assert measurement.chunk_count == 20
+        assert 10 < measurement.ttft_ms < 500
+        # 200 tokens/s means 5 ms between chunks
+        assert 3 < measurement.gap_percentile(50) < 20
+
+    def test_seeded_responses_are_reproducible(self):
+        """The same seed replays identical content across servers"""
+        def ask(client):
+            return client.chat.completions.create(
+                model="deepseek-ai/deepseek-r1",
+                messages=[{"role": "user", "content": "Repeatable"}]
+            ).choices[0].message.content
+
+        first = ask(self.client)
+        second = ask(self.client)
+        with MockInferenceServer(self.server.config) as replay:
+            replay_client = OpenAI(base_url=replay.base_url, api_key='mock', max_retries=0)
+            assert [ask(replay_client), ask(replay_client)] == [first, second]
+
+    def test_rate_limit_injection(self):
+        """Injected 429s carry Retry-After"""
+        self.server.config.rate_limit_rate = 1.0
+        with pytest.raises(RateLimitError) as excinfo:
+            self.client.chat.completions.create(
+                model="deepseek-ai/deepseek-r1",
+                messages=[{"role": "user", "content": "Hello"}]
+            )
+
+        assert excinfo.value.response.headers['retry-after'] == '1'
+
+    def test_server_error_injection(self):
+        """Injected 5xx errors surface as server errors"""
+        self.server.config.server_error_rate = 1.0
+        self.server.config.server_error_codes = (503,)
+        with pytest.raises(InternalServerError):
+            self.client.chat.completions.create(
+                model="deepseek-ai/deepseek-r1",
+                messages=[{"role": "user", "content": "Hello"}]
+            )
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -1,15 +1,59 @@
 import os
+import sys
 import time
 import json
+import math
+import argparse
+import multiprocessing
 import statistics
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
 from dataclasses import dataclass, asdict
-from typing import List, Dict, Any
+from typing import Iterable, Iterator, List, Dict, Any
 from dotenv import load_dotenv
-from openai import OpenAI
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from client_registry import get_client
+from stream_metrics import measure_openai_stream
+from rate_limiter import PROVIDER_RATE_LIMITS, get_rate_limiter
+from scenario_corpus import ScenarioCorpus, SweepCheckpoint
+from stream_validation import StreamingValidator
+from token_accounting import count_tokens
 
 # Load environment variables
 load_dotenv()
 
+# Benchmark owned by a sharded-run worker process, created by _init_shard_worker
+_shard_benchmark = None
+
+
+def _init_shard_worker(benchmark_class: type, models: List[str], workers: int, options: Dict[str, Any]):
+    """Give a worker process its own benchmark and clients, with a share of each provider's rate limits"""
+    global _shard_benchmark
+    for provider, key_env in (('deepseek', 'NVIDIA_API_KEY'), ('openai', 'OPENAI_API_KEY')):
+        limits = {
+            name: value / workers for name, value in PROVIDER_RATE_LIMITS.get(provider, {}).items()
+            if name in ('requests_per_minute', 'tokens_per_minute') and value
+        }
+        get_rate_limiter(provider, os.getenv(key_env), **limits)
+    _shard_benchmark = benchmark_class(models, **options)
+
+
+def _evaluate_shard(scenarios: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Evaluate one shard in a worker process, returning per-model partial accumulators"""
+    return _shard_benchmark.evaluate_scenarios(scenarios)
+
+
+def _shards(scenarios: Iterable[Dict[str, Any]], shard_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group a scenario stream into lists of shard_size"""
+    iterator = iter(scenarios)
+    while True:
+        shard = list(islice(iterator, shard_size))
+        if not shard:
+            return
+        yield shard
+
 @dataclass
 class ModelPerformanceMetrics:
     model_name: str
@@ -20,19 +64,36 @@ class ModelPerformanceMetrics:
     task_success_rate: float
     error_rate: float
     total_execution_time: float
+    avg_time_to_first_token: float = 0.0
+    p95_inter_chunk_latency: float = 0.0
+    # Streams closed on their validation verdict, kept out of the response time and rate averages
+    cancelled_queries: int = 0
+    avg_time_to_verdict: float = 0.0
 
 class MultiModelBenchmark:
-    def __init__(self, models: List[str]):
-        """Initialize benchmark with multiple models"""
+    def __init__(self, models: List[str], cancel_on_verdict: bool = False):
+        """
+        Initialize benchmark with multiple models.
+        
+        With cancel_on_verdict, a stream is closed as soon as validation is
+        decided, saving time and tokens. Cancelled requests measure the time
+        to verdict rather than the full generation, so they are reported as
+        cancelled_queries and avg_time_to_verdict instead of being averaged
+        into response times and token generation rate.
+        """
         self.models = models
+        self.cancel_on_verdict = cancel_on_verdict
         self.clients = {
-            "deepseek": OpenAI(
-                base_url="https://integrate.api.nvidia.com/v1",
-                api_key=os.getenv('NVIDIA_API_KEY')
+            "deepseek": get_client(
+                'deepseek',
+                api_key=os.getenv('NVIDIA_API_KEY'),
+                base_url=os.getenv('DEEPSEEK_BASE_URL', "https://integrate.api.nvidia.com/v1")
             ),
-            "openai": OpenAI(
-                api_key=os.getenv('OPENAI_API_KEY')
-            )
+            "openai": get_client('openai', api_key=os.getenv('OPENAI_API_KEY'))
+        }
+        self.rate_limiters = {
+            "deepseek": get_rate_limiter('deepseek', os.getenv('NVIDIA_API_KEY')),
+            "openai": get_rate_limiter('openai', os.getenv('OPENAI_API_KEY'))
         }
         
         # Real-world use case scenarios
@@ -59,28 +120,47 @@ class MultiModelBenchmark:
             }
         ]
     
+    def _provider_for(self, model_name: str) -> str:
+        """Return the provider serving a model"""
+        return 'deepseek' if model_name.startswith('deepseek') else 'openai'
+    
     def evaluate_model(self, model_name: str, scenario: Dict[str, Any]) -> Dict[str, Any]:
-        """Evaluate a specific model's performance on a scenario"""
+        """Evaluate a specific model's performance on a scenario from a streamed response"""
         start_time = time.time()
         response_times = []
+        verdict_times = []
+        ttfts = []
+        inter_chunk_gaps = []
+        output_tokens = 0
+        generation_time = 0
         success_count = 0
         error_count = 0
         
         try:
-            query_start = time.time()
-            response = self.clients[model_name].chat.completions.create(
-                model=model_name,
-                messages=[{"role": "user", "content": scenario['prompt']}],
-                max_tokens=500
-            )
-            query_end = time.time()
+            provider = self._provider_for(model_name)
+            # Validated chunk by chunk as the response streams in
+            validator = StreamingValidator.for_scenario(scenario)
+            with self.rate_limiters[provider].request(estimated_tokens=count_tokens(scenario['prompt'], model_name) + 500) as permit:
+                measurement = measure_openai_stream(
+                    self.clients[provider],
+                    model_name,
+                    [{"role": "user", "content": scenario['prompt']}],
+                    max_tokens=500,
+                    on_chunk=lambda text: validator.feed(text) and self.cancel_on_verdict
+                )
+                permit.record((measurement.input_tokens or 0) + measurement.output_tokens)
             
-            response_time = (query_end - query_start) * 1000  # Convert to milliseconds
-            response_times.append(response_time)
+            if measurement.cancelled:
+                verdict_times.append(measurement.total_time_ms)
+            else:
+                response_times.append(measurement.total_time_ms)
+                output_tokens = measurement.output_tokens
+                generation_time = measurement.total_time_ms / 1000
+            if measurement.ttft_ms is not None:
+                ttfts.append(measurement.ttft_ms)
+            inter_chunk_gaps.extend(measurement.inter_chunk_gaps_ms)
             
-            # Validate response against scenario expectations
-            content = response.choices[0].message.content
-            success = self._validate_response(scenario, content)
+            success = validator.passed
             
             if success:
                 success_count += 1
@@ -95,56 +175,179 @@ class MultiModelBenchmark:
         
         return {
             "response_times": response_times,
+            "verdict_times": verdict_times,
+            "ttfts": ttfts,
+            "inter_chunk_gaps": inter_chunk_gaps,
+            "output_tokens": output_tokens,
+            "generation_time": generation_time,
             "success_count": success_count,
             "error_count": error_count,
             "total_time": total_time
         }
     
-    def _validate_response(self, scenario: Dict[str, Any], content: str) -> bool:
-        """Validate response based on scenario expectations"""
-        if "expected_sections" in scenario:
-            return all(section.lower() in content.lower() for section in scenario['expected_sections'])
-        
-        if "expected_components" in scenario:
-            return all(component.lower() in content.lower() for component in scenario['expected_components'])
-        
-        return True
+    @staticmethod
+    def _empty_model_results() -> Dict[str, Any]:
+        """Per-model accumulator; float totals are kept per scenario so merged sums stay exact"""
+        return {
+            "response_times": [],
+            "verdict_times": [],
+            "ttfts": [],
+            "inter_chunk_gaps": [],
+            "generation_times": [],
+            "total_times": [],
+            "output_tokens": 0,
+            "success_count": 0,
+            "error_count": 0,
+            "total_queries": 0
+        }
     
-    def run_benchmark(self) -> List[ModelPerformanceMetrics]:
-        """Run comprehensive benchmarking across models and scenarios"""
-        results = []
+    @staticmethod
+    def merge_model_results(target: Dict[str, Any], partial: Dict[str, Any]) -> Dict[str, Any]:
+        """Fold a partial accumulator into another: lists are concatenated, counts added"""
+        for key, value in partial.items():
+            target[key] += value
+        return target
+    
+    def evaluate_scenarios(self, scenarios: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Evaluate every model on the scenarios, streamed anew for each model"""
+        results = {model_name: self._empty_model_results() for model_name in self.models}
         
         for model_name in self.models:
-            model_results = {
-                "response_times": [],
-                "success_count": 0,
-                "error_count": 0,
-                "total_time": 0
-            }
-            
-            for scenario in self.scenarios:
+            model_results = results[model_name]
+            for scenario in scenarios:
                 scenario_result = self.evaluate_model(model_name, scenario)
                 
                 model_results['response_times'].extend(scenario_result['response_times'])
+                model_results['verdict_times'].extend(scenario_result.get('verdict_times', []))
+                model_results['ttfts'].extend(scenario_result['ttfts'])
+                model_results['inter_chunk_gaps'].extend(scenario_result['inter_chunk_gaps'])
+                model_results['generation_times'].append(scenario_result['generation_time'])
+                model_results['total_times'].append(scenario_result['total_time'])
+                model_results['output_tokens'] += scenario_result['output_tokens']
                 model_results['success_count'] += scenario_result['success_count']
                 model_results['error_count'] += scenario_result['error_count']
-                model_results['total_time'] += scenario_result['total_time']
-            
-            metrics = ModelPerformanceMetrics(
-                model_name=model_name,
-                total_queries=len(self.scenarios),
-                avg_response_time=statistics.mean(model_results['response_times']) if model_results['response_times'] else 0,
-                median_response_time=statistics.median(model_results['response_times']) if model_results['response_times'] else 0,
-                avg_token_generation_rate=len(model_results['response_times']) / model_results['total_time'],
-                task_success_rate=(model_results['success_count'] / len(self.scenarios)) * 100,
-                error_rate=(model_results['error_count'] / len(self.scenarios)) * 100,
-                total_execution_time=model_results['total_time']
-            )
-            
-            results.append(metrics)
+                model_results['total_queries'] += 1
         
         return results
     
+    @staticmethod
+    def _metrics_from_results(model_name: str, model_results: Dict[str, Any]) -> ModelPerformanceMetrics:
+        """
+        Compute a model's metrics from its accumulator.
+        
+        Every statistic is independent of the order samples were accumulated
+        in (fsum and statistics.mean are exactly rounded), so merged shards give
+        the same metrics as a single pass.
+        """
+        total_queries = model_results['total_queries']
+        generation_time = math.fsum(model_results['generation_times'])
+        return ModelPerformanceMetrics(
+            model_name=model_name,
+            total_queries=total_queries,
+            avg_response_time=statistics.mean(model_results['response_times']) if model_results['response_times'] else 0,
+            median_response_time=statistics.median(model_results['response_times']) if model_results['response_times'] else 0,
+            avg_token_generation_rate=model_results['output_tokens'] / generation_time if generation_time > 0 else 0,
+            task_success_rate=(model_results['success_count'] / total_queries) * 100 if total_queries else 0,
+            error_rate=(model_results['error_count'] / total_queries) * 100 if total_queries else 0,
+            total_execution_time=math.fsum(model_results['total_times']),
+            avg_time_to_first_token=statistics.mean(model_results['ttfts']) if model_results['ttfts'] else 0,
+            p95_inter_chunk_latency=statistics.quantiles(model_results['inter_chunk_gaps'], n=20)[-1] if len(model_results['inter_chunk_gaps']) > 1 else 0,
+            cancelled_queries=len(model_results['verdict_times']),
+            avg_time_to_verdict=statistics.mean(model_results['verdict_times']) if model_results['verdict_times'] else 0
+        )
+    
+    def run_benchmark(self, scenarios: Iterable[Dict[str, Any]] = None) -> List[ModelPerformanceMetrics]:
+        """Run comprehensive benchmarking across models and scenarios"""
+        scenarios = self.scenarios if scenarios is None else scenarios
+        results = self.evaluate_scenarios(scenarios)
+        return [self._metrics_from_results(model_name, results[model_name]) for model_name in self.models]
+    
+    def run_benchmark_sharded(self, scenarios: Iterable[Dict[str, Any]] = None, workers: int = None,
+                              shard_size: int = 20) -> List[ModelPerformanceMetrics]:
+        """
+        Run the benchmark on a pool of processes, sharding the scenarios.
+        
+        Scenarios are read lazily and sent out in shards of shard_size, with at
+        most two shards per worker in flight. Each worker process builds its
+        own benchmark, and with it its own clients and a 1/workers share of
+        the provider rate limits. Workers return per-model partial accumulators,
+        which are merged as they arrive, so the metrics equal those of
+        run_benchmark over the same responses.
+        """
+        scenarios = self.scenarios if scenarios is None else scenarios
+        workers = workers or os.cpu_count()
+        with self._shard_pool(workers) as executor:
+            merged = self._evaluate_sharded(executor, scenarios, workers, shard_size)
+        return [self._metrics_from_results(model_name, merged[model_name]) for model_name in self.models]
+    
+    def _shard_pool(self, workers: int) -> ProcessPoolExecutor:
+        """Process pool whose workers each hold their own benchmark"""
+        # Spawned rather than forked, so no worker inherits the parent's pooled connections
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_shard_worker,
+                                   initargs=(type(self), self.models, workers,
+                                             {'cancel_on_verdict': self.cancel_on_verdict}))
+    
+    def _evaluate_sharded(self, executor: ProcessPoolExecutor, scenarios: Iterable[Dict[str, Any]],
+                          workers: int, shard_size: int) -> Dict[str, Dict[str, Any]]:
+        """Evaluate scenarios in shards on a pool, merging the partial accumulators as they arrive"""
+        merged = {model_name: self._empty_model_results() for model_name in self.models}
+        
+        def merge(futures):
+            for future in futures:
+                for model_name, partial in future.result().items():
+                    self.merge_model_results(merged[model_name], partial)
+        
+        pending = set()
+        for shard in _shards(scenarios, shard_size):
+            pending.add(executor.submit(_evaluate_shard, shard))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                merge(done)
+        merge(pending)
+        return merged
+    
+    def run_corpus(self, corpus: ScenarioCorpus, checkpoint_path: str = 'reports/corpus_checkpoint.json',
+                   batch_size: int = 100, workers: int = 1, shard_size: int = 20) -> List[ModelPerformanceMetrics]:
+        """
+        Benchmark every model on a scenario corpus streamed batch by batch.
+        
+        After each batch the corpus offset reached and the merged per-model
+        accumulators are saved to the checkpoint together, so an interrupted
+        sweep started again with the same corpus and checkpoint skips the
+        finished batches, re-evaluates only the interrupted one, and ends with
+        the metrics of an uninterrupted run. With workers > 1 each batch is
+        sharded across one process pool kept for the whole sweep.
+        """
+        checkpoint = SweepCheckpoint(checkpoint_path)
+        state = checkpoint.load(corpus.path)
+        if state is None:
+            state = {'offset': 0, 'completed': 0, 'results': {}}
+        else:
+            print(f"Resuming sweep after {state['completed']} scenarios")
+        results = state['results']
+        for model_name in self.models:
+            results.setdefault(model_name, self._empty_model_results())
+        
+        with self._shard_pool(workers) if workers > 1 else nullcontext() as executor:
+            for batch in corpus.batches(batch_size, state['offset'], state['completed']):
+                scenarios = [entry.scenario for entry in batch]
+                if executor is not None:
+                    partials = self._evaluate_sharded(executor, scenarios, workers, shard_size)
+                else:
+                    partials = self.evaluate_scenarios(scenarios)
+                for model_name, partial in partials.items():
+                    self.merge_model_results(results[model_name], partial)
+                
+                state['offset'] = batch[-1].next_offset
+                state['completed'] += len(batch)
+                checkpoint.save(corpus.path, state)
+                print(f"Completed {state['completed']} scenarios of {corpus.path}")
+        
+        metrics = [self._metrics_from_results(model_name, results[model_name]) for model_name in self.models]
+        checkpoint.clear()
+        return metrics
+    
     def generate_report(self, results: List[ModelPerformanceMetrics]) -> None:
         """Generate a comprehensive benchmarking report"""
         report_path = os.path.join(os.getcwd(), 'benchmark_report.json')
@@ -155,12 +358,32 @@ class MultiModelBenchmark:
         print(f"Benchmark report generated: {report_path}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Benchmark DeepSeek and OpenAI models")
+    parser.add_argument('--corpus', help="JSONL scenario corpus streamed instead of the built-in scenarios")
+    parser.add_argument('--prompt-field', default='prompt', help="Corpus field holding the prompt")
+    parser.add_argument('--name-field', default='name', help="Corpus field holding the scenario name")
+    parser.add_argument('--workers', type=int, default=1, help="Processes to shard the scenarios across")
+    parser.add_argument('--shard-size', type=int, default=20, help="Scenarios per shard sent to a worker")
+    parser.add_argument('--batch-size', type=int, default=100, help="Corpus scenarios per checkpointed batch")
+    parser.add_argument('--checkpoint', default='reports/corpus_checkpoint.json',
+                        help="Progress file an interrupted --corpus sweep resumes from")
+    parser.add_argument('--cancel-on-verdict', action='store_true',
+                        help="Close each stream as soon as its validation is decided")
+    args = parser.parse_args()
+    
     benchmark = MultiModelBenchmark([
         "deepseek-ai/deepseek-r1",
         "gpt-3.5-turbo"
-    ])
+    ], cancel_on_verdict=args.cancel_on_verdict)
     
-    results = benchmark.run_benchmark()
+    if args.corpus:
+        corpus = ScenarioCorpus(args.corpus, args.prompt_field, args.name_field)
+        results = benchmark.run_corpus(corpus, args.checkpoint, batch_size=args.batch_size,
+                                       workers=args.workers, shard_size=args.shard_size)
+    elif args.workers > 1:
+        results = benchmark.run_benchmark_sharded(workers=args.workers, shard_size=args.shard_size)
+    else:
+        results = benchmark.run_benchmark()
     benchmark.generate_report(results)
 
 if __name__ == "__main__":
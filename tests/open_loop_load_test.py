@@ -0,0 +1,99 @@
+import os
+import sys
+import json
+import argparse
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from client_registry import get_client
+from load_generator import OpenLoopLoadGenerator, find_saturation_knee
+from mock_inference_server import MockInferenceServer, MockServerConfig
+
+# Load environment variables
+load_dotenv()
+
+
+def make_request_fn(client: Any, model: str, prompt: str, max_tokens: int):
+    """Build a request function issuing one chat completion"""
+    def request():
+        client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens
+        )
+    return request
+
+
+def run_load_test(base_url: str, api_key: str, models: List[str], rates: List[float], step_duration: float,
+                  max_in_flight: int, prompt: str, max_tokens: int, seed: int) -> Dict[str, Any]:
+    """Ramp every model through the rate steps and locate its saturation knee"""
+    # Retries would hide errors and re-inject load outside the schedule
+    client = get_client('deepseek', api_key=api_key, base_url=base_url).with_options(max_retries=0)
+    report = {}
+
+    for model in models:
+        generator = OpenLoopLoadGenerator(
+            make_request_fn(client, model, prompt, max_tokens),
+            max_in_flight=max_in_flight,
+            seed=seed
+        )
+        steps = generator.ramp(rates, step_duration)
+        knee = find_saturation_knee(steps)
+        report[model] = {'steps': [step.to_dict() for step in steps], 'knee': knee}
+
+        print(f"\n{model}")
+        print(f"{'target rps':>11} {'offered':>8} {'achieved':>9} {'errors':>7} {'p50 ms':>9} {'p99 ms':>9} {'p99.9 ms':>9}")
+        for step in steps:
+            latency = step.latency.summary()
+            print(f"{step.target_rps:>11.1f} {step.offered_rps:>8.1f} {step.achieved_rps:>9.1f} {step.error_rate:>7.1%} "
+                  f"{latency['p50'] or 0:>9.0f} {latency['p99'] or 0:>9.0f} {latency['p99.9'] or 0:>9.0f}")
+        if knee['knee_rps'] is None:
+            print(f"No saturation knee up to {rates[-1]} rps")
+        else:
+            print(f"Knee at {knee['knee_rps']} rps ({knee['reason']}); "
+                  f"max sustainable {knee['max_sustainable_rps']} rps")
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop constant-arrival-rate load test")
+    parser.add_argument('--base-url', default=os.getenv('DEEPSEEK_BASE_URL', "https://integrate.api.nvidia.com/v1"))
+    parser.add_argument('--mock', action='store_true', help="Run against an in-process mock inference server")
+    parser.add_argument('--models', nargs='+', default=["deepseek-ai/deepseek-r1"])
+    parser.add_argument('--rates', type=float, nargs='+', default=[1, 2, 5, 10, 20, 50])
+    parser.add_argument('--step-duration', type=float, default=30.0, help="Seconds per rate step")
+    parser.add_argument('--max-in-flight', type=int, default=64)
+    parser.add_argument('--prompt', default="Explain the basics of cryptography")
+    parser.add_argument('--max-tokens', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='reports/load_test_report.json')
+    args = parser.parse_args()
+
+    mock_server = MockInferenceServer(MockServerConfig(seed=args.seed)).start() if args.mock else None
+    try:
+        report = run_load_test(
+            base_url=mock_server.base_url if mock_server else args.base_url,
+            api_key=os.getenv('NVIDIA_API_KEY') or 'mock',
+            models=args.models,
+            rates=args.rates,
+            step_duration=args.step_duration,
+            max_in_flight=args.max_in_flight,
+            prompt=args.prompt,
+            max_tokens=args.max_tokens,
+            seed=args.seed
+        )
+    finally:
+        if mock_server:
+            mock_server.stop()
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nLoad test report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
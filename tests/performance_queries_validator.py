@@ -0,0 +1,142 @@
+import os
+import sys
+import sqlite3
+import pytest
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from performance_queries import PerformanceQueries
+
+MODELS = ('deepseek-r1', 'gpt-3.5-turbo', 'meta/llama-3')
+COLUMNS = ['avg_response_time', 'task_success_rate', 'error_rate']
+
+
+def create_performance_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE performance_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, model_name TEXT, total_queries INTEGER,
+            avg_response_time REAL, median_response_time REAL, avg_token_generation_rate REAL,
+            task_success_rate REAL, error_rate REAL, total_execution_time REAL
+        )
+    ''')
+    return conn
+
+
+def insert_runs(conn, count, seed=0):
+    """Runs in shuffled timestamp order, with some NULL error rates and one model with fewer runs"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in rng.permutation(count):
+        model = MODELS[i % 3] if i % 7 else MODELS[0]
+        error_rate = None if i % 5 == 0 else float(rng.uniform(0, 10))
+        rows.append(((datetime(2024, 1, 1) + timedelta(hours=int(i))).isoformat(), model,
+                     float(rng.lognormal(7, 0.5)), float(rng.integers(80, 101)), error_rate))
+    conn.executemany(
+        "INSERT INTO performance_metrics (timestamp, model_name, avg_response_time, task_success_rate, error_rate) "
+        "VALUES (?, ?, ?, ?, ?)", rows
+    )
+    conn.commit()
+
+
+def nearest_rank(values, percentile):
+    return float(np.quantile(values.dropna().to_numpy(), percentile / 100, method='inverted_cdf'))
+
+
+class TestPerformanceQueries:
+    def setup_method(self):
+        """Each test queries its own database"""
+        self.conn = None
+        self.queries = None
+
+    def teardown_method(self):
+        if self.queries is not None:
+            self.queries.close()
+        if self.conn is not None:
+            self.conn.close()
+
+    def open_fixture(self, tmp_path, count=61):
+        path = str(tmp_path / 'performance.db')
+        self.conn = create_performance_db(path)
+        insert_runs(self.conn, count)
+        self.queries = PerformanceQueries(path)
+        return pd.read_sql_query("SELECT * FROM performance_metrics", self.conn)
+
+    def test_latest_metrics_per_model(self, tmp_path):
+        """The latest row of each model is its newest by timestamp, not by insertion order"""
+        df = self.open_fixture(tmp_path)
+        expected = df.sort_values(['timestamp', 'id']).groupby('model_name').tail(1).set_index('model_name')
+
+        latest = self.queries.latest_metrics_per_model()
+        assert sorted(latest) == sorted(MODELS)
+        for model, row in latest.items():
+            assert row['id'] == expected.loc[model, 'id']
+            assert row['timestamp'] == expected.loc[model, 'timestamp']
+        assert list(self.queries.latest_metrics_per_model(['meta/llama-3'])) == ['meta/llama-3']
+
+    @pytest.mark.parametrize('last_n', [None, 4])
+    def test_mean_metrics_per_model(self, tmp_path, last_n):
+        """Means and run counts match pandas, over all runs or the newest last_n of each model"""
+        df = self.open_fixture(tmp_path)
+        if last_n is not None:
+            df = df.sort_values(['timestamp', 'id']).groupby('model_name').tail(last_n)
+        grouped = df.groupby('model_name')
+
+        actual = self.queries.mean_metrics_per_model(COLUMNS, last_n=last_n)
+        assert actual['run_count'].to_dict() == grouped.size().to_dict()
+        pd.testing.assert_frame_equal(actual[COLUMNS], grouped[COLUMNS].mean(), check_names=False)
+
+    @pytest.mark.parametrize('percentile', [1, 50, 90, 95, 100])
+    def test_percentile_metrics_per_model(self, tmp_path, percentile):
+        """Percentiles are nearest-rank values per model, ignoring NULLs"""
+        df = self.open_fixture(tmp_path)
+
+        actual = self.queries.percentile_metrics_per_model(COLUMNS, percentile)
+        for model, rows in df.groupby('model_name'):
+            for column in COLUMNS:
+                assert actual.loc[model, column] == nearest_rank(rows[column], percentile)
+
+        last = self.queries.percentile_metrics_per_model(['avg_response_time'], percentile, last_n=5)
+        newest = df.sort_values(['timestamp', 'id']).groupby('model_name').tail(5)
+        for model, rows in newest.groupby('model_name'):
+            assert last.loc[model, 'avg_response_time'] == nearest_rank(rows['avg_response_time'], percentile)
+
+    def test_overall_aggregates(self, tmp_path):
+        """Overall mean and percentile span every model and run"""
+        df = self.open_fixture(tmp_path)
+        assert self.queries.overall_mean('error_rate') == pytest.approx(df['error_rate'].mean())
+        assert self.queries.overall_percentile('avg_response_time', 95) == \
+            nearest_rank(df['avg_response_time'], 95)
+        with pytest.raises(ValueError):
+            self.queries.overall_mean('id; DROP TABLE performance_metrics')
+
+    def test_watermark_and_rows_after(self, tmp_path):
+        """The watermark moves when another connection appends rows, which rows_after returns in id order"""
+        self.open_fixture(tmp_path, count=10)
+        data_version, max_id = self.queries.watermark()
+        assert max_id == 10
+        insert_runs(self.conn, 3, seed=1)
+
+        new_version, new_max_id = self.queries.watermark()
+        assert new_version != data_version and new_max_id == 13
+        assert [row['id'] for row in self.queries.rows_after(max_id)] == [11, 12, 13]
+
+    def test_index_created_once_table_appears(self, tmp_path):
+        """A query layer opened before the table exists adds the index on its first query after"""
+        path = str(tmp_path / 'performance.db')
+        self.queries = PerformanceQueries(path)
+        self.queries.conn
+        self.conn = create_performance_db(path)
+        insert_runs(self.conn, 6)
+
+        assert self.queries.list_models() == sorted(MODELS)
+        indexes = [row[0] for row in self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'performance_metrics'"
+        )]
+        assert 'idx_performance_metrics_model_timestamp' in indexes
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
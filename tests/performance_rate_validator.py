@@ -1,44 +1,63 @@
 import os
+import sys
 import time
 import statistics
 import pytest
 import concurrent.futures
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import RateLimitError
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from client_registry import get_client
+from load_generator import OpenLoopLoadGenerator
+from rate_limiter import AdaptiveRateLimiter, get_rate_limiter
+from token_accounting import count_tokens, response_usage
 
 # Load environment variables
 load_dotenv()
 
 class TestDeepSeekPerformanceAndRateLimiting:
     def setup_method(self):
-        """Initialize OpenAI client with NVIDIA endpoint"""
-        self.client = OpenAI(
-            base_url="https://integrate.api.nvidia.com/v1",
-            api_key=os.getenv('NVIDIA_API_KEY')
+        """Reuse the shared OpenAI client for the NVIDIA endpoint"""
+        self.client = get_client(
+            'deepseek',
+            api_key=os.getenv('NVIDIA_API_KEY'),
+            base_url=os.getenv('DEEPSEEK_BASE_URL', "https://integrate.api.nvidia.com/v1")
         )
+        # Paces requests against the key's budget and backs off on 429s
+        self.rate_limiter = get_rate_limiter('deepseek', os.getenv('NVIDIA_API_KEY'))
         
         # Performance thresholds
         self.PERFORMANCE_THRESHOLDS = {
             'max_response_time_ms': 5000,  # 5 seconds
             'avg_response_time_ms': 2000,  # 2 seconds
             'max_tokens_per_second': 100,
-            'concurrent_requests': 10
+            'concurrent_requests': 10,
+            'open_loop_rps': 2,
+            'open_loop_duration_s': 15,
+            'max_error_rate': 0.05
         }
     
     def generate_response(self, prompt):
         """Generate response and measure performance"""
-        start_time = time.time()
-        response = self.client.chat.completions.create(
-            model="deepseek-ai/deepseek-r1",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=200
-        )
-        end_time = time.time()
+        messages = [{"role": "user", "content": prompt}]
+        with self.rate_limiter.request(estimated_tokens=count_tokens(prompt, "deepseek-ai/deepseek-r1") + 200) as permit:
+            # Timed after admission so limiter pacing is not counted as API latency
+            start_time = time.time()
+            response = self.client.chat.completions.create(
+                model="deepseek-ai/deepseek-r1",
+                messages=messages,
+                max_tokens=200
+            )
+            end_time = time.time()
+            # Provider usage when reported, otherwise counted with the model's tokenizer
+            usage = response_usage(response, "deepseek-ai/deepseek-r1", messages)
+            permit.record((usage.input_tokens or 0) + usage.output_tokens)
         
         return {
             'response': response,
             'response_time_ms': (end_time - start_time) * 1000,
-            'token_count': len(response.choices[0].message.content.split())
+            'token_count': usage.output_tokens
         }
     
     def test_individual_response_performance(self):
@@ -101,15 +120,18 @@ class TestDeepSeekPerformanceAndRateLimiting:
         # Rapid successive requests to test rate limiting
         excessive_requests = 50
         response_times = []
+        rate_limited = 0
         
         for _ in range(excessive_requests):
             try:
                 result = self.generate_response("Short test prompt")
                 response_times.append(result['response_time_ms'])
-                time.sleep(0.1)  # Small delay between requests
-            except Exception as e:
-                # Check for rate limit specific exceptions
-                assert "rate limit" in str(e).lower(), "Unexpected error during rate limit test"
+            except RateLimitError:
+                # The limiter has recorded the 429 and holds further requests for its Retry-After
+                rate_limited += 1
+        
+        assert rate_limited <= excessive_requests * self.PERFORMANCE_THRESHOLDS['max_error_rate'], \
+            f"Rate limiter let {rate_limited} of {excessive_requests} requests hit 429"
         
         # Validate response times don't degrade significantly
         if response_times:
@@ -117,6 +139,33 @@ class TestDeepSeekPerformanceAndRateLimiting:
             assert max_rate_limited_time < self.PERFORMANCE_THRESHOLDS['max_response_time_ms'] * 1.5, \
                 "Response times degraded significantly under load"
     
+    def test_open_loop_latency_under_load(self):
+        """Test latency under constant Poisson arrivals, free of coordinated omission"""
+        # The shared limiter's 40 rpm budget is below the offered load and would be measured as queueing;
+        # this test gets its own limiter with twice the offered rate and a slot for every in-flight request
+        self.rate_limiter = AdaptiveRateLimiter(
+            requests_per_minute=self.PERFORMANCE_THRESHOLDS['open_loop_rps'] * 60 * 2,
+            initial_concurrency=self.PERFORMANCE_THRESHOLDS['concurrent_requests'],
+            min_concurrency=self.PERFORMANCE_THRESHOLDS['concurrent_requests']
+        )
+        generator = OpenLoopLoadGenerator(
+            lambda: self.generate_response("Short test prompt"),
+            max_in_flight=self.PERFORMANCE_THRESHOLDS['concurrent_requests'],
+            seed=0
+        )
+        step = generator.run_step(
+            rate_rps=self.PERFORMANCE_THRESHOLDS['open_loop_rps'],
+            duration_s=self.PERFORMANCE_THRESHOLDS['open_loop_duration_s']
+        )
+        
+        assert step.error_rate <= self.PERFORMANCE_THRESHOLDS['max_error_rate'], \
+            f"Error rate under load too high: {step.error_rate:.1%} ({step.error_classes})"
+        
+        # Measured from each request's scheduled send time, so queueing is included
+        p99_latency = step.latency.percentile(99)
+        assert p99_latency < self.PERFORMANCE_THRESHOLDS['max_response_time_ms'] * 1.5, \
+            f"p99 latency under {step.target_rps} rps open-loop load too high: {p99_latency} ms"
+    
     def test_token_generation_rate(self):
         """Validate token generation rate"""
         prompt = "Generate a detailed explanation of a complex topic"
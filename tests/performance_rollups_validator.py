@@ -0,0 +1,144 @@
+import os
+import sys
+import sqlite3
+import threading
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from performance_queries import PerformanceQueries
+from performance_rollups import PerformanceRollups
+
+
+def create_performance_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE performance_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, model_name TEXT, total_queries INTEGER,
+            avg_response_time REAL, median_response_time REAL, avg_token_generation_rate REAL,
+            task_success_rate REAL, error_rate REAL, total_execution_time REAL
+        )
+    ''')
+    return conn
+
+
+def insert_runs(conn, start, count, seed=0):
+    rng = np.random.default_rng(seed)
+    conn.executemany(
+        "INSERT INTO performance_metrics (timestamp, model_name, avg_response_time, task_success_rate, error_rate) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [
+            ((datetime(2024, 1, 1) + timedelta(minutes=17 * (start + i))).isoformat(),
+             ('deepseek-r1', 'gpt-3.5-turbo', 'claude-2')[i % 3],
+             float(rng.lognormal(7, 0.4)), float(rng.uniform(80, 100)), float(rng.uniform(0, 5)))
+            for i in range(count)
+        ]
+    )
+
+
+class TestPerformanceRollups:
+    def setup_method(self):
+        """Each test opens its own performance database"""
+        self.conn = None
+
+    def teardown_method(self):
+        if self.conn is not None:
+            self.conn.close()
+
+    def test_rollups_match_raw_aggregates(self, tmp_path):
+        """All-time rollup means equal SQL averages over the raw table"""
+        path = str(tmp_path / 'performance.db')
+        self.conn = create_performance_db(path)
+        insert_runs(self.conn, 0, 3000)
+        self.conn.commit()
+
+        rollups = PerformanceRollups(path)
+        assert rollups.backfill() == 3000
+        columns = ['avg_response_time', 'task_success_rate', 'error_rate']
+        expected = PerformanceQueries(path).mean_metrics_per_model(columns)
+        actual = rollups.mean_metrics_per_model(columns)
+
+        assert list(actual.index) == list(expected.index)
+        assert np.allclose(actual[columns].to_numpy(), expected[columns].to_numpy())
+        assert (actual['run_count'] == expected['run_count']).all()
+
+        raw = PerformanceQueries(path)
+        assert rollups.overall_mean('task_success_rate') == pytest.approx(raw.overall_mean('task_success_rate'))
+        assert rollups.overall_percentile('avg_response_time', 50) == pytest.approx(
+            raw.overall_percentile('avg_response_time', 50), rel=0.02
+        )
+
+    def test_incremental_update_in_insert_transaction(self, tmp_path):
+        """Updating with the inserting connection folds in exactly the new rows"""
+        path = str(tmp_path / 'performance.db')
+        self.conn = create_performance_db(path)
+        rollups = PerformanceRollups(path)
+
+        insert_runs(self.conn, 0, 300, seed=1)
+        assert rollups.update(self.conn) == 300
+        self.conn.commit()
+        insert_runs(self.conn, 300, 30, seed=2)
+        assert rollups.update(self.conn) == 30
+        self.conn.commit()
+        assert rollups.update() == 0
+
+        incremental = rollups.mean_metrics_per_model(['avg_response_time'])
+        rollups.backfill()
+        assert np.allclose(incremental.to_numpy(), rollups.mean_metrics_per_model(['avg_response_time']).to_numpy())
+
+    def test_concurrent_updaters_fold_rows_once(self, tmp_path):
+        """Updaters on separate connections never fold the same rows twice"""
+        path = str(tmp_path / 'performance.db')
+        self.conn = create_performance_db(path)
+        PerformanceRollups(path).update()
+        updaters = [PerformanceRollups(path) for _ in range(3)]
+        folded = []
+        errors = []
+
+        for round_index in range(3):
+            insert_runs(self.conn, round_index * 5000, 5000, seed=round_index)
+            self.conn.commit()
+            barrier = threading.Barrier(len(updaters))
+
+            def update(rollups):
+                barrier.wait()
+                try:
+                    folded.append(rollups.update())
+                except sqlite3.Error as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=update, args=(rollups,)) for rollups in updaters]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert not errors
+        assert sum(folded) == 15000
+        total = self.conn.execute(
+            "SELECT SUM(count) FROM performance_rollup_total WHERE metric = 'avg_response_time'"
+        ).fetchone()[0]
+        assert total == 15000
+        for rollups in updaters:
+            rollups.close()
+
+    def test_bucket_counts(self, tmp_path):
+        """Hourly and daily buckets partition the runs"""
+        path = str(tmp_path / 'performance.db')
+        self.conn = create_performance_db(path)
+        insert_runs(self.conn, 0, 500)
+        self.conn.commit()
+
+        rollups = PerformanceRollups(path)
+        rollups.update()
+        hourly = rollups.series('avg_response_time', 'hourly')
+        daily = rollups.series('avg_response_time', 'daily')
+
+        assert hourly['count'].sum() == daily['count'].sum() == 500
+        assert daily.groupby('model_name').size().max() == 6
+        assert (hourly['min'] <= hourly['mean']).all() and (hourly['mean'] <= hourly['max']).all()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
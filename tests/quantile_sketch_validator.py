@@ -0,0 +1,154 @@
+import os
+import sys
+import time
+import sqlite3
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from quantile_sketch import DDSketch, LatencySketchStore
+
+
+def latencies(count, seed=0):
+    """Long-tailed latencies in milliseconds, like real endpoint response times"""
+    return np.random.default_rng(seed).lognormal(mean=7, sigma=0.8, size=count)
+
+
+class TestDDSketch:
+    @pytest.mark.parametrize('relative_accuracy', [0.01, 0.05])
+    def test_quantiles_within_relative_accuracy(self, relative_accuracy):
+        """Every estimate is within the configured relative error of the exact quantile"""
+        values = latencies(20000)
+        sketch = DDSketch(relative_accuracy)
+        sketch.add_many(values)
+
+        for q in (0.01, 0.25, 0.5, 0.9, 0.95, 0.99, 0.999):
+            exact = np.quantile(values, q, method='lower')
+            assert abs(sketch.quantile(q) - exact) <= relative_accuracy * exact * 1.0001
+        assert sketch.count == len(values)
+        assert sketch.mean == pytest.approx(values.mean())
+
+    def test_merge_matches_single_sketch(self):
+        """Merging partial sketches gives the same sketch as adding every value to one"""
+        values = latencies(5000, seed=1)
+        whole = DDSketch()
+        whole.add_many(values)
+
+        merged = DDSketch()
+        for part in np.array_split(values, 7):
+            partial = DDSketch()
+            for value in part:
+                partial.add(value)
+            merged.merge(partial)
+
+        assert merged.bins.keys() == whole.bins.keys()
+        assert all(merged.bins[index] == pytest.approx(whole.bins[index]) for index in whole.bins)
+        for q in (0.5, 0.95, 0.99):
+            assert merged.quantile(q) == whole.quantile(q)
+        with pytest.raises(ValueError):
+            merged.merge(DDSketch(0.05))
+
+    def test_json_round_trip(self):
+        """Serialized sketches restore bins, counts and extremes"""
+        sketch = DDSketch()
+        sketch.add_many(np.append(latencies(100), 0.0))
+        restored = DDSketch.from_json(sketch.to_json())
+        assert restored.bins == sketch.bins
+        assert (restored.count, restored.zero_count, restored.min, restored.max) == \
+            (sketch.count, sketch.zero_count, sketch.min, sketch.max)
+
+
+class TestLatencySketchStore:
+    def setup_method(self):
+        """Each test opens stores on its own database"""
+        self.stores = []
+
+    def teardown_method(self):
+        for store in self.stores:
+            store.close()
+
+    def make_store(self, db_path, **kwargs):
+        store = LatencySketchStore(str(db_path), persist_interval=3600, **kwargs)
+        self.stores.append(store)
+        return store
+
+    def test_processes_sharing_a_source_add_up(self, tmp_path):
+        """Two writers under the same source merge their observations instead of overwriting them"""
+        db_path = tmp_path / 'performance.db'
+        first, second = self.make_store(db_path), self.make_store(db_path)
+        for value in latencies(300, seed=2):
+            first.record('model', value)
+        first.persist()
+        for value in latencies(200, seed=3):
+            second.record('model', value)
+        second.persist()
+        # A reload keeps this source's persisted rows and does not double count pending ones
+        first.reload()
+        second.reload()
+
+        reader = self.make_store(db_path, source='dashboard')
+        for store in (first, second, reader):
+            assert store.merged_sketch('model').count == pytest.approx(500, rel=1e-3)
+
+    def test_old_observations_decay(self, tmp_path):
+        """Sketches persisted two half-lives ago weigh a quarter of fresh observations"""
+        db_path = tmp_path / 'performance.db'
+        old = self.make_store(db_path, source='benchmark', half_life=3600.0)
+        for _ in range(400):
+            old.record('model', 5000.0)
+        old.close()
+        two_half_lives_ago = (datetime.now() - timedelta(hours=2)).isoformat()
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("UPDATE latency_sketches SET updated_at = ?", (two_half_lives_ago,))
+
+        store = self.make_store(db_path, half_life=3600.0)
+        assert store.merged_sketch('model').count == pytest.approx(100, rel=1e-3)
+        for _ in range(300):
+            store.record('model', 200.0)
+        # 300 fresh fast requests outweigh the decayed slow ones, so the median follows recent latency
+        assert store.quantile('model', 50) == pytest.approx(200.0, rel=0.01)
+
+        all_time = self.make_store(db_path, source='all-time', half_life=None)
+        assert all_time.merged_sketch('model').count == pytest.approx(400, rel=1e-3)
+
+    def test_reader_picks_up_other_writers_after_refresh_interval(self, tmp_path):
+        """Cached quantiles are dropped once the refresh interval passes, so a read-only store sees new data"""
+        db_path = tmp_path / 'performance.db'
+        writer = self.make_store(db_path, source='benchmark-1')
+        fast = DDSketch()
+        fast.add_many([100.0] * 200)
+        writer.replace_source('benchmark-1', {('model', 'response_time'): fast})
+
+        reader = self.make_store(db_path, source='router', refresh_interval=0.1)
+        assert reader.quantile('model', 50) == pytest.approx(100.0, rel=0.01)
+
+        slow = DDSketch()
+        slow.add_many([5000.0] * 200)
+        writer.replace_source('benchmark-1', {('model', 'response_time'): slow})
+        assert reader.quantile('model', 50) == pytest.approx(100.0, rel=0.01)
+        time.sleep(0.15)
+        assert reader.quantile('model', 50) == pytest.approx(5000.0, rel=0.01)
+
+    def test_decayed_sources_are_pruned(self, tmp_path):
+        """Rows decayed to a negligible count are deleted instead of being reloaded forever"""
+        db_path = tmp_path / 'performance.db'
+        writer = self.make_store(db_path, source='benchmark-new', half_life=3600.0)
+        for run in ('benchmark-old', 'benchmark-new'):
+            sketch = DDSketch()
+            sketch.add_many(latencies(500))
+            writer.replace_source(run, {('model', 'response_time'): sketch})
+        # Twenty half-lives take 500 samples far below one
+        long_ago = (datetime.now() - timedelta(hours=20)).isoformat()
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("UPDATE latency_sketches SET updated_at = ? WHERE source = 'benchmark-old'", (long_ago,))
+
+        store = self.make_store(db_path, half_life=3600.0)
+        assert store.merged_sketch('model').count == pytest.approx(500, rel=1e-3)
+        with sqlite3.connect(db_path) as conn:
+            sources = [row[0] for row in conn.execute("SELECT source FROM latency_sketches")]
+        assert sources == ['benchmark-new']
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,116 @@
+import os
+import sys
+import pytest
+from openai import OpenAI
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from rate_limiter import AdaptiveRateLimiter, get_rate_limiter
+from mock_inference_server import MockInferenceServer, MockServerConfig
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRateLimitError(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__("rate limited")
+        self.status_code = 429
+        headers = {} if retry_after is None else {'retry-after': str(retry_after)}
+        self.response = type('Response', (), {'status_code': 429, 'headers': headers})()
+
+
+class TestAdaptiveRateLimiter:
+    def setup_method(self):
+        """Limiter on a manually advanced clock"""
+        self.clock = FakeClock()
+
+    def test_requests_per_minute_pacing(self):
+        """The request bucket admits its burst, then one request per refill interval"""
+        limiter = AdaptiveRateLimiter(requests_per_minute=60, burst_seconds=2, max_concurrency=100, clock=self.clock)
+
+        admitted = [limiter.try_acquire() for _ in range(3)]
+        assert admitted[0] and admitted[1] and admitted[2] is None
+
+        self.clock.now = 1.0
+        assert limiter.try_acquire() is not None
+        assert limiter.try_acquire() is None
+
+    def test_token_budget_is_settled_from_usage(self):
+        """Unused estimated tokens are returned to the bucket"""
+        limiter = AdaptiveRateLimiter(tokens_per_minute=600, burst_seconds=10, clock=self.clock)
+
+        with limiter.try_acquire(estimated_tokens=100) as permit:
+            permit.record(20)
+        assert limiter.token_bucket.level == pytest.approx(80)
+
+    def test_retry_after_pauses_admissions(self):
+        """A 429 blocks every caller until its Retry-After expires"""
+        limiter = AdaptiveRateLimiter(clock=self.clock)
+
+        with pytest.raises(FakeRateLimitError):
+            with limiter.try_acquire():
+                raise FakeRateLimitError(retry_after=2)
+
+        assert limiter.rate_limited_count == 1
+        assert limiter.try_acquire() is None
+        self.clock.now = 2.0
+        assert limiter.try_acquire() is not None
+
+    def test_aimd_concurrency(self):
+        """Successes grow the in-flight limit additively, a 429 halves it once per cooldown"""
+        limiter = AdaptiveRateLimiter(initial_concurrency=4, decrease_cooldown=1, clock=self.clock)
+        for _ in range(8):
+            limiter.release(limiter.try_acquire(), success=True)
+        assert 5.5 < limiter.concurrency_limit < 6.5
+
+        grown = limiter.concurrency_limit
+        for _ in range(2):
+            limiter.release(limiter.try_acquire(), success=False, rate_limited=True, retry_after=0)
+        assert limiter.concurrency_limit == pytest.approx(grown / 2)
+
+    def test_concurrency_limit_caps_in_flight(self):
+        """Requests beyond the in-flight limit wait for a release"""
+        limiter = AdaptiveRateLimiter(initial_concurrency=2, clock=self.clock)
+        first, second = limiter.try_acquire(), limiter.try_acquire()
+
+        assert limiter.try_acquire() is None
+        limiter.release(first, success=True)
+        assert limiter.try_acquire() is not None
+
+    def test_registry_shares_budget_per_key(self):
+        """Callers with the same provider and key share one limiter"""
+        assert get_rate_limiter('deepseek', 'key-a') is get_rate_limiter('deepseek', 'key-a')
+        assert get_rate_limiter('deepseek', 'key-a') is not get_rate_limiter('deepseek', 'key-b')
+
+
+class TestRateLimiterAgainstMockServer:
+    def test_call_retries_after_429(self):
+        """Injected 429s are retried after their Retry-After instead of failing"""
+        config = MockServerConfig(seed=5, ttft_median_ms=5, completion_tokens=5,
+                                  rate_limit_rate=0.5, retry_after_seconds=0.05)
+        with MockInferenceServer(config) as server:
+            client = OpenAI(base_url=server.base_url, api_key='mock', max_retries=0)
+            limiter = AdaptiveRateLimiter()
+
+            for i in range(10):
+                response = limiter.call(
+                    client.chat.completions.create,
+                    model="deepseek-ai/deepseek-r1",
+                    messages=[{"role": "user", "content": f"Prompt {i}"}],
+                    max_tokens=5,
+                    estimated_tokens=20,
+                    max_retries=10
+                )
+                assert response.choices[0].message.content
+
+        assert limiter.rate_limited_count > 0
+        assert limiter.stats()['in_flight'] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
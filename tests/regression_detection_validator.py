@@ -0,0 +1,79 @@
+import os
+import sys
+import pytest
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from request_samples import RequestSampleStore
+from regression_detection import bootstrap_relative_change, compare_runs, list_runs, mann_whitney_u
+
+pytest_plugins = ['pytester']
+
+
+def store_run(path, run_id, latency_scale, seed, timestamp, requests=60):
+    rng = np.random.default_rng(seed)
+    store = RequestSampleStore(path)
+    latencies = rng.lognormal(np.log(800 * latency_scale), 0.3, requests)
+    store.record_many([
+        {
+            'run_id': run_id, 'timestamp': timestamp, 'model_name': 'deepseek-r1', 'scenario': 'Code Generation',
+            'latency_ms': float(latency), 'ttft_ms': float(latency * 0.2), 'output_tokens': 200
+        }
+        for latency in latencies
+    ])
+    store.close()
+
+
+class TestRegressionDetection:
+    def test_mann_whitney_matches_scipy(self):
+        """U statistic and p-values agree with scipy's asymptotic test, ties included"""
+        stats = pytest.importorskip('scipy.stats')
+        rng = np.random.default_rng(3)
+        x = np.round(rng.normal(10, 2, 40))
+        y = np.round(rng.normal(11, 2, 55))
+        for alternative in ('two-sided', 'greater', 'less'):
+            u, p = mann_whitney_u(x, y, alternative)
+            expected = stats.mannwhitneyu(x, y, alternative=alternative, method='asymptotic')
+            assert u == pytest.approx(expected.statistic)
+            assert p == pytest.approx(expected.pvalue)
+
+    def test_bootstrap_interval_covers_shift(self):
+        """A 30% slowdown falls inside the interval, which excludes no change"""
+        rng = np.random.default_rng(4)
+        baseline = rng.lognormal(np.log(800), 0.2, 400)
+        change, low, high = bootstrap_relative_change(baseline, baseline * 1.3, rng=np.random.default_rng(0))
+        assert change == pytest.approx(0.3)
+        assert 0 < low <= 0.3 <= high
+
+    def test_detects_latency_regression(self, tmp_path):
+        """Slower latency and TTFT with equal tokens regress latency, TTFT and throughput"""
+        path = str(tmp_path / 'performance.db')
+        store_run(path, 'baseline', 1.0, seed=1, timestamp='2024-01-01T00:00:00')
+        store_run(path, 'steady', 1.0, seed=2, timestamp='2024-01-02T00:00:00')
+        store_run(path, 'slow', 1.5, seed=3, timestamp='2024-01-03T00:00:00')
+
+        assert list(list_runs(path)['run_id']) == ['baseline', 'steady', 'slow']
+        assert not any(c.regressed for c in compare_runs(path, ['baseline'], 'steady'))
+
+        regressed = {c.metric for c in compare_runs(path) if c.regressed}
+        assert regressed == {'latency_ms', 'ttft_ms', 'tokens_per_second'}
+        # Above the observed slowdown nothing counts as a regression
+        assert not any(c.regressed for c in compare_runs(path, threshold=1.0))
+
+    def test_pytest_gate(self, tmp_path, pytester):
+        """The plugin fails an otherwise passing session only on a regression"""
+        path = str(tmp_path / 'performance.db')
+        store_run(path, 'baseline', 1.0, seed=1, timestamp='2024-01-01T00:00:00')
+        store_run(path, 'slow', 1.5, seed=3, timestamp='2024-01-02T00:00:00')
+        pytester.makepyfile("def test_ok():\n    pass\n")
+
+        result = pytester.runpytest('-p', 'regression_gate', '--regression-db', path)
+        assert result.ret == pytest.ExitCode.TESTS_FAILED
+        result.stdout.fnmatch_lines(['*benchmark regressions*', '*significant regressions above 10%'])
+
+        result = pytester.runpytest('-p', 'regression_gate', '--regression-db', path, '--regression-threshold', '1.0')
+        assert result.ret == pytest.ExitCode.OK
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,96 @@
+import os
+import sys
+import sqlite3
+import threading
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from request_samples import RequestSampleStore
+
+
+class TestRequestSampleStore:
+    def setup_method(self):
+        """Each test opens its own store"""
+        self.store = None
+        self.blocker = None
+
+    def teardown_method(self):
+        if self.blocker is not None:
+            self.blocker.close()
+        if self.store is not None:
+            self.store.close()
+
+    def lock_database(self, path):
+        self.blocker = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.blocker.execute("BEGIN EXCLUSIVE")
+
+    def count_samples(self, path):
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM request_samples").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_samples_written_in_batches(self, tmp_path):
+        """Recorded samples are all stored and summarized per model"""
+        path = str(tmp_path / 'performance.db')
+        self.store = RequestSampleStore(path, batch_size=100)
+        for i in range(250):
+            self.store.record('run', 'model-a' if i % 2 else 'model-b', 'scenario', latency_ms=100 + i,
+                              output_tokens=10)
+        assert self.store.flush()
+
+        summary = self.store.run_summary('run')
+        assert summary['model-a']['requests'] + summary['model-b']['requests'] == 250
+        assert self.store.written_samples == 250
+
+    def test_busy_database_retried(self, tmp_path):
+        """A lock released within the retry budget delays the write instead of losing it"""
+        path = str(tmp_path / 'performance.db')
+        self.store = RequestSampleStore(path, busy_timeout=0.05, busy_retries=8, busy_backoff=0.05)
+        self.lock_database(path)
+        threading.Timer(0.3, lambda: self.blocker.execute("COMMIT")).start()
+
+        self.store.record_many([{'run_id': 'run', 'model_name': 'model', 'latency_ms': 10.0}] * 20)
+        assert self.store.flush()
+        assert self.store.failed_writes == 0
+        assert self.count_samples(path) == 20
+
+    def test_persistent_failure_keeps_samples(self, tmp_path):
+        """Samples that cannot be written are reported by flush and written once the lock clears"""
+        path = str(tmp_path / 'performance.db')
+        self.store = RequestSampleStore(path, busy_timeout=0.01, busy_retries=2, busy_backoff=0.01)
+        self.lock_database(path)
+
+        self.store.record_many([{'run_id': 'run', 'model_name': 'model', 'latency_ms': 10.0}] * 20)
+        assert not self.store.flush()
+        assert self.store.unwritten_samples == 20 and self.store.failed_writes >= 1
+
+        self.blocker.execute("COMMIT")
+        self.store.record('run', 'model', 'scenario', latency_ms=5.0)
+        assert self.store.flush()
+        assert self.store.unwritten_samples == 0
+        assert self.count_samples(path) == 21
+
+    def test_delete_batch_removes_only_that_batch(self, tmp_path):
+        """A corpus batch stored again replaces its samples and leaves other batches and runs alone"""
+        path = str(tmp_path / 'performance.db')
+        # A database from before samples carried a batch offset is migrated
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE request_samples (id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT, "
+                     "timestamp TEXT, model_name TEXT, scenario TEXT, ttft_ms REAL, latency_ms REAL, "
+                     "input_tokens INTEGER, output_tokens INTEGER, status TEXT, error_class TEXT)")
+        conn.close()
+        self.store = RequestSampleStore(path)
+        for run_id, batch_offset in (('run', 0), ('run', 120), ('other', 120)):
+            self.store.record_many([
+                {'run_id': run_id, 'model_name': 'model', 'latency_ms': 10.0, 'batch_offset': batch_offset}
+            ] * 3)
+
+        assert self.store.delete_batch('run', 120) == 3
+        assert self.store.run_summary('run')['model']['requests'] == 3
+        assert self.store.run_summary('other')['model']['requests'] == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
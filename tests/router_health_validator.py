@@ -0,0 +1,168 @@
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from adaptive_model_router import AdaptiveModelSelector
+from model_health import CircuitState, ModelHealthTracker
+
+
+class FakeClock:
+    """Manually advanced clock for driving circuit transitions offline"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class TestModelHealthTracker:
+    def setup_method(self):
+        """Create a tracker on a fake clock"""
+        self.clock = FakeClock()
+        self.tracker = ModelHealthTracker(
+            min_samples=3,
+            open_duration=10.0,
+            probe_success_threshold=2,
+            clock=self.clock
+        )
+
+    def inject_failures(self, model, count):
+        for _ in range(count):
+            self.tracker.record(model, success=False, latency_ms=5000)
+
+    def test_failures_open_circuit(self):
+        """Sustained errors trip the circuit and exclude the model"""
+        self.inject_failures('deepseek-r1', 5)
+
+        assert self.tracker.state('deepseek-r1') == CircuitState.OPEN
+        assert self.tracker.closed_models(['deepseek-r1', 'gpt-3.5-turbo']) == ['gpt-3.5-turbo']
+
+    def test_isolated_failure_keeps_circuit_closed(self):
+        """A single error among successes does not open the circuit"""
+        for _ in range(10):
+            self.tracker.record('deepseek-r1', success=True, latency_ms=800)
+        self.tracker.record('deepseek-r1', success=False, latency_ms=5000)
+
+        assert self.tracker.state('deepseek-r1') == CircuitState.CLOSED
+
+    def test_latency_threshold_opens_circuit(self):
+        """Slow but successful responses trip a latency-aware circuit"""
+        tracker = ModelHealthTracker(latency_threshold_ms=2000, min_samples=3, clock=self.clock)
+        for _ in range(5):
+            tracker.record('deepseek-r1', success=True, latency_ms=9000)
+
+        assert tracker.state('deepseek-r1') == CircuitState.OPEN
+
+    def test_half_open_after_open_duration(self):
+        """An open circuit allows a single probe once the open duration passes"""
+        self.inject_failures('deepseek-r1', 5)
+        assert self.tracker.acquire_probe(['deepseek-r1']) is None
+
+        self.clock.advance(10.0)
+        assert self.tracker.state('deepseek-r1') == CircuitState.HALF_OPEN
+        assert self.tracker.acquire_probe(['deepseek-r1']) == 'deepseek-r1'
+        assert self.tracker.acquire_probe(['deepseek-r1']) is None, "Only one probe may be in flight"
+
+    def test_failed_probe_reopens_circuit(self):
+        """A failing probe sends the circuit back to open"""
+        self.inject_failures('deepseek-r1', 5)
+        self.clock.advance(10.0)
+        self.tracker.acquire_probe(['deepseek-r1'])
+        self.tracker.record('deepseek-r1', success=False, latency_ms=5000)
+
+        assert self.tracker.state('deepseek-r1') == CircuitState.OPEN
+
+    def test_successful_probes_close_circuit(self):
+        """Enough successful probes bring the model back"""
+        self.inject_failures('deepseek-r1', 5)
+        self.clock.advance(10.0)
+        for _ in range(2):
+            assert self.tracker.acquire_probe(['deepseek-r1']) == 'deepseek-r1'
+            self.tracker.record('deepseek-r1', success=True, latency_ms=700)
+
+        assert self.tracker.state('deepseek-r1') == CircuitState.CLOSED
+        assert self.tracker.closed_models(['deepseek-r1']) == ['deepseek-r1']
+
+    def test_lost_probe_slot_is_released(self):
+        """A probe whose outcome never arrives does not block the model forever"""
+        self.inject_failures('deepseek-r1', 5)
+        self.clock.advance(10.0)
+        self.tracker.acquire_probe(['deepseek-r1'])
+
+        self.clock.advance(10.0)
+        assert self.tracker.acquire_probe(['deepseek-r1']) == 'deepseek-r1'
+
+
+class TestRouterCircuitBreaking:
+    def setup_method(self):
+        """Build a selector over a database where deepseek-r1 scores best"""
+        self.workdir = tempfile.mkdtemp()
+        db_path = os.path.join(self.workdir, 'model_performance.db')
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+        CREATE TABLE performance_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            model_name TEXT,
+            total_queries INTEGER,
+            avg_response_time REAL,
+            median_response_time REAL,
+            avg_token_generation_rate REAL,
+            task_success_rate REAL,
+            error_rate REAL,
+            total_execution_time REAL
+        )
+        ''')
+        for model, token_rate in [('gpt-3.5-turbo', 40), ('deepseek-r1', 90), ('claude-2', 60), ('palm-2', 20)]:
+            conn.execute('''
+            INSERT INTO performance_metrics (
+                timestamp, model_name, total_queries, avg_response_time, median_response_time,
+                avg_token_generation_rate, task_success_rate, error_rate, total_execution_time
+            ) VALUES ('2025-01-01T00:00:00', ?, 4, 1000, 1000, ?, 100, 0, 4)
+            ''', (model, token_rate))
+        conn.commit()
+        conn.close()
+
+        self.clock = FakeClock()
+        self.selector = AdaptiveModelSelector(
+            performance_db_path=db_path,
+            selection_log_file=os.path.join(self.workdir, 'model_selection.jsonl'),
+            health_tracker=ModelHealthTracker(min_samples=3, open_duration=10.0, clock=self.clock)
+        )
+
+    def teardown_method(self):
+        self.selector.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_open_circuit_is_routed_around(self):
+        """Injected endpoint failures move traffic off the best model and back"""
+        assert self.selector.select_optimal_model("Complex code generation", "high") == 'deepseek-r1'
+
+        for _ in range(5):
+            self.selector.record_outcome('deepseek-r1', latency=30000, success=False, tokens=0)
+
+        assert self.selector.select_optimal_model("Complex code generation", "high") == 'claude-2'
+        assert self.selector.select_optimal_models(
+            [{"description": "Complex code generation", "complexity": "high"}] * 3
+        ) == ['claude-2'] * 3
+
+        # After the open duration the next request probes the endpoint
+        self.clock.advance(10.0)
+        assert self.selector.select_optimal_model("Complex code generation", "high") == 'deepseek-r1'
+        self.selector.record_outcome('deepseek-r1', latency=800, success=True, tokens=200)
+        assert self.selector.select_optimal_model("Complex code generation", "high") == 'deepseek-r1'
+        self.selector.record_outcome('deepseek-r1', latency=800, success=True, tokens=200)
+
+        assert self.selector.health.state('deepseek-r1') == CircuitState.CLOSED
+        assert self.selector.select_optimal_model("Complex code generation", "high") == 'deepseek-r1'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,143 @@
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import pytest
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from adaptive_model_router import AdaptiveModelSelector
+from performance_snapshot import PerformanceSnapshot
+
+
+def create_performance_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute('''
+    CREATE TABLE performance_metrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT,
+        model_name TEXT,
+        total_queries INTEGER,
+        avg_response_time REAL,
+        median_response_time REAL,
+        avg_token_generation_rate REAL,
+        task_success_rate REAL,
+        error_rate REAL,
+        total_execution_time REAL
+    )
+    ''')
+    conn.executemany('''
+    INSERT INTO performance_metrics (
+        timestamp, model_name, total_queries, avg_response_time, median_response_time,
+        avg_token_generation_rate, task_success_rate, error_rate, total_execution_time
+    ) VALUES ('2025-01-01T00:00:00', ?, 4, ?, ?, ?, ?, ?, 4)
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+
+class TestRouterScoring:
+    def setup_method(self):
+        """Each test builds its selector over its own database"""
+        self.workdir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.workdir, 'model_performance.db')
+        self.selector = None
+
+    def teardown_method(self):
+        if self.selector is not None:
+            self.selector.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def make_selector(self, rows, **kwargs):
+        create_performance_db(self.db_path, rows)
+        self.selector = AdaptiveModelSelector(
+            performance_db_path=self.db_path,
+            selection_log_file=os.path.join(self.workdir, 'model_selection.jsonl'),
+            **kwargs
+        )
+        return self.selector
+
+    def test_single_and_batch_scoring_agree_on_degenerate_metrics(self):
+        """An all-failed model's zero latency and NULL metrics score the same in both paths"""
+        selector = self.make_selector([
+            ('gpt-3.5-turbo', 1200, 1100, 40, 95, 2),
+            ('deepseek-r1', 900, 850, 80, 98, 1),
+            # Every request failed: the benchmark stores a zero latency and no throughput
+            ('claude-2', 0, 0, 0, 0, 100),
+            ('palm-2', None, None, None, 90, None)
+        ])
+        metrics = selector.performance_snapshot.get_latest_metrics()
+        components = selector._model_component_matrix(metrics)
+        assert np.isfinite(components).all()
+
+        for complexity in ('low', 'high'):
+            batch_scores = components @ selector.SCORE_WEIGHTS * selector.task_complexity_weights[complexity]
+            single_scores = [selector._calculate_model_score(metrics.get(model, {}), complexity)
+                             for model in selector.models]
+            assert batch_scores.tolist() == single_scores
+
+        tasks = [{"description": "Complex code generation", "complexity": complexity}
+                 for complexity in ('low', 'medium', 'high', 'extreme')]
+        assert selector.select_optimal_models(tasks) == [
+            selector.select_optimal_model(task['description'], task['complexity']) for task in tasks
+        ] == ['deepseek-r1'] * 4
+
+    def test_score_percentile_routes_by_tail_latency(self):
+        """Percentile mode scores latency by the sketch percentile instead of the stored average"""
+        rows = [
+            ('gpt-3.5-turbo', 800, 700, 80, 98, 1),
+            ('deepseek-r1', 800, 700, 80, 98, 1)
+        ]
+        selector = self.make_selector(rows, score_percentile=95)
+        rng = np.random.default_rng(0)
+        # Same typical latency, but one model has a slow tail on one request in ten
+        for index in range(500):
+            selector.latency_sketches.record('gpt-3.5-turbo', 8000.0 if index % 10 == 0 else 600.0)
+            selector.latency_sketches.record('deepseek-r1', rng.uniform(600, 900))
+
+        assert selector.latency_sketches.quantile('gpt-3.5-turbo', 95) == pytest.approx(8000, rel=0.01)
+        assert selector.select_optimal_model("Summarize a report", 'medium') == 'deepseek-r1'
+        assert selector.select_optimal_models([{"description": "Summarize a report", "complexity": 'high'}]) == \
+            ['deepseek-r1']
+
+        # Without percentile mode the equal averages tie and the first model wins
+        selector.score_percentile = None
+        assert selector.select_optimal_model("Summarize a report", 'medium') == 'gpt-3.5-turbo'
+
+
+class TestPerformanceSnapshot:
+    def test_appended_rows_applied_incrementally(self, tmp_path):
+        """Rows committed by another connection are folded in without a full reload"""
+        path = str(tmp_path / 'model_performance.db')
+        create_performance_db(path, [('gpt-3.5-turbo', 800, 700, 80, 98, 1)])
+        snapshot = PerformanceSnapshot(path, check_interval=0)
+        snapshot.refresh()
+        full_reloads = []
+        latest_metrics_per_model = snapshot.queries.latest_metrics_per_model
+        snapshot.queries.latest_metrics_per_model = lambda: full_reloads.append(1) or latest_metrics_per_model()
+
+        conn = sqlite3.connect(path)
+        conn.execute("INSERT INTO performance_metrics (timestamp, model_name, avg_response_time) "
+                     "VALUES ('2025-01-02T00:00:00', 'deepseek-r1', 500)")
+        conn.execute("INSERT INTO performance_metrics (timestamp, model_name, avg_response_time) "
+                     "VALUES ('2025-01-02T00:00:00', 'gpt-3.5-turbo', 900)")
+        conn.commit()
+        latest = snapshot.get_latest_metrics()
+        assert {model: row['avg_response_time'] for model, row in latest.items()} == \
+            {'gpt-3.5-turbo': 900, 'deepseek-r1': 500}
+        assert full_reloads == []
+
+        # Deleting the newest row shrinks MAX(id), which forces a full reload
+        conn.execute("DELETE FROM performance_metrics WHERE id = (SELECT MAX(id) FROM performance_metrics)")
+        conn.commit()
+        conn.close()
+        latest = snapshot.get_latest_metrics()
+        assert {model: row['avg_response_time'] for model, row in latest.items()} == \
+            {'gpt-3.5-turbo': 800, 'deepseek-r1': 500}
+        assert full_reloads == [1]
+        snapshot.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
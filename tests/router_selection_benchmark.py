@@ -0,0 +1,130 @@
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+from typing import List, Dict
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from adaptive_model_router import AdaptiveModelSelector
+
+ROW_COUNTS = [1_000, 10_000, 100_000, 1_000_000]
+SELECTIONS_PER_RUN = 200
+LEGACY_SELECTIONS_PER_RUN = 5
+
+
+def populate_database(db_path: str, row_count: int, models: List[str]):
+    """Create a performance database with synthetic benchmark rows"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS performance_metrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT,
+        model_name TEXT,
+        total_queries INTEGER,
+        avg_response_time REAL,
+        median_response_time REAL,
+        avg_token_generation_rate REAL,
+        task_success_rate REAL,
+        error_rate REAL,
+        total_execution_time REAL
+    )
+    ''')
+    rng = np.random.default_rng(42)
+    start = datetime(2025, 1, 1)
+    rows = (
+        (
+            (start + timedelta(minutes=i)).isoformat(),
+            models[i % len(models)],
+            4,
+            float(rng.uniform(200, 3000)),
+            float(rng.uniform(200, 3000)),
+            float(rng.uniform(10, 100)),
+            float(rng.uniform(50, 100)),
+            float(rng.uniform(0, 20)),
+            float(rng.uniform(1, 30))
+        )
+        for i in range(row_count)
+    )
+    conn.executemany('''
+    INSERT INTO performance_metrics (
+        timestamp, model_name, total_queries, avg_response_time,
+        median_response_time, avg_token_generation_rate,
+        task_success_rate, error_rate, total_execution_time
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+
+def legacy_select(selector: AdaptiveModelSelector, task_complexity: str) -> str:
+    """Selection as done before the snapshot: full table load per decision"""
+    conn = sqlite3.connect(selector.performance_db_path)
+    historical_data = pd.read_sql_query("SELECT * FROM performance_metrics", conn)
+    conn.close()
+    model_scores = {}
+    for model in selector.models:
+        model_metrics = historical_data[historical_data['model_name'] == model].iloc[-1].to_dict()
+        model_scores[model] = selector._calculate_model_score(model_metrics, task_complexity)
+    return max(model_scores, key=model_scores.get)
+
+
+def time_calls(fn, iterations: int) -> List[float]:
+    """Return per-call latencies in milliseconds"""
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def run_benchmark() -> List[Dict[str, float]]:
+    """Measure per-selection latency of the legacy and snapshot paths"""
+    results = []
+    original_cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Selection logs are written relative to the working directory
+        os.chdir(workdir)
+        try:
+            for row_count in ROW_COUNTS:
+                db_path = os.path.join(workdir, f'performance_{row_count}.db')
+                selector = AdaptiveModelSelector(performance_db_path=db_path)
+                populate_database(db_path, row_count, selector.models)
+
+                legacy = time_calls(lambda: legacy_select(selector, 'medium'), LEGACY_SELECTIONS_PER_RUN)
+
+                # First call pays the one-off snapshot load
+                cold = time_calls(lambda: selector.select_optimal_model('benchmark task', 'medium'), 1)[0]
+                warm = time_calls(lambda: selector.select_optimal_model('benchmark task', 'medium'), SELECTIONS_PER_RUN)
+                selector.close()
+
+                results.append({
+                    'rows': row_count,
+                    'legacy_median_ms': statistics.median(legacy),
+                    'snapshot_cold_ms': cold,
+                    'snapshot_median_ms': statistics.median(warm),
+                    'snapshot_p99_ms': float(np.percentile(warm, 99))
+                })
+        finally:
+            os.chdir(original_cwd)
+
+    return results
+
+
+def main():
+    print(f"{'rows':>10} {'legacy p50 (ms)':>16} {'snapshot cold (ms)':>19} "
+          f"{'snapshot p50 (ms)':>18} {'snapshot p99 (ms)':>18}")
+    for result in run_benchmark():
+        print(f"{result['rows']:>10} {result['legacy_median_ms']:>16.3f} {result['snapshot_cold_ms']:>19.3f} "
+              f"{result['snapshot_median_ms']:>18.3f} {result['snapshot_p99_ms']:>18.3f}")
+
+
+if __name__ == "__main__":
+    main()
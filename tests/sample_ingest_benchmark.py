@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+from typing import List, Dict
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from request_samples import RequestSampleStore
+
+SAMPLE_COUNTS = [10_000, 100_000, 500_000]
+MODELS = ['gpt-3.5-turbo', 'deepseek-r1', 'claude-2', 'palm-2']
+SCENARIOS = ['Technical Documentation', 'Code Generation', 'Complex Reasoning']
+
+
+def commit_per_insert(db_path: str, count: int) -> float:
+    """Insert samples the way aggregates used to be logged: one INSERT and commit each"""
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS naive_samples (model_name TEXT, scenario TEXT, latency_ms REAL, status TEXT)"
+    )
+    start = time.perf_counter()
+    for i in range(count):
+        conn.execute(
+            "INSERT INTO naive_samples VALUES (?, ?, ?, ?)",
+            (MODELS[i % len(MODELS)], SCENARIOS[i % len(SCENARIOS)], 100.0 + i % 900, 'success')
+        )
+        conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+
+def run_benchmark() -> List[Dict[str, float]]:
+    """Measure end-to-end ingest throughput of RequestSampleStore"""
+    results = []
+    rng = np.random.default_rng(11)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for count in SAMPLE_COUNTS:
+            db_path = os.path.join(workdir, f'samples_{count}.db')
+            latencies = rng.lognormal(mean=7, sigma=0.5, size=count).tolist()
+            ttfts = rng.lognormal(mean=5, sigma=0.5, size=count).tolist()
+            store = RequestSampleStore(db_path)
+
+            start = time.perf_counter()
+            for i in range(count):
+                store.record(
+                    'ingest-run', MODELS[i % len(MODELS)], SCENARIOS[i % len(SCENARIOS)], latencies[i],
+                    ttft_ms=ttfts[i], input_tokens=40, output_tokens=300,
+                    status=RequestSampleStore.SUCCESS if i % 50 else RequestSampleStore.ERROR,
+                    error_class=None if i % 50 else 'APITimeoutError'
+                )
+            store.flush()
+            elapsed = time.perf_counter() - start
+
+            assert store.written_samples == count, "Samples were lost during ingest"
+            summary = store.run_summary('ingest-run')
+            assert sum(model['requests'] for model in summary.values()) == count
+            store.close()
+
+            results.append({
+                'samples': count,
+                'samples_per_second': count / elapsed
+            })
+
+        naive_count = 2_000
+        naive_time = commit_per_insert(os.path.join(workdir, 'naive.db'), naive_count)
+        results.append({
+            'samples': naive_count,
+            'samples_per_second': naive_count / naive_time,
+            'naive': True
+        })
+
+    return results
+
+
+def main():
+    print(f"{'mode':>18} {'samples':>9} {'samples/s':>12}")
+    for result in run_benchmark():
+        mode = 'commit per insert' if result.get('naive') else 'batched WAL'
+        print(f"{mode:>18} {result['samples']:>9} {result['samples_per_second']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import os
+import sys
+import gzip
+import json
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from mock_inference_server import MockInferenceServer, MockServerConfig
+from scenario_corpus import ScenarioCorpus, SweepCheckpoint
+
+
+def write_corpus(path, count, opener=open):
+    with opener(path, 'wt') as f:
+        for i in range(count):
+            f.write(json.dumps({'title': f"Prompt {i}", 'body': f"Explain topic {i}"}) + '\n')
+            if i == 2:
+                f.write('\n{"title": "no prompt"}\nnot json\n')
+
+
+class TestScenarioCorpus:
+    def test_streams_and_resumes_from_offset(self, tmp_path):
+        """Resuming from a recorded offset yields exactly the remaining scenarios"""
+        path = str(tmp_path / 'corpus.jsonl')
+        write_corpus(path, 10)
+        corpus = ScenarioCorpus(path, prompt_field='body', name_field='title')
+
+        entries = list(corpus.entries())
+        assert [entry.scenario['name'] for entry in entries] == [f"Prompt {i}" for i in range(10)]
+        assert entries[0].scenario['prompt'] == "Explain topic 0"
+
+        resumed = list(corpus.entries(entries[3].next_offset, start_index=4))
+        assert [entry.scenario for entry in resumed] == [entry.scenario for entry in entries[4:]]
+        assert [len(batch) for batch in corpus.batches(4)] == [4, 4, 2]
+
+    def test_gzip_corpus(self, tmp_path):
+        """Compressed corpora stream and resume like plain ones"""
+        path = str(tmp_path / 'corpus.jsonl.gz')
+        write_corpus(path, 6, opener=gzip.open)
+        corpus = ScenarioCorpus(path, prompt_field='body')
+        batches = list(corpus.batches(4))
+        assert [entry.scenario['prompt'] for entry in corpus.entries(batches[0][-1].next_offset)] == [
+            "Explain topic 4", "Explain topic 5"
+        ]
+
+    def test_checkpoint_belongs_to_corpus(self, tmp_path):
+        """A checkpoint is only resumed for the corpus it was written for"""
+        checkpoint = SweepCheckpoint(str(tmp_path / 'checkpoint.json'))
+        checkpoint.save('corpus.jsonl', {'offset': 42})
+        assert checkpoint.load('corpus.jsonl')['offset'] == 42
+        assert checkpoint.load('other.jsonl') is None
+        checkpoint.clear()
+        assert checkpoint.load('corpus.jsonl') is None
+
+    def test_interrupted_sweep_resumes_run(self, tmp_path, monkeypatch):
+        """A sweep interrupted after one batch finishes the same run without repeating it"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv('NVIDIA_API_KEY', 'mock')
+        from advanced_benchmarking import AdvancedModelBenchmark
+        write_corpus('corpus.jsonl', 7)
+        corpus = ScenarioCorpus('corpus.jsonl', prompt_field='body', name_field='title')
+
+        with MockInferenceServer(MockServerConfig(ttft_median_ms=5, tokens_per_second=5000,
+                                                  completion_tokens=20)) as server:
+            monkeypatch.setenv('DEEPSEEK_BASE_URL', server.base_url)
+            benchmark = AdvancedModelBenchmark([
+                {"name": "deepseek-r1", "type": "deepseek", "model": "deepseek-ai/deepseek-r1"}
+            ])
+            store_evaluations = benchmark._store_evaluations
+            stored_batches = []
+
+            def interrupt_second_batch(run_id, results_by_model, timestamp, **kwargs):
+                if stored_batches:
+                    raise KeyboardInterrupt
+                stored_batches.append(run_id)
+                store_evaluations(run_id, results_by_model, timestamp, **kwargs)
+
+            benchmark._store_evaluations = interrupt_second_batch
+            with pytest.raises(KeyboardInterrupt):
+                benchmark.run_corpus(corpus, batch_size=3)
+            assert SweepCheckpoint('reports/corpus_checkpoint.json').load('corpus.jsonl')['completed'] == 3
+
+            benchmark._store_evaluations = store_evaluations
+            metrics = benchmark.run_corpus(corpus, batch_size=3)
+            served = server.requests_served
+            benchmark.sample_store.close()
+
+        assert benchmark.last_run_id == stored_batches[0]
+        assert metrics[0].total_queries == 7
+        assert metrics[0].task_success_rate == 100
+        # The interrupted batch is evaluated again, the stored one is not
+        assert served == 10
+        assert not os.path.exists('reports/corpus_checkpoint.json')
+
+    def test_sweep_interrupted_after_storing_counts_batch_once(self, tmp_path, monkeypatch):
+        """A batch whose samples and sketches were stored before the checkpoint advanced is not counted twice"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv('NVIDIA_API_KEY', 'mock')
+        from advanced_benchmarking import AdvancedModelBenchmark
+        write_corpus('corpus.jsonl', 7)
+        corpus = ScenarioCorpus('corpus.jsonl', prompt_field='body', name_field='title')
+
+        with MockInferenceServer(MockServerConfig(ttft_median_ms=5, tokens_per_second=5000,
+                                                  completion_tokens=20)) as server:
+            monkeypatch.setenv('DEEPSEEK_BASE_URL', server.base_url)
+            benchmark = AdvancedModelBenchmark([
+                {"name": "deepseek-r1", "type": "deepseek", "model": "deepseek-ai/deepseek-r1"}
+            ])
+            store_run_sketches = benchmark._store_run_sketches
+            stored_batches = []
+
+            def interrupt_after_second_batch(run_id, sketches):
+                store_run_sketches(run_id, sketches)
+                stored_batches.append(run_id)
+                if len(stored_batches) == 2:
+                    # Everything of the batch is stored, but the checkpoint still points before it
+                    raise KeyboardInterrupt
+
+            benchmark._store_run_sketches = interrupt_after_second_batch
+            with pytest.raises(KeyboardInterrupt):
+                benchmark.run_corpus(corpus, batch_size=3)
+            assert benchmark.sample_store.run_summary(stored_batches[0])['deepseek-r1']['requests'] == 6
+
+            metrics = benchmark.run_corpus(corpus, batch_size=3)
+            served = server.requests_served
+            benchmark.sample_store.close()
+
+        assert served == 10
+        assert metrics[0].total_queries == 7
+        assert benchmark.latency_sketches.merged_sketch('deepseek-r1').count == pytest.approx(7, rel=1e-3)
+        assert benchmark.latency_sketches.merged_sketch('deepseek-r1', 'ttft').count == pytest.approx(7, rel=1e-3)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,178 @@
+import os
+import sys
+import json
+import time
+import threading
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from selection_log_sink import SelectionLogSink
+
+
+class GatedSelectionLogSink(SelectionLogSink):
+    """Sink whose writer thread stalls in each write until the gate opens"""
+
+    def __init__(self, *args, **kwargs):
+        self.writing = threading.Event()
+        self.gate = threading.Event()
+        super().__init__(*args, **kwargs)
+
+    def _write_batch(self, batch):
+        self.writing.set()
+        self.gate.wait()
+        super()._write_batch(batch)
+
+
+def read_log(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def wait_for_lines(path, count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        entries = read_log(path)
+        if len(entries) >= count:
+            return entries
+        time.sleep(0.01)
+    return read_log(path)
+
+
+class TestSelectionLogSink:
+    def setup_method(self):
+        """Each test opens its own sink"""
+        self.sink = None
+
+    def teardown_method(self):
+        if self.sink is not None:
+            if isinstance(self.sink, GatedSelectionLogSink):
+                self.sink.gate.set()
+            self.sink.close()
+
+    def test_full_batch_written_without_flush(self, tmp_path):
+        """Reaching batch_size writes the batch; the remainder waits for a flush"""
+        path = str(tmp_path / 'logs' / 'selection.jsonl')
+        self.sink = SelectionLogSink(path, batch_size=3, flush_interval=60.0)
+        for i in range(7):
+            assert self.sink.write({'i': i})
+
+        assert [entry['i'] for entry in wait_for_lines(path, 6)] == list(range(6))
+        assert self.sink.flush(timeout=5.0)
+        assert [entry['i'] for entry in read_log(path)] == list(range(7))
+
+    def test_partial_batch_written_after_interval(self, tmp_path):
+        """Entries below batch_size are written once flush_interval passes"""
+        path = str(tmp_path / 'selection.jsonl')
+        self.sink = SelectionLogSink(path, batch_size=100, flush_interval=0.05)
+        self.sink.write_many([{'i': 0}, {'i': 1}])
+
+        assert len(wait_for_lines(path, 2)) == 2
+
+    def test_drop_policy_discards_when_full(self, tmp_path):
+        """Under the drop policy a full queue rejects entries immediately and counts them"""
+        path = str(tmp_path / 'selection.jsonl')
+        self.sink = GatedSelectionLogSink(path, max_pending=2, batch_size=1)
+        self.sink.write({'i': 0})
+        assert self.sink.writing.wait(5.0)
+        assert self.sink.write({'i': 1}) and self.sink.write({'i': 2})
+
+        started = time.monotonic()
+        assert not self.sink.write_many([{'i': 3}, {'i': 4}])
+        assert time.monotonic() - started < 0.5
+        assert self.sink.dropped_entries == 2
+
+        self.sink.gate.set()
+        assert self.sink.flush(timeout=5.0)
+        assert [entry['i'] for entry in read_log(path)] == [0, 1, 2]
+
+    def test_block_policy_waits_for_room(self, tmp_path):
+        """Under the block policy a full queue holds the caller until room frees up or the timeout passes"""
+        path = str(tmp_path / 'selection.jsonl')
+        self.sink = GatedSelectionLogSink(path, max_pending=1, batch_size=1,
+                                          full_policy=SelectionLogSink.BLOCK, block_timeout=0.1)
+        self.sink.write({'i': 0})
+        assert self.sink.writing.wait(5.0)
+        assert self.sink.write({'i': 1})
+
+        started = time.monotonic()
+        assert not self.sink.write({'i': 2})
+        assert time.monotonic() - started >= 0.1
+        assert self.sink.dropped_entries == 1
+
+        self.sink.block_timeout = None
+        threading.Timer(0.1, self.sink.gate.set).start()
+        assert self.sink.write({'i': 3})
+        assert self.sink.flush(timeout=5.0)
+        assert [entry['i'] for entry in read_log(path)] == [0, 1, 3]
+
+    def test_close_flushes_pending_entries(self, tmp_path):
+        """Closing writes everything still queued and rejects later writes"""
+        path = str(tmp_path / 'selection.jsonl')
+        self.sink = SelectionLogSink(path, batch_size=100, flush_interval=60.0)
+        for i in range(5):
+            self.sink.write({'i': i})
+        self.sink.close()
+
+        assert [entry['i'] for entry in read_log(path)] == list(range(5))
+        assert self.sink.flush(timeout=1.0)
+        with pytest.raises(RuntimeError):
+            self.sink.write({'i': 5})
+
+    def test_failed_batch_keeps_writer_running(self, tmp_path):
+        """A batch that cannot be written is counted and later writes and flushes still complete"""
+        path = str(tmp_path / 'selection.jsonl')
+        self.sink = SelectionLogSink(path, batch_size=1, flush_interval=60.0)
+        # Not JSON serializable, so writing this batch raises on the writer thread
+        self.sink.write({'i': object()})
+        self.sink.write({'i': 1})
+
+        assert self.sink.flush(timeout=5.0)
+        assert [entry['i'] for entry in read_log(path)] == [1]
+        assert self.sink.failed_entries == 1
+        assert self.sink._thread.is_alive()
+
+    def test_disk_failure_counted_and_recovered(self, tmp_path):
+        """A batch the disk rejects counts as failed and the log directory is recreated for the next one"""
+        log_dir = tmp_path / 'logs'
+        path = str(log_dir / 'selection.jsonl')
+        self.sink = SelectionLogSink(path, batch_size=1, flush_interval=60.0)
+        self.sink.write({'i': 0})
+        assert self.sink.flush(timeout=5.0)
+
+        os.remove(path)
+        os.rmdir(log_dir)
+        # A file where the directory was makes the next write fail
+        log_dir.write_text('')
+        self.sink.write({'i': 1})
+        assert self.sink.flush(timeout=5.0)
+        assert self.sink.failed_entries == 1
+
+        os.remove(log_dir)
+        self.sink.write({'i': 2})
+        assert self.sink.flush(timeout=5.0)
+        assert [entry['i'] for entry in read_log(path)] == [2]
+
+    def test_concurrent_drops_all_counted(self, tmp_path):
+        """Entries dropped by many producers at once are all counted"""
+        path = str(tmp_path / 'selection.jsonl')
+        self.sink = GatedSelectionLogSink(path, max_pending=1, batch_size=1)
+        self.sink.write({'i': 0})
+        assert self.sink.writing.wait(5.0)
+        self.sink.write({'i': 1})
+
+        def produce():
+            for i in range(2000):
+                self.sink.write({'i': i})
+
+        producers = [threading.Thread(target=produce) for _ in range(8)]
+        for producer in producers:
+            producer.start()
+        for producer in producers:
+            producer.join()
+        assert self.sink.dropped_entries == 16000
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from model_benchmarking import MultiModelBenchmark
+from scenario_corpus import ScenarioCorpus, SweepCheckpoint
+
+
+class DeterministicBenchmark(MultiModelBenchmark):
+    """Responses derived from the prompt, so any process produces the same measurements"""
+
+    def evaluate_model(self, model_name, scenario):
+        seed = sum(map(ord, model_name + scenario['prompt']))
+        response_time = 100 + seed % 997 + (seed % 7) / 3
+        return {
+            "response_times": [response_time],
+            "ttfts": [response_time / (3 + seed % 5)],
+            "inter_chunk_gaps": [(seed * k) % 41 / 7 for k in range(1, 6)],
+            "output_tokens": seed % 300,
+            "generation_time": response_time / 1000,
+            "success_count": int(seed % 4 != 0),
+            "error_count": int(seed % 4 == 0),
+            "total_time": response_time / 997
+        }
+
+
+class TestShardedBenchmark:
+    def setup_method(self):
+        """Clients are constructed but never called"""
+        os.environ.setdefault('OPENAI_API_KEY', 'unused')
+        os.environ.setdefault('NVIDIA_API_KEY', 'unused')
+        self.models = ["deepseek-ai/deepseek-r1", "gpt-3.5-turbo"]
+        self.scenarios = [{"name": f"Scenario {i}", "prompt": f"Prompt number {i} " * (i % 5 + 1)} for i in range(157)]
+
+    def test_sharded_metrics_match_single_process(self):
+        """Merged shard accumulators give exactly the single-process metrics"""
+        benchmark = DeterministicBenchmark(self.models)
+        expected = benchmark.run_benchmark(self.scenarios)
+        actual = benchmark.run_benchmark_sharded(iter(self.scenarios), workers=3, shard_size=10)
+        assert actual == expected
+        assert actual[0].total_queries == len(self.scenarios)
+
+    def test_merge_model_results(self):
+        """Merging partial accumulators equals accumulating everything at once"""
+        benchmark = DeterministicBenchmark(self.models)
+        merged = {model: benchmark._empty_model_results() for model in self.models}
+        for start in range(0, len(self.scenarios), 40):
+            for model, partial in benchmark.evaluate_scenarios(self.scenarios[start:start + 40]).items():
+                benchmark.merge_model_results(merged[model], partial)
+        whole = benchmark.evaluate_scenarios(self.scenarios)
+        assert merged == whole
+
+    def write_corpus(self, path):
+        with open(path, 'w') as f:
+            for scenario in self.scenarios:
+                f.write(json.dumps(scenario) + '\n')
+        return ScenarioCorpus(path)
+
+    def test_interrupted_corpus_sweep_resumes(self, tmp_path):
+        """A corpus sweep interrupted mid-batch resumes from the checkpoint and matches an uninterrupted run"""
+        corpus = self.write_corpus(str(tmp_path / 'corpus.jsonl'))
+        checkpoint_path = str(tmp_path / 'checkpoint.json')
+        benchmark = DeterministicBenchmark(self.models)
+        expected = benchmark.run_benchmark(self.scenarios)
+
+        evaluate_scenarios = benchmark.evaluate_scenarios
+        evaluated = []
+
+        def interrupt_third_batch(scenarios):
+            if len(evaluated) == 2:
+                raise KeyboardInterrupt
+            evaluated.append(len(scenarios))
+            return evaluate_scenarios(scenarios)
+
+        benchmark.evaluate_scenarios = interrupt_third_batch
+        with pytest.raises(KeyboardInterrupt):
+            benchmark.run_corpus(corpus, checkpoint_path, batch_size=50)
+        assert SweepCheckpoint(checkpoint_path).load(corpus.path)['completed'] == 100
+
+        resumed = []
+        benchmark.evaluate_scenarios = lambda scenarios: resumed.append(len(scenarios)) or evaluate_scenarios(scenarios)
+        assert benchmark.run_corpus(corpus, checkpoint_path, batch_size=50) == expected
+        assert resumed == [50, 7]
+        assert not os.path.exists(checkpoint_path)
+
+    def test_sharded_corpus_sweep(self, tmp_path):
+        """Sharding corpus batches across processes gives the single-process metrics"""
+        corpus = self.write_corpus(str(tmp_path / 'corpus.jsonl'))
+        benchmark = DeterministicBenchmark(self.models)
+        expected = benchmark.run_benchmark(self.scenarios)
+        assert benchmark.run_corpus(corpus, str(tmp_path / 'checkpoint.json'), batch_size=60,
+                                    workers=2, shard_size=10) == expected
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
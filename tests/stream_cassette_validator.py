@@ -0,0 +1,70 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from client_registry import close_clients, get_client
+from mock_inference_server import MockInferenceServer, MockServerConfig
+from stream_cassette import CassetteClient, CassetteMissError, CassetteRecorder, load_cassette
+from stream_metrics import measure_openai_stream
+
+MESSAGES = [{"role": "user", "content": "Which number is larger, 9.11 or 9.8?"}]
+
+
+class TestStreamCassette:
+    def setup_method(self):
+        """Record one stream and one plain completion from a seeded mock server"""
+        self.server = MockInferenceServer(MockServerConfig(
+            seed=4, ttft_median_ms=80, tokens_per_second=100, tokens_per_second_std=0, completion_tokens=20
+        )).start()
+
+    def teardown_method(self):
+        close_clients()
+        self.server.stop()
+
+    def record(self, path):
+        recorder = CassetteRecorder(get_client('deepseek', api_key='mock', base_url=self.server.base_url), path)
+        recorded = measure_openai_stream(recorder, "deepseek-ai/deepseek-r1", MESSAGES, max_tokens=20)
+        response = recorder.chat.completions.create(model="deepseek-ai/deepseek-r1", messages=MESSAGES, max_tokens=5)
+        return recorded, response
+
+    def test_replay_is_identical_and_network_free(self, tmp_path):
+        """Replays return the recorded content and usage without touching the server"""
+        path = str(tmp_path / 'streams.jsonl.gz')
+        recorded, response = self.record(path)
+        served = self.server.requests_served
+
+        replay = CassetteClient(path, speed=None)
+        replayed = measure_openai_stream(replay, "deepseek-ai/deepseek-r1", MESSAGES, max_tokens=20)
+        replayed_response = replay.chat.completions.create(model="deepseek-ai/deepseek-r1", messages=MESSAGES, max_tokens=5)
+
+        assert self.server.requests_served == served
+        assert len(load_cassette(path)) == 2
+        assert replayed.content == recorded.content
+        assert replayed.output_tokens == recorded.output_tokens
+        assert replayed.chunk_count == recorded.chunk_count
+        assert replayed_response.choices[0].message.content == response.choices[0].message.content
+
+    @pytest.mark.parametrize("speed", [1.0, 4.0])
+    def test_replay_preserves_scaled_timing(self, tmp_path, speed):
+        """TTFT and stream duration follow the recording divided by the speed"""
+        path = str(tmp_path / 'streams.jsonl.gz')
+        recorded, _ = self.record(path)
+
+        replayed = measure_openai_stream(CassetteClient(path, speed=speed), "deepseek-ai/deepseek-r1",
+                                         MESSAGES, max_tokens=20)
+
+        assert replayed.ttft_ms == pytest.approx(recorded.ttft_ms / speed, abs=5)
+        assert replayed.total_time_ms == pytest.approx(recorded.total_time_ms / speed, abs=10)
+
+    def test_unrecorded_request_raises(self, tmp_path):
+        """Requests missing from the cassette fail instead of reaching the network"""
+        path = str(tmp_path / 'streams.jsonl.gz')
+        self.record(path)
+
+        with pytest.raises(CassetteMissError):
+            measure_openai_stream(CassetteClient(path), "deepseek-ai/deepseek-r1", MESSAGES, max_tokens=50)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
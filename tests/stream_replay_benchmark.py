@@ -0,0 +1,122 @@
+import io
+import os
+import sys
+import time
+import argparse
+import contextlib
+from typing import Any, Dict, List
+
+import numpy as np
+from dotenv import load_dotenv
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from deepseek_python_example import print_stream
+from client_registry import get_client
+from mock_inference_server import MockInferenceServer, MockServerConfig
+from stream_cassette import CassetteClient, CassetteRecorder
+from stream_metrics import measure_openai_stream
+
+# Load environment variables
+load_dotenv()
+
+PROMPTS = [
+    "Which number is larger, 9.11 or 9.8?",
+    "Explain the basics of cryptography",
+    "Write a Python function to reverse a linked list",
+    "Summarize the causes of the French Revolution",
+    "Describe how a hash map handles collisions"
+]
+
+
+def record(base_url: str, api_key: str, model: str, path: str, max_tokens: int):
+    """Record one streamed completion per prompt into a cassette"""
+    recorder = CassetteRecorder(get_client('deepseek', api_key=api_key, base_url=base_url), path)
+    for prompt in PROMPTS:
+        measure_openai_stream(recorder, model, [{"role": "user", "content": prompt}], max_tokens=max_tokens)
+    print(f"Recorded {recorder.recorded} streams to {path}")
+
+
+def replay_fidelity(path: str, speed: float) -> Dict[str, float]:
+    """Replay at a timing scale and compare TTFT and gaps with the recording"""
+    client = CassetteClient(path, speed=speed)
+    ttft_errors, gap_errors = [], []
+
+    for interaction in client.interactions:
+        request = interaction['request']
+        offsets = [offset for offset, chunk in interaction['chunks']
+                   if chunk.get('choices') and chunk['choices'][0].get('delta', {}).get('content')]
+        measurement = measure_openai_stream(client, request['model'], request['messages'],
+                                            max_tokens=request['max_tokens'])
+        ttft_errors.append(abs(measurement.ttft_ms - offsets[0] / speed))
+        gap_errors.extend(np.abs(np.array(measurement.inter_chunk_gaps_ms) - np.diff(offsets) / speed))
+
+    return {
+        'max_ttft_error_ms': float(max(ttft_errors)),
+        'p99_gap_error_ms': float(np.percentile(gap_errors, 99)) if gap_errors else 0.0
+    }
+
+
+def replay_throughput(path: str, repeats: int) -> List[Dict[str, Any]]:
+    """Replay at maximum speed through our own chunk handling code paths"""
+    client = CassetteClient(path, speed=None)
+    chunks_per_pass = sum(len(interaction['chunks']) for interaction in client.interactions)
+    results = []
+
+    def example_loop(request):
+        with contextlib.redirect_stdout(io.StringIO()):
+            print_stream(client.chat.completions.create(**request))
+
+    def stream_metrics(request):
+        measure_openai_stream(client, request['model'], request['messages'], max_tokens=request['max_tokens'])
+
+    for name, consume in (('deepseek_python_example', example_loop), ('measure_openai_stream', stream_metrics)):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for interaction in client.interactions:
+                consume(interaction['request'])
+        elapsed = time.perf_counter() - start
+        chunks = chunks_per_pass * repeats
+        results.append({
+            'code_path': name,
+            'chunks_per_second': chunks / elapsed,
+            'us_per_chunk': elapsed * 1e6 / chunks
+        })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic replay benchmark of streamed completions")
+    parser.add_argument('--cassette', default='reports/cassettes/deepseek_streams.jsonl.gz')
+    parser.add_argument('--record', action='store_true', help="Record a fresh cassette before replaying")
+    parser.add_argument('--mock', action='store_true', help="Record from an in-process mock inference server")
+    parser.add_argument('--base-url', default=os.getenv('DEEPSEEK_BASE_URL', "https://integrate.api.nvidia.com/v1"))
+    parser.add_argument('--model', default="deepseek-ai/deepseek-r1")
+    parser.add_argument('--max-tokens', type=int, default=200)
+    parser.add_argument('--speed', type=float, default=1.0, help="Timing scale of the fidelity replay")
+    parser.add_argument('--repeats', type=int, default=50, help="Passes over the cassette at maximum speed")
+    args = parser.parse_args()
+
+    if args.record or not os.path.exists(args.cassette):
+        if os.path.exists(args.cassette):
+            os.remove(args.cassette)
+        server = MockInferenceServer(MockServerConfig(seed=1)).start() if args.mock else None
+        try:
+            record(server.base_url if server else args.base_url, os.getenv('NVIDIA_API_KEY') or 'mock',
+                   args.model, args.cassette, args.max_tokens)
+        finally:
+            if server:
+                server.stop()
+
+    fidelity = replay_fidelity(args.cassette, args.speed)
+    print(f"Replay at {args.speed:g}x: max TTFT error {fidelity['max_ttft_error_ms']:.2f} ms, "
+          f"p99 gap error {fidelity['p99_gap_error_ms']:.2f} ms")
+
+    print(f"{'code path':>24} {'chunks/s':>11} {'us/chunk':>9}")
+    for result in replay_throughput(args.cassette, args.repeats):
+        print(f"{result['code_path']:>24} {result['chunks_per_second']:>11.0f} {result['us_per_chunk']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
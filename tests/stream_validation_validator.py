@@ -0,0 +1,114 @@
+import os
+import sys
+import random
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from client_registry import get_client
+from mock_inference_server import MockInferenceServer, MockServerConfig, VOCABULARY
+from stream_metrics import measure_openai_stream
+from stream_validation import MarkerScanner, StreamingValidator
+
+
+def chunked(text, rng):
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 7)
+        yield text[position:position + size]
+        position += size
+
+
+class TestStreamValidation:
+    def test_scanner_matches_substring_search(self):
+        """Matches found across random chunk boundaries equal a plain substring scan"""
+        rng = random.Random(5)
+        patterns = ['he', 'she', 'his', 'hers', 'ushers', 'Error Handling', 'r h', 'a']
+        for _ in range(200):
+            text = ''.join(rng.choice('ushersiaERROR handling ') for _ in range(rng.randint(0, 60)))
+            matcher = MarkerScanner(patterns)
+            found = set()
+            for chunk in chunked(text, rng):
+                found |= matcher.feed(chunk)
+            assert found == {index for index, pattern in enumerate(patterns) if pattern.lower() in text.lower()}
+
+        # A long marker fed a character at a time, after a short first chunk
+        matcher = MarkerScanner(['Error Handling'])
+        assert matcher.feed("## e") == set()
+        assert set().union(*(matcher.feed(char) for char in "rror handling")) == {0}
+        assert matcher.feed(" more text") == set()
+
+    def test_verdict_decided_early(self):
+        """Pass is decided on the last required marker, failure on a forbidden one"""
+        validator = StreamingValidator(required=['Overview', 'Endpoints'])
+        assert not validator.feed("## overv")
+        assert not validator.feed("iew\nSome text about endp")
+        assert validator.missing == ['Endpoints']
+        assert validator.feed("oints and more")
+        assert validator.passed
+
+        validator = StreamingValidator(required=['create_task'], forbidden=["I can't"])
+        assert not validator.feed("def create_task(): pass")
+        assert validator.feed(" ... I CAN'T help")
+        assert not validator.passed and validator.failed_on == "I can't"
+
+        validator = StreamingValidator.for_scenario({"languages": ["English", "Mandarin"]})
+        assert not validator.feed("anything")
+        assert validator.passed
+
+    def test_stream_cancelled_on_verdict(self):
+        """Closing the stream on the verdict stops generation early"""
+        config = MockServerConfig(seed=3, ttft_median_ms=5, tokens_per_second=400, completion_tokens=200)
+        messages = [{"role": "user", "content": "Describe a hash map"}]
+        with MockInferenceServer(config) as server:
+            client = get_client('deepseek', api_key='mock', base_url=server.base_url)
+            full = measure_openai_stream(client, 'deepseek-ai/deepseek-r1', messages, max_tokens=200)
+        marker = full.content.split()[20]
+        assert marker in VOCABULARY
+
+        # A fresh server with the same seed streams the same tokens for the first request
+        with MockInferenceServer(config) as server:
+            client = get_client('deepseek', api_key='mock', base_url=server.base_url)
+            validator = StreamingValidator(required=[marker])
+            cancelled = measure_openai_stream(client, 'deepseek-ai/deepseek-r1', messages, max_tokens=200,
+                                              on_chunk=validator.feed)
+
+        assert validator.passed and cancelled.cancelled and not full.cancelled
+        assert cancelled.chunk_count <= 21 < full.chunk_count
+        assert full.content.startswith(cancelled.content)
+        assert cancelled.total_time_ms < full.total_time_ms / 2
+
+    def test_cancelled_requests_reported_separately(self, monkeypatch):
+        """Streams cut short by their verdict stay out of the response time and rate averages"""
+        from model_benchmarking import MultiModelBenchmark
+        config = MockServerConfig(seed=3, ttft_median_ms=5, tokens_per_second=400, completion_tokens=200)
+        prompt = "Describe a hash map"
+        with MockInferenceServer(config) as server:
+            client = get_client('deepseek', api_key='mock', base_url=server.base_url)
+            full = measure_openai_stream(client, 'deepseek-ai/deepseek-r1', [{"role": "user", "content": prompt}],
+                                         max_tokens=500)
+        scenarios = [
+            {"name": "Decided early", "prompt": prompt, "expected_sections": [full.content.split()[20]]},
+            {"name": "Never decided", "prompt": "Describe a linked list", "expected_sections": ["no such marker"]}
+        ]
+
+        monkeypatch.setenv('NVIDIA_API_KEY', 'mock')
+        monkeypatch.setenv('OPENAI_API_KEY', 'mock')
+        with MockInferenceServer(config) as server:
+            monkeypatch.setenv('DEEPSEEK_BASE_URL', server.base_url)
+            benchmark = MultiModelBenchmark(['deepseek-ai/deepseek-r1'], cancel_on_verdict=True)
+            results = benchmark.evaluate_scenarios(scenarios)['deepseek-ai/deepseek-r1']
+        metrics = benchmark._metrics_from_results('deepseek-ai/deepseek-r1', results)
+
+        assert metrics.total_queries == 2 and metrics.task_success_rate == 50
+        assert metrics.cancelled_queries == 1
+        assert results['response_times'] == [metrics.avg_response_time]
+        assert 0 < metrics.avg_time_to_verdict < metrics.avg_response_time
+        # Only the completed stream's tokens and time make up the generation rate
+        assert metrics.avg_token_generation_rate == pytest.approx(
+            results['output_tokens'] / (metrics.avg_response_time / 1000)
+        )
+        assert results['output_tokens'] == config.completion_tokens
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
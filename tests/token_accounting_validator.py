@@ -0,0 +1,73 @@
+import os
+import sys
+from types import SimpleNamespace
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml_utils'))
+from client_registry import get_client
+from mock_inference_server import MockInferenceServer, MockServerConfig
+from stream_metrics import measure_openai_stream
+import token_accounting
+from token_accounting import approximate_token_count, count_tokens, get_encoder, response_usage, tokenizer_source
+
+
+def completion(content, usage=None):
+    return SimpleNamespace(
+        model='deepseek-ai/deepseek-r1',
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=usage
+    )
+
+
+class TestTokenAccounting:
+    def test_approximation_counts_code_and_cjk(self):
+        """Code and CJK text count far more tokens than whitespace-separated words"""
+        code = "def factorial(n):\n    return 1 if n <= 1 else n * factorial(n - 1)\n"
+        mandarin = "量子计算是一种利用量子力学原理的计算方式。"
+        assert approximate_token_count(code) > 1.5 * len(code.split())
+        assert approximate_token_count(mandarin) >= 20 > len(mandarin.split())
+        assert approximate_token_count("the cat sat on the mat") == 6
+        assert approximate_token_count("") == 0
+
+    def test_usage_preferred_over_tokenizer(self):
+        """Provider usage is taken as reported, otherwise the content is counted locally"""
+        reported = response_usage(completion("two words", SimpleNamespace(completion_tokens=7, prompt_tokens=3)))
+        assert (reported.output_tokens, reported.input_tokens, reported.source) == (7, 3, 'usage')
+
+        messages = [{"role": "user", "content": "Explain quantum computing"}]
+        counted = response_usage(completion("量子计算 is fun"), messages=messages)
+        assert counted.output_tokens == count_tokens("量子计算 is fun", 'deepseek-ai/deepseek-r1')
+        assert counted.input_tokens == count_tokens("Explain quantum computing", 'deepseek-ai/deepseek-r1')
+        assert counted.source == tokenizer_source('deepseek-ai/deepseek-r1') in ('tiktoken', 'estimate')
+
+    def test_encoder_and_counts_memoized(self):
+        """The encoder is loaded once per model and repeated texts are counted once"""
+        get_encoder.cache_clear()
+        count_tokens.cache_clear()
+        for _ in range(3):
+            count_tokens("Describe a hash map", 'gpt-3.5-turbo')
+        assert get_encoder.cache_info().misses == 1
+        assert count_tokens.cache_info().hits == 2
+
+    @pytest.mark.skipif(token_accounting.tiktoken is None, reason="tiktoken not installed")
+    def test_tiktoken_used_when_installed(self):
+        """Installed tiktoken counts with the model's encoding"""
+        assert tokenizer_source('gpt-3.5-turbo') == 'tiktoken'
+        assert count_tokens("hello world", 'gpt-3.5-turbo') == 2
+
+    def test_stream_without_usage_counted_locally(self):
+        """A cancelled stream carries no usage, so its content is counted with the tokenizer"""
+        with MockInferenceServer(MockServerConfig(seed=2, ttft_median_ms=5, tokens_per_second=500,
+                                                  completion_tokens=50)) as server:
+            client = get_client('deepseek', api_key='mock', base_url=server.base_url)
+            measurement = measure_openai_stream(client, 'deepseek-ai/deepseek-r1',
+                                                [{"role": "user", "content": "Describe a hash map"}],
+                                                max_tokens=50, on_chunk=lambda text: True)
+
+        assert measurement.cancelled
+        assert measurement.token_source == tokenizer_source('deepseek-ai/deepseek-r1')
+        assert measurement.output_tokens == count_tokens(measurement.content, 'deepseek-ai/deepseek-r1') > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])